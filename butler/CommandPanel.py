@@ -92,12 +92,22 @@ TAG_STYLES = {
 DISPLAY_MODES = ["host", "usb", "both"]
 DISPLAY_MODE_LABELS = {"host": "主机", "usb": "USB", "both": "双显"}
 
+_CODE_BLOCK_RE = re.compile(r"```(\w*)\n(.*?)```", re.DOTALL)
+
 
 @dataclass
 class _ResponseBlock:
-    """流式响应片段缓冲。"""
-    buffer: str = ""
+    """流式响应片段缓冲：片段先存入列表，需要全文时才拼接，避免逐块字符串拼接。"""
+    chunks: list[str] = field(default_factory=list)
     rendered_len: int = 0
+    # 尚未换行的末尾片段；RichLog 按行写入，凑满一行再输出
+    tail: str = ""
+
+    @property
+    def buffer(self) -> str:
+        if len(self.chunks) > 1:
+            self.chunks[:] = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
 
 
 class ProgramList(ListView):
@@ -239,6 +249,7 @@ class CommandPanel(App):
 
         # 订阅事件总线
         event_bus.subscribe("ui_output", self._queue_ui_output)
+        event_bus.subscribe("ui_stream", self._queue_ui_stream)
         event_bus.subscribe("voice_status", self._queue_voice_status)
         event_bus.subscribe("link_status", self._queue_link_status)
         event_bus.subscribe("screenshot_update", self._queue_screenshot_update)
@@ -328,6 +339,10 @@ class CommandPanel(App):
         """流式追加到指定响应块。"""
         self.call_from_thread(self._append_response_ui, text_chunk, response_id)
 
+    def finish_response(self, response_id: str) -> None:
+        """结束指定响应块，输出尚未换行的末尾内容。"""
+        self.call_from_thread(self._finish_response_ui, response_id)
+
     def set_input_text(self, text: str) -> None:
         self.call_from_thread(self._set_input_text_ui, text)
 
@@ -405,14 +420,32 @@ class CommandPanel(App):
     # ------------------------ UI 线程内的实际操作 ------------------------ #
 
     def _drain_queue(self) -> None:
-        """50ms 周期从 msg_queue 取消息分发。"""
+        """
+        50ms 周期从 msg_queue 取消息分发。
+        同一响应相邻的流式片段合并成一次追加：模型输出很快时一帧内可能积压上百个片段，
+        逐个追加会让每个 token 都触发一次日志写入与重绘。
+        """
+        stream_id, stream_chunks = None, []
         try:
             while True:
                 try:
                     msg_type, payload = self.msg_queue.get_nowait()
                 except Empty:
-                    return
+                    break
+                if msg_type == "ui_stream" and payload[0] is not None:
+                    chunk, response_id = payload
+                    if response_id != stream_id and stream_chunks:
+                        self._append_response_ui("".join(stream_chunks), stream_id)
+                        stream_chunks = []
+                    stream_id = response_id
+                    stream_chunks.append(chunk)
+                    continue
+                if stream_chunks:
+                    self._append_response_ui("".join(stream_chunks), stream_id)
+                    stream_chunks = []
                 self._dispatch_queue_item(msg_type, payload)
+            if stream_chunks:
+                self._append_response_ui("".join(stream_chunks), stream_id)
         except Exception:
             logger.exception("drain_queue 异常")
 
@@ -420,6 +453,12 @@ class CommandPanel(App):
         if msg_type == "ui_output":
             message, tag, response_id = payload
             self._append_history_ui(message, tag, response_id)
+        elif msg_type == "ui_stream":
+            chunk, response_id = payload
+            if chunk is None:
+                self._finish_response_ui(response_id)
+            else:
+                self._append_response_ui(chunk, response_id)
         elif msg_type == "voice_status":
             self._update_listen_ui(payload)
         elif msg_type == "link_status":
@@ -440,15 +479,14 @@ class CommandPanel(App):
 
         if response_id:
             # 流式首块：登记缓冲，先放普通文本
-            block = _ResponseBlock(buffer=text, rendered_len=len(text))
+            block = _ResponseBlock(chunks=[text], rendered_len=len(text))
             self._response_blocks[response_id] = block
             self._write_rich(log, text, tag)
             return
 
         # 非流式：解析 markdown 代码块
-        code_block_pattern = re.compile(r"```(\w*)\n(.*?)```", re.DOTALL)
         last_end = 0
-        for m in code_block_pattern.finditer(text):
+        for m in _CODE_BLOCK_RE.finditer(text):
             pre = text[last_end:m.start()]
             if pre.strip():
                 self._write_rich(log, pre, tag)
@@ -469,9 +507,20 @@ class CommandPanel(App):
         if block is None:
             block = _ResponseBlock()
             self._response_blocks[response_id] = block
-        block.buffer += chunk
-        # 简单策略：直接追加文本到末尾；不做重渲染（避免 Markdown 解析抖动）
-        self._write_plain(log, chunk)
+        block.chunks.append(chunk)
+        # 简单策略：完整的行直接追加到末尾，不做重渲染（避免 Markdown 解析抖动）
+        *lines, block.tail = (block.tail + chunk).split("\n")
+        for line in lines:
+            self._write_plain(log, line)
+
+    def _finish_response_ui(self, response_id: str) -> None:
+        block = self._response_blocks.pop(response_id, None)
+        if block is None:
+            return
+        log = self.query_one("#output-log", RichLog)
+        if block.tail:
+            self._write_plain(log, block.tail)
+        log.write("")
 
     def _write_rich(self, log: RichLog, text: str, tag: str) -> None:
         style = TAG_STYLES.get(tag, {})
@@ -866,6 +915,9 @@ class CommandPanel(App):
     def _queue_ui_output(self, message, tag, response_id):
         self.msg_queue.put(("ui_output", (message, tag, response_id)))
 
+    def _queue_ui_stream(self, chunk, response_id):
+        self.msg_queue.put(("ui_stream", (chunk, response_id)))
+
     def _queue_voice_status(self, is_listening):
         self.msg_queue.put(("voice_status", is_listening))
 
@@ -131,15 +131,13 @@ def _launch_legacy(skip_setup: bool = False):
 def _launch_headless(port: int = 5001, host: str = "0.0.0.0"):
     """无头模式: Jarvis 后台 + REST API, 无前台 UI."""
     import os
-    import time
     os.environ.setdefault("BUTLER_API_HOST", host)
     os.environ.setdefault("BUTLER_API_PORT", str(port))
     from butler.butler_app import Jarvis, USBScreen
     usb_screen = USBScreen(40, 8)
     jarvis = Jarvis(None, usb_screen, headless=True)
     jarvis.main()
-    while jarvis.running:
-        time.sleep(1)
+    jarvis.wait_until_stopped()
 
 
 def _launch_api(port: int = 5001, host: str = "0.0.0.0"):
@@ -2,14 +2,15 @@ import os
 import sys
 import time
 import datetime
+import importlib
 import json
 import re
 import threading
 import logging
+import concurrent.futures
 from typing import Dict, Any, List
 import tempfile
 import shutil
-import tkinter as tk
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -31,9 +32,9 @@ from package.core_utils.log_manager import LogManager
 from package.core_utils.config_loader import config_loader
 from package.core_utils.quota_manager import quota_manager
 from butler.core.event_bus import event_bus
-from butler.CommandPanel import CommandPanel
+from butler.core import fast_json
 from butler.data_storage import data_storage_manager
-from butler.core.extension_manager import extension_manager
+from butler.core.extension_manager import get_extension_manager
 from butler.core.voice_service import VoiceService
 from butler.core.nlu_service import NLUService
 from butler.core.habit_manager import habit_manager
@@ -60,6 +61,7 @@ from butler.core.memory.memory_engine import (
     LongMemoryItem, UnifiedMemoryEngine, hybrid_memory_manager
 )
 from butler.core.intent_dispatcher import intent_registry
+from butler.core.algorithms import SubstringIndex
 from butler.core.intents import *  # noqa: F401, F403 — 触发所有 @register_intent 装饰器注册
 from butler.core import legacy_commands # Ensure legacy intents are registered
 from butler.core.bootstrap import build_container, get_secure_runner_token
@@ -68,18 +70,51 @@ from butler.core.hybrid_link import HybridLinkClient
 from butler.core.runner_server import RunnerServer
 from package.device.standalone_manager import StandaloneManager
 
+# LLM 回复解析用的预编译正则
+_JSON_OBJECT_RE = re.compile(r"(\{.*\})", re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r"(\[.*\])", re.DOTALL)
+_CORE_CODE_RE = re.compile(r"\d{6}")
+_PYTHON_FENCE = "```python\n"
+
+
+def _extract_python_block(text: str):
+    """用 str.find 提取第一个 ```python 代码块，找不到时返回 None。"""
+    start = text.find(_PYTHON_FENCE)
+    if start < 0:
+        return None
+    start += len(_PYTHON_FENCE)
+    end = text.find("```", start)
+    if end < 0:
+        return None
+    return text[start:end]
+
+
+# 处理函数内延迟导入的重量级模块，启动时在后台预热，避免首次调用卡顿
+_WARMUP_MODULES = (
+    "butler.core.time_machine",
+    "package.core_utils.autonomous_switch",
+    "package.file_system.data_recycler",
+    "package.device.os_utils",
+    "pyautogui",
+)
+
+
 class Jarvis:
     def __init__(self, root=None, usb_screen=None, headless=False):
         self.root = root
         self.usb_screen = usb_screen
         self.resource_manager = ResourceManager()
         self.display_mode = 'host'
-        self.running = True
+        # 关闭信号：等待方阻塞在 Event 上，无需每秒轮询 running 标记
+        self._stop_event = threading.Event()
+        # 面板命令复用固定的工作线程，避免每条命令新建线程并限制并发
+        self._cmd_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="jarvis-cmd")
         self.pending_dev_code = None
 
         self._check_environment()
         load_dotenv()
         self.logger = LogManager.get_logger(__name__)
+        threading.Thread(target=self._warmup_modules, name="module-warmup", daemon=True).start()
 
         # ----------------------------------------------------
         # HAL peripheral connection auto-detection try-except
@@ -104,6 +139,8 @@ class Jarvis:
         self.config = config_loader._config
         self.prompts = self._load_json_resource("prompts.json")
         self.program_mapping = self._load_json_resource("program_mapping.json")
+        # 程序名模糊匹配索引：映射表加载后只构建一次
+        self._program_index = SubstringIndex(self.program_mapping, ignore_case=True)
 
         # Initialize long memory (required early for NLU)
         self._initialize_long_memory()
@@ -186,6 +223,17 @@ class Jarvis:
         self.ui_suggested = False
         self.waiting_for_ui_confirm = False
         self._interaction_count = 0
+        self._command_table = self._build_command_table()
+
+    def _warmup_modules(self):
+        """后台导入 _WARMUP_MODULES；函数内的导入语句保留作为兜底。"""
+        for name in _WARMUP_MODULES:
+            if name in sys.modules:
+                continue
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                self.logger.debug(f"[Warmup] 跳过 {name}: {e}")
 
     def _print_startup_banner(self, headless):
         # 1. Determine Memory Backend
@@ -275,8 +323,7 @@ class Jarvis:
     def _load_json_resource(self, filename):
         path = Path(__file__).parent / filename
         try:
-            with path.open('r', encoding='utf-8') as f:
-                return json.load(f)
+            return fast_json.loads(path.read_bytes())
         except Exception as e:
             self.logger.error(f"Failed to load {filename}: {e}")
             return {}
@@ -387,9 +434,47 @@ class Jarvis:
         else:
             do_emit()
 
-    def speak(self, text):
-        """朗读给定的文本并在 UI 中打印。同时利用统一引擎记录至事实数据库和日志系统。"""
-        self.ui_print(text, tag='ai_response')
+    def ui_stream(self, chunk, response_id):
+        """
+        向主机面板流式追加一段回复；chunk 为 None 表示该响应结束。
+        与 ui_print 相同，在有 Tk 根窗口时转到主线程发送。
+        """
+        def do_emit():
+            event_bus.emit("ui_stream", chunk, response_id)
+
+        if self.root:
+            self.root.after(0, do_emit)
+        else:
+            do_emit()
+
+    def _can_stream_to_ui(self):
+        """只有主机面板订阅了流式事件时才流式输出；USB 屏等只接收完整文本。"""
+        return self.display_mode == 'host' and event_bus.has_subscribers("ui_stream")
+
+    def _ask_and_speak(self, prompt, history, image_b64=None):
+        """向 LLM 提问并播报回答；主机面板可用时流式显示，首个片段到达即上屏，不必等待完整回复。"""
+        if not self._can_stream_to_ui():
+            self.speak(self.nlu_service.ask_llm(prompt, history=history, image_b64=image_b64))
+            return
+        response_id = f"chat-{time.time_ns()}"
+        streamed = []
+
+        def on_delta(delta):
+            streamed.append(delta)
+            self.ui_stream(delta, response_id)
+
+        resp = self.nlu_service.ask_llm(prompt, history=history, image_b64=image_b64, on_delta=on_delta)
+        if streamed:
+            self.ui_stream(None, response_id)
+        self.speak(resp, display=not streamed)
+
+    def speak(self, text, display=True):
+        """
+        朗读给定的文本并在 UI 中打印。同时利用统一引擎记录至事实数据库和日志系统。
+        display 为 False 表示文本已通过 ui_stream 显示过，不再重复打印。
+        """
+        if display:
+            self.ui_print(text, tag='ai_response')
 
         # 使用统一引擎的一键存储功能实现数据共享
         self.long_memory.save_fact(text, metadata={"role": "assistant"})
@@ -431,242 +516,334 @@ class Jarvis:
                 self.ui_print("已取消 UI 启动。")
                 return
 
-        # Command Dispatching
-        if cmd.startswith("/voice-mode "):
-            mode = cmd.split()[1].lower()
-            if self.voice_service.set_voice_mode(mode):
-                self.ui_print(f"语音模式切换到: {mode}")
-            else:
-                self.ui_print("无效模式", tag='error')
-        elif cmd == "/cleanup":
-            self.ui_print("正在执行系统数据回收...")
-            try:
-                from package import data_recycler
-                summary = data_recycler.run()
-                self.ui_print(summary)
-            except Exception as e:
-                self.ui_print(f"数据回收失败: {e}", tag='error')
-        elif cmd.startswith("/theme "):
-            parts = cmd.split()
-            if len(parts) > 1:
-                theme = parts[1].lower()
-                if theme in ['dark', 'light', 'google', 'apple']:
-                    if theme == 'dark': theme = 'apple'
-                    if theme == 'light': theme = 'google'
-                    config_loader.set("display.theme", theme)
-                    self.ui_print(f"主题切换到: {theme}")
-                    event_bus.emit("theme_change", theme)
-                else:
-                    self.ui_print("无效主题", tag='error')
-        elif cmd.startswith("/encrypt ") or cmd.startswith("/decrypt "):
-            parts = cmd.split()
-            if len(parts) > 1:
-                path = parts[1]
-                mode = 'encrypt' if cmd.startswith("/encrypt") else 'decrypt'
-                self._handle_advanced_encryption(path, mode)
-        elif cmd.startswith("/legacy "):
-            self._handle_legacy_command(cmd[8:])
-        elif cmd == "/skills":
-            report = ["🛠️ **Butler 技能列表:**\n"]
-            manifests = self.skill_manager.manifests
-            if not manifests:
-                report.append("当前无已加载的技能。")
-            else:
-                for s_id, meta in manifests.items():
-                    name = meta.get('name', s_id)
-                    desc = meta.get('description', '无描述')
-                    fmt = meta.get('format', 'unknown')
-                    risk = meta.get('risk', 'low')
-                    is_core = " [核心]" if meta.get('is_core') else ""
-                    has_python = "🐍" if meta.get('has_python') else ""
-                    has_binary = "⚙️" if meta.get('has_binary') else ""
-                    has_frontend = "🖥️" if meta.get('has_frontend') else ""
-                    report.append(
-                        f"- **{s_id}**{is_core} ({fmt})\n"
-                        f"  名称: {name}\n"
-                        f"  描述: {desc}\n"
-                        f"  风险等级: {risk}\n"
-                        f"  类型: {has_python}{has_binary}{has_frontend} {meta.get('type', '未分类')}"
-                    )
-            self.ui_print("\n".join(report), tag='system_message')
-        elif cmd.startswith("/use-skill ") or cmd.startswith("/skill "):
-            parts = cmd.split(maxsplit=2)
-            if len(parts) < 2:
-                self.ui_print("用法: /skill <技能ID> [action]\n可用技能列表请使用 /skills", tag='error')
-                return
-            skill_id = parts[1]
-            action = parts[2] if len(parts) > 2 else "run"
-
-            if skill_id not in self.skill_manager.manifests:
-                self.ui_print(f"❌ 技能 '{skill_id}' 未找到。使用 /skills 查看所有可用技能。", tag='error')
-                return
-
-            self.ui_print(f"🔧 正在手动调用技能: {skill_id} (action={action})...", tag='system_message')
-            manifest = self.skill_manager.manifests[skill_id]
-            entities = {"action": action}
+        # Command Dispatching: 斜杠命令查表分发，其余文本按自然语言处理
+        head, sep, _ = cmd.partition(" ")
+        entry = self._command_table.get(head)
+        if entry is not None and (entry[1] is None or entry[1] == bool(sep)):
+            handled = entry[0](cmd)
+        else:
+            handled = self._handle_free_text(cmd)
+        if handled is False:
+            return
 
-            skill_contents = self.skill_manager.get_skill_instruction(skill_id)
-            if skill_contents:
-                self.ui_print(f"📋 技能指令:\n{skill_contents[:500]}...", tag='system_message')
+        self._interaction_count += 1
+        if self._interaction_count % 3 == 0 or self._should_use_interpreter(cmd):
+            threading.Thread(target=self._reflect_on_interaction, daemon=True).start()
 
-            result = self.skill_manager.execute(
-                skill_id, action, entities=entities, jarvis_app=self
-            )
+    def _build_command_table(self):
+        """
+        斜杠命令分发表：命令名 -> (处理函数, 参数要求)。
+        参数要求 True 表示必须带参数，False 表示不带参数，None 表示均可。
+        处理函数返回 False 时跳过交互计数与反思。
+        """
+        return {
+            "/voice-mode": (self._cmd_voice_mode, True),
+            "/cleanup": (self._cmd_cleanup, False),
+            "/theme": (self._cmd_theme, True),
+            "/encrypt": (self._cmd_encrypt, True),
+            "/decrypt": (self._cmd_encrypt, True),
+            "/legacy": (self._cmd_legacy, True),
+            "/skills": (self._cmd_skills, False),
+            "/use-skill": (self._cmd_skill, True),
+            "/skill": (self._cmd_skill, True),
+            "/skill-info": (self._cmd_skill_info, True),
+            "/py": (self._cmd_python, True),
+            "/python": (self._cmd_python, True),
+            "/sh": (self._cmd_shell, True),
+            "/shell": (self._cmd_shell, True),
+            "/profile": (self._cmd_profile, False),
+            "/profile-reset": (self._cmd_profile_reset, False),
+            "/kairos": (self._cmd_kairos, False),
+            "/performance": (self._cmd_performance, True),
+            "/dream": (self._cmd_dream, False),
+            "/focus": (self._cmd_focus, None),
+            "/focus-stop": (self._cmd_focus_stop, False),
+            "/tasks": (self._cmd_tasks, False),
+            "/team": (self._cmd_team, False),
+            "/approve": (self._cmd_approve, False),
+        }
+
+    def _cmd_voice_mode(self, cmd):
+        """/voice-mode <mode>：切换语音模式。"""
+        mode = cmd.split()[1].lower()
+        if self.voice_service.set_voice_mode(mode):
+            self.ui_print(f"语音模式切换到: {mode}")
+        else:
+            self.ui_print("无效模式", tag='error')
 
-            if isinstance(result, dict) and result.get("status") == "pending_confirmation":
-                self.speak(result.get("message", "需要确认"))
-            elif result:
-                self.ui_print(f"✅ 技能执行结果:\n{str(result)[:1000]}", tag='ai_response')
-                self.speak(str(result)[:200])
+    def _cmd_cleanup(self, cmd):
+        """/cleanup：执行系统数据回收。"""
+        self.ui_print("正在执行系统数据回收...")
+        try:
+            from package import data_recycler
+            summary = data_recycler.run()
+            self.ui_print(summary)
+        except Exception as e:
+            self.ui_print(f"数据回收失败: {e}", tag='error')
+
+    def _cmd_theme(self, cmd):
+        """/theme <name>：切换界面主题。"""
+        parts = cmd.split()
+        if len(parts) > 1:
+            theme = parts[1].lower()
+            if theme in ['dark', 'light', 'google', 'apple']:
+                if theme == 'dark': theme = 'apple'
+                if theme == 'light': theme = 'google'
+                config_loader.set("display.theme", theme)
+                self.ui_print(f"主题切换到: {theme}")
+                event_bus.emit("theme_change", theme)
             else:
-                self.ui_print("⚠️ 技能未返回有效结果。", tag='error')
-        elif cmd.startswith("/skill-info "):
-            skill_id = cmd.split(maxsplit=1)[1] if " " in cmd else ""
-            if not skill_id:
-                self.ui_print("用法: /skill-info <技能ID>", tag='error')
-                return
+                self.ui_print("无效主题", tag='error')
+
+    def _cmd_encrypt(self, cmd):
+        """/encrypt|/decrypt <path>：高级加解密。"""
+        parts = cmd.split()
+        if len(parts) > 1:
+            path = parts[1]
+            mode = 'encrypt' if cmd.startswith("/encrypt") else 'decrypt'
+            self._handle_advanced_encryption(path, mode)
+
+    def _cmd_legacy(self, cmd):
+        """/legacy <command>：以旧版模式处理命令。"""
+        self._handle_legacy_command(cmd[8:])
+
+    def _cmd_skills(self, cmd):
+        """/skills：列出已加载的技能。"""
+        report = ["🛠️ **Butler 技能列表:**\n"]
+        manifests = self.skill_manager.manifests
+        if not manifests:
+            report.append("当前无已加载的技能。")
+        else:
+            for s_id, meta in manifests.items():
+                name = meta.get('name', s_id)
+                desc = meta.get('description', '无描述')
+                fmt = meta.get('format', 'unknown')
+                risk = meta.get('risk', 'low')
+                is_core = " [核心]" if meta.get('is_core') else ""
+                has_python = "🐍" if meta.get('has_python') else ""
+                has_binary = "⚙️" if meta.get('has_binary') else ""
+                has_frontend = "🖥️" if meta.get('has_frontend') else ""
+                report.append(
+                    f"- **{s_id}**{is_core} ({fmt})\n"
+                    f"  名称: {name}\n"
+                    f"  描述: {desc}\n"
+                    f"  风险等级: {risk}\n"
+                    f"  类型: {has_python}{has_binary}{has_frontend} {meta.get('type', '未分类')}"
+                )
+        self.ui_print("\n".join(report), tag='system_message')
+
+    def _cmd_skill(self, cmd):
+        """/skill|/use-skill <技能ID> [action]：手动调用技能。"""
+        parts = cmd.split(maxsplit=2)
+        if len(parts) < 2:
+            self.ui_print("用法: /skill <技能ID> [action]\n可用技能列表请使用 /skills", tag='error')
+            return False
+        skill_id = parts[1]
+        action = parts[2] if len(parts) > 2 else "run"
+
+        if skill_id not in self.skill_manager.manifests:
+            self.ui_print(f"❌ 技能 '{skill_id}' 未找到。使用 /skills 查看所有可用技能。", tag='error')
+            return False
+
+        self.ui_print(f"🔧 正在手动调用技能: {skill_id} (action={action})...", tag='system_message')
+        manifest = self.skill_manager.manifests[skill_id]
+        entities = {"action": action}
+
+        skill_contents = self.skill_manager.get_skill_instruction(skill_id)
+        if skill_contents:
+            self.ui_print(f"📋 技能指令:\n{skill_contents[:500]}...", tag='system_message')
+
+        result = self.skill_manager.execute(
+            skill_id, action, entities=entities, jarvis_app=self
+        )
 
-            manifest = self.skill_manager.manifests.get(skill_id)
-            if not manifest:
-                self.ui_print(f"❌ 技能 '{skill_id}' 未找到。", tag='error')
-                return
+        if isinstance(result, dict) and result.get("status") == "pending_confirmation":
+            self.speak(result.get("message", "需要确认"))
+        elif result:
+            self.ui_print(f"✅ 技能执行结果:\n{str(result)[:1000]}", tag='ai_response')
+            self.speak(str(result)[:200])
+        else:
+            self.ui_print("⚠️ 技能未返回有效结果。", tag='error')
+
+    def _cmd_skill_info(self, cmd):
+        """/skill-info <技能ID>：显示技能详情。"""
+        skill_id = cmd.split(maxsplit=1)[1] if " " in cmd else ""
+        if not skill_id:
+            self.ui_print("用法: /skill-info <技能ID>", tag='error')
+            return False
+
+        manifest = self.skill_manager.manifests.get(skill_id)
+        if not manifest:
+            self.ui_print(f"❌ 技能 '{skill_id}' 未找到。", tag='error')
+            return False
+
+        contents = self.skill_manager.get_skill_instruction(skill_id)
+        config = self.skill_manager.configs.get(skill_id, {})
+
+        info = [
+            f"📖 **技能详情: {skill_id}**\n",
+            f"- 名称: {manifest.get('name', skill_id)}",
+            f"- 格式: {manifest.get('format', 'unknown')}",
+            f"- 描述: {manifest.get('description', '无描述')}",
+            f"- 版本: {manifest.get('version', 'N/A')}",
+            f"- 作者: {manifest.get('author', 'N/A')}",
+            f"- 风险等级: {manifest.get('risk', 'low')}",
+            f"- 核心插件: {'是' if manifest.get('is_core') else '否'}",
+            f"- Python: {'✅' if manifest.get('has_python') else '❌'}",
+            f"- 二进制: {'✅' if manifest.get('has_binary') else '❌'}",
+            f"- 前端: {'✅' if manifest.get('has_frontend') else '❌'}",
+            f"- 路径: {manifest.get('path', 'N/A')}",
+        ]
+
+        provides = manifest.get('provides', [])
+        if provides:
+            info.append(f"- 提供: {', '.join(provides)}")
+
+        requires = manifest.get('requires', {})
+        if requires:
+            info.append(f"- 依赖: {json.dumps(requires, ensure_ascii=False)}")
+
+        keywords = manifest.get('keywords', [])
+        if keywords:
+            info.append(f"- 关键词: {', '.join(keywords)}")
+
+        if actions := manifest.get('actions', []):
+            info.append(f"- 可用动作: {', '.join(actions)}")
+
+        if contents:
+            info.append(f"\n📋 **SKILL.md 指令摘要:**\n{contents[:300]}")
+
+        if config:
+            config_str = json.dumps(config, ensure_ascii=False, indent=2)
+            info.append(f"\n⚙️ **配置:**\n```\n{config_str[:500]}\n```")
+
+        self.ui_print("\n".join(info), tag='system_message')
+
+    def _cmd_python(self, cmd):
+        """/py|/python <code>：执行 Python 代码。"""
+        code = cmd.split(maxsplit=1)[1]
+        self._execute_with_interpreter("python", code)
+
+    def _cmd_shell(self, cmd):
+        """/sh|/shell <command>：执行 Shell 命令。"""
+        command = cmd.split(maxsplit=1)[1]
+        self._execute_with_interpreter("shell", command)
+
+    def _cmd_profile(self, cmd):
+        """/profile：显示用户画像。"""
+        self.ui_print(habit_manager.get_profile_summary(), tag='system_message')
+
+    def _cmd_profile_reset(self, cmd):
+        """/profile-reset：重置用户画像。"""
+        habit_manager.reset_profile()
+        self.ui_print("用户画像与习惯已重置。", tag='system_message')
+
+    def _cmd_kairos(self, cmd):
+        """/kairos：显示 KAIROS 状态。"""
+        percent, plugged = battery_manager.get_status()
+        mode = self.resource_manager.get_mode().value
+        status = (
+            f"🌟 Butler KAIROS 状态:\n"
+            f"- 性能模式: {mode}\n"
+            f"- 电池电量: {percent}% ({'已插电' if plugged else '电池供电'})\n"
+            f"- 节流状态: {'节流中' if battery_manager.should_throttle() else '全速'}\n"
+            f"- 响应倍数: {battery_manager.get_sleep_multiplier()}x\n"
+            f"- 协作队友: {len([m for m in self.team_manager.members if m['status'] != 'shutdown'])} 个活跃\n"
+            f"- 自动做梦: 已就绪"
+        )
+        self.ui_print(status, tag='system_message')
+
+    def _cmd_performance(self, cmd):
+        """/performance <high|eco|normal>：切换性能模式。"""
+        mode_str = cmd.split()[1].lower()
+        if mode_str == "high":
+            self.resource_manager.set_mode(PerformanceMode.HIGH_PERFORMANCE)
+            self.ui_print("性能模式已切换至: 高性能 (HIGH_PERFORMANCE)")
+        elif mode_str == "eco":
+            self.resource_manager.set_mode(PerformanceMode.ECO)
+            self.ui_print("性能模式已切换至: 低功耗 (ECO)")
+        elif mode_str == "normal":
+            self.resource_manager.set_mode(PerformanceMode.NORMAL)
+            self.ui_print("性能模式已切换至: 标准 (NORMAL)")
+        else:
+            self.ui_print("无效模式。可选: high, eco, normal", tag='error')
+
+    def _cmd_dream(self, cmd):
+        """/dream：手动启动做梦引擎。"""
+        self.ui_print("正在手动启动做梦引擎...", tag='system_message')
+        threading.Thread(target=self.dream_engine.dream, daemon=True).start()
+
+    def _cmd_focus(self, cmd):
+        """/focus [分钟]：开始专注模式。"""
+        parts = cmd.split()
+        duration = int(parts[1]) if len(parts) > 1 else 25
+        msg = self.focus_mode.start(duration)
+        self.ui_print(msg, tag='system_message')
+
+    def _cmd_focus_stop(self, cmd):
+        """/focus-stop：结束专注模式。"""
+        msg = self.focus_mode.stop()
+        self.ui_print(msg, tag='system_message')
+
+    def _cmd_tasks(self, cmd):
+        """/tasks：显示持久化任务看板。"""
+        tasks = task_manager.list_business_tasks()
+        report = "📋 **持久化任务看板**:\n"
+        if not tasks:
+            report += "当前无任务。"
+        for t in tasks:
+            m = {"pending": "[ ]", "in_progress": "[>]", "completed": "[x]"}.get(t["status"], "[?]")
+            owner = f" @{t['owner']}" if t.get("owner") else ""
+            report += f"{m} #{t['id']}: {t['subject']}{owner}\n"
+        self.ui_print(report, tag='system_message')
+
+    def _cmd_team(self, cmd):
+        """/team：列出协作队友。"""
+        self.ui_print(self.team_manager.list_teammates(), tag='system_message')
+
+    def _cmd_approve(self, cmd):
+        """/approve：执行待批准的 AI 生成代码；没有待批准代码时按普通文本处理。"""
+        if not self.pending_dev_code:
+            return self._handle_free_text(cmd)
+        code = self.pending_dev_code
+        self.pending_dev_code = None
+        self.ui_print("已获得授权，正在执行代码...", tag='system_message')
+        success, output = interpreter.run("python", code)
+        self.ui_print(json.dumps({"type": "code_block", "language": "python", "code": code, "output": output}), tag='code_block')
 
-            contents = self.skill_manager.get_skill_instruction(skill_id)
-            config = self.skill_manager.configs.get(skill_id, {})
-
-            info = [
-                f"📖 **技能详情: {skill_id}**\n",
-                f"- 名称: {manifest.get('name', skill_id)}",
-                f"- 格式: {manifest.get('format', 'unknown')}",
-                f"- 描述: {manifest.get('description', '无描述')}",
-                f"- 版本: {manifest.get('version', 'N/A')}",
-                f"- 作者: {manifest.get('author', 'N/A')}",
-                f"- 风险等级: {manifest.get('risk', 'low')}",
-                f"- 核心插件: {'是' if manifest.get('is_core') else '否'}",
-                f"- Python: {'✅' if manifest.get('has_python') else '❌'}",
-                f"- 二进制: {'✅' if manifest.get('has_binary') else '❌'}",
-                f"- 前端: {'✅' if manifest.get('has_frontend') else '❌'}",
-                f"- 路径: {manifest.get('path', 'N/A')}",
-            ]
-
-            provides = manifest.get('provides', [])
-            if provides:
-                info.append(f"- 提供: {', '.join(provides)}")
-
-            requires = manifest.get('requires', {})
-            if requires:
-                info.append(f"- 依赖: {json.dumps(requires, ensure_ascii=False)}")
-
-            keywords = manifest.get('keywords', [])
-            if keywords:
-                info.append(f"- 关键词: {', '.join(keywords)}")
-
-            if actions := manifest.get('actions', []):
-                info.append(f"- 可用动作: {', '.join(actions)}")
-
-            if contents:
-                info.append(f"\n📋 **SKILL.md 指令摘要:**\n{contents[:300]}")
-
-            if config:
-                config_str = json.dumps(config, ensure_ascii=False, indent=2)
-                info.append(f"\n⚙️ **配置:**\n```\n{config_str[:500]}\n```")
-
-            self.ui_print("\n".join(info), tag='system_message')
-        elif cmd.startswith("/py ") or cmd.startswith("/python "):
-            code = cmd.split(maxsplit=1)[1]
-            self._execute_with_interpreter("python", code)
-        elif cmd.startswith("/sh ") or cmd.startswith("/shell "):
-            command = cmd.split(maxsplit=1)[1]
-            self._execute_with_interpreter("shell", command)
-        elif cmd == "/profile":
-            self.ui_print(habit_manager.get_profile_summary(), tag='system_message')
-        elif cmd == "/profile-reset":
-            habit_manager.reset_profile()
-            self.ui_print("用户画像与习惯已重置。", tag='system_message')
-        elif cmd == "/kairos":
-            percent, plugged = battery_manager.get_status()
-            mode = self.resource_manager.get_mode().value
-            status = (
-                f"🌟 Butler KAIROS 状态:\n"
-                f"- 性能模式: {mode}\n"
-                f"- 电池电量: {percent}% ({'已插电' if plugged else '电池供电'})\n"
-                f"- 节流状态: {'节流中' if battery_manager.should_throttle() else '全速'}\n"
-                f"- 响应倍数: {battery_manager.get_sleep_multiplier()}x\n"
-                f"- 协作队友: {len([m for m in self.team_manager.members if m['status'] != 'shutdown'])} 个活跃\n"
-                f"- 自动做梦: 已就绪"
-            )
-            self.ui_print(status, tag='system_message')
-        elif cmd.startswith("/performance "):
-            mode_str = cmd.split()[1].lower()
-            if mode_str == "high":
-                self.resource_manager.set_mode(PerformanceMode.HIGH_PERFORMANCE)
-                self.ui_print("性能模式已切换至: 高性能 (HIGH_PERFORMANCE)")
-            elif mode_str == "eco":
-                self.resource_manager.set_mode(PerformanceMode.ECO)
-                self.ui_print("性能模式已切换至: 低功耗 (ECO)")
-            elif mode_str == "normal":
-                self.resource_manager.set_mode(PerformanceMode.NORMAL)
-                self.ui_print("性能模式已切换至: 标准 (NORMAL)")
-            else:
-                self.ui_print("无效模式。可选: high, eco, normal", tag='error')
-        elif cmd == "/dream":
-            self.ui_print("正在手动启动做梦引擎...", tag='system_message')
-            threading.Thread(target=self.dream_engine.dream, daemon=True).start()
-        elif cmd.startswith("/focus"):
-            parts = cmd.split()
-            duration = int(parts[1]) if len(parts) > 1 else 25
-            msg = self.focus_mode.start(duration)
-            self.ui_print(msg, tag='system_message')
-        elif cmd == "/focus-stop":
-            msg = self.focus_mode.stop()
-            self.ui_print(msg, tag='system_message')
-        elif cmd == "/tasks":
-            tasks = task_manager.list_business_tasks()
-            report = "📋 **持久化任务看板**:\n"
-            if not tasks:
-                report += "当前无任务。"
-            for t in tasks:
-                m = {"pending": "[ ]", "in_progress": "[>]", "completed": "[x]"}.get(t["status"], "[?]")
-                owner = f" @{t['owner']}" if t.get("owner") else ""
-                report += f"{m} #{t['id']}: {t['subject']}{owner}\n"
-            self.ui_print(report, tag='system_message')
-        elif cmd == "/team":
-            self.ui_print(self.team_manager.list_teammates(), tag='system_message')
-        elif cmd == "/approve" and self.pending_dev_code:
-            code = self.pending_dev_code
-            self.pending_dev_code = None
-            self.ui_print("已获得授权，正在执行代码...", tag='system_message')
-            success, output = interpreter.run("python", code)
-            self.ui_print(json.dumps({"type": "code_block", "language": "python", "code": code, "output": output}), tag='code_block')
-        elif cmd.startswith("记住这一点：") or cmd.startswith("记住：") or cmd.startswith("Remember this:"):
+    def _handle_free_text(self, cmd):
+        """处理非斜杠命令的文本：记忆指令、本地意图/技能或自主代理循环。返回 False 表示跳过交互计数。"""
+        if cmd.startswith("记住这一点：") or cmd.startswith("记住：") or cmd.startswith("Remember this:"):
             self._handle_manual_habit_learning(cmd)
+            return
+        # Check if AI (DeepSeek) is configured
+        api_key = config_loader.get("api.deepseek.key")
+        ai_available = api_key and "YOUR_" not in str(api_key)
+
+        # 1. 固定句式的高频命令总是本地分发；AI 不可用时再尝试相似度/技能匹配
+        fast = self.local_nlu.match_fast_path(cmd)
+        if fast is not None:
+            intent_id, entities = fast
+            match_type = 'intent'
+        elif not ai_available:
+            intent_id, entities, match_type = self.local_nlu.extract_intent(cmd)
         else:
-            # Check if AI (DeepSeek) is configured
-            api_key = config_loader.get("api.deepseek.key")
-            ai_available = api_key and "YOUR_" not in str(api_key)
-
-            if not ai_available:
-                # 1. AI is not available: Attempt Local (AI-free) dispatch
-                intent_id, entities, match_type = self.local_nlu.extract_intent(cmd)
-
-                if match_type == 'intent':
-                    self.ui_print(f"本地命中意图: {intent_id}", tag='system_message')
-                    handler_args = {"jarvis_app": self, "entities": entities, "programs": extension_manager.packages}
-                    result = intent_registry.dispatch(intent_id, **handler_args)
-                    if result: self.speak(str(result))
-                    return
-                elif match_type == 'skill':
-                    self.ui_print(f"本地命中技能: {intent_id}", tag='system_message')
-                    result = self.skill_manager.execute(intent_id, entities.get("operation") or "run", entities=entities, jarvis_app=self)
-                    if result: self.speak(str(result))
-                    return
-
-            # 2. AI is available OR local fallback failed: Use Autonomous Agent Loop (Normal)
-            threading.Thread(target=self._autonomous_agent_loop, args=(cmd,), daemon=True).start()
-
-        self._interaction_count += 1
-        if self._interaction_count % 3 == 0 or self._should_use_interpreter(cmd):
-            threading.Thread(target=self._reflect_on_interaction, daemon=True).start()
+            match_type = 'none'
+
+        if match_type == 'intent':
+            self.ui_print(f"本地命中意图: {intent_id}", tag='system_message')
+            handler_args = {"jarvis_app": self, "entities": entities, "programs": get_extension_manager().packages}
+            result = intent_registry.dispatch(intent_id, **handler_args)
+            if result: self.speak(str(result))
+            return False
+        elif match_type == 'skill':
+            self.ui_print(f"本地命中技能: {intent_id}", tag='system_message')
+            result = self.skill_manager.execute(intent_id, entities.get("operation") or "run", entities=entities, jarvis_app=self)
+            if result: self.speak(str(result))
+            return False
+
+        # 2. AI is available OR local fallback failed: Use Autonomous Agent Loop (Normal)
+        threading.Thread(target=self._autonomous_agent_loop, args=(cmd,), daemon=True).start()
 
     def _should_use_interpreter(self, command):
         keywords = ['文件', '计算', '报销', '总结', '文件夹', 'excel', 'word', 'pdf', '分析']
@@ -704,9 +881,8 @@ class Jarvis:
         for i in range(max_iterations):
             prompt = f"{system_prompt}\n\nUser Question: {current_input}"
             response = self.nlu_service.ask_llm(prompt, history)
-            code_match = re.search(r"```python\n(.*?)```", response, re.DOTALL)
-            if code_match:
-                code = code_match.group(1)
+            code = _extract_python_block(response)
+            if code is not None:
                 self.ui_print(f"AI 已生成代码 (第 {i+1} 步)。为了安全，请检查并在下方输入 `/approve` 以执行:", tag='system_message')
                 self.ui_print(json.dumps({"type": "code_block", "language": "python", "code": code, "output": "Waiting for /approve..."}), tag='code_block')
                 self.pending_dev_code = code
@@ -737,14 +913,15 @@ class Jarvis:
         else:
             entities = {}
 
-        handler_args = {"jarvis_app": self, "entities": entities, "programs": extension_manager.packages}
-        if matched_intent in intent_registry._intents:
+        em = get_extension_manager()
+        handler_args = {"jarvis_app": self, "entities": entities, "programs": em.packages}
+        if intent_registry.get_handler(matched_intent) is not None:
             result = intent_registry.dispatch(matched_intent, **handler_args)
             if result is not None:
                 if isinstance(result, str): self.speak(result)
                 return
         try:
-            ext_result = extension_manager.execute(matched_intent, command=legacy_command, args=entities)
+            ext_result = em.execute(matched_intent, command=legacy_command, args=entities)
             if ext_result is not None: self.speak(str(ext_result))
             return
         except ValueError:
@@ -752,11 +929,19 @@ class Jarvis:
         self._execute_with_llm_interpreter(legacy_command)
 
     def panel_command_handler(self, command_type, payload):
-        threading.Thread(target=self._dispatch_command, args=(command_type, payload), daemon=True).start()
+        try:
+            future = self._cmd_pool.submit(self._dispatch_command, command_type, payload)
+        except RuntimeError:
+            return  # 已关闭，忽略退出过程中到达的命令
+        future.add_done_callback(self._log_command_error)
+
+    def _log_command_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"Panel command failed: {future.exception()!r}")
 
     def _dispatch_command(self, command_type, payload):
         if command_type == "text": self.handle_user_command(payload)
-        elif command_type == "execute_program": extension_manager.execute(payload)
+        elif command_type == "execute_program": get_extension_manager().execute(payload)
         elif command_type == "display_mode_change": self.display_mode = payload
         elif command_type == "archive_action": self._handle_archive_action(payload)
         elif command_type == "manual_action": self._handle_manual_action(payload)
@@ -764,9 +949,24 @@ class Jarvis:
             if self.voice_service.is_listening: self.voice_service.stop_listening()
             else: self.voice_service.start_listening()
 
+    def _handle_open_program(self, entities, programs):
+        """按名称打开程序：先精确查映射表，未命中再做子串模糊匹配，最后按包名直接查找。"""
+        program_name = entities.get("program_name", "").strip()
+        key = program_name if program_name in self.program_mapping else self._program_index.find(program_name)
+        name = Path(self.program_mapping[key]).stem if key else program_name
+        if name not in (programs or {}):
+            self.speak(f"未找到程序: {program_name}")
+            return
+        self.speak(f"正在打开 {key or name}")
+        try:
+            result = get_extension_manager().execute(name)
+            if result is not None: self.speak(str(result))
+        except Exception as e:
+            self.speak(f"打开程序 {program_name} 失败: {e}")
+
     def _handle_archive_action(self, payload):
         action = payload.get("action")
-        plugin = extension_manager.get_plugin("ArchiveManager")
+        plugin = get_extension_manager().get_plugin("ArchiveManager")
         if not plugin: return
         if action == "open":
             zip_path, file_in_zip = payload.get("zip_path"), payload.get("file_in_zip")
@@ -774,8 +974,7 @@ class Jarvis:
             if result.success:
                 extracted_path = result.result.get("extracted_path")
                 def monitor_loop():
-                    while True:
-                        time.sleep(2)
+                    while not self._stop_event.wait(2):
                         res = plugin.run("detect_changes", {"extracted_path": extracted_path})
                         if res.result is True:
                             plugin.run("sync_zip_file", {"extracted_path": extracted_path, "action": 'Y'})
@@ -819,9 +1018,9 @@ class Jarvis:
                 "只返回 JSON，确保简洁精准。如果没有新发现，请返回空对象 {}。"
             )
             response = self.nlu_service.ask_llm(reflection_prompt, history, use_habit=False)
-            json_match = re.search(r"(\{.*\})", response, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response)
             if json_match:
-                insights = json.loads(json_match.group(1))
+                insights = fast_json.loads(json_match.group(1))
                 if insights: habit_manager.update_from_reflection(insights)
         except Exception as e: self.logger.error(f"Reflection failed: {e}")
 
@@ -869,7 +1068,7 @@ class Jarvis:
     def _handle_manual_habit_learning(self, command: str):
         content = command.split('：', 1)[-1].split(':', 1)[-1].strip()
         if "核心码" in content:
-            digits = re.findall(r'\d{6}', content)
+            digits = _CORE_CODE_RE.findall(content)
             if digits:
                 from package.security.encrypt import SecureVault
                 if SecureVault.set_core_code(digits[0]):
@@ -877,19 +1076,42 @@ class Jarvis:
         self.ui_print(f"正在将 '{content}' 存入核心记忆...", tag='system_message')
         try:
             response = self.nlu_service.ask_llm(f"Convert to habit JSON: {content}", [], use_habit=False)
-            json_match = re.search(r"(\{.*\})", response, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response)
             if json_match:
-                habit_manager.update_from_reflection(json.loads(json_match.group(1)))
+                habit_manager.update_from_reflection(fast_json.loads(json_match.group(1)))
                 self.ui_print("核心记忆已更新。", tag='system_message')
             else:
                 habit_manager.update_preference("custom_note", content)
                 self.ui_print("已作为自定义备注存入画像。", tag='system_message')
         except Exception as e: self.logger.error(f"Manual learning failed: {e}")
 
+    @property
+    def running(self) -> bool:
+        return not self._stop_event.is_set()
+
+    @running.setter
+    def running(self, value: bool):
+        # 兼容外部直接赋值 `jarvis.running = False` 的旧写法
+        if value:
+            self._stop_event.clear()
+        else:
+            self._stop_event.set()
+
+    def stop(self):
+        """发出关闭信号，唤醒所有等待中的循环，并停止接收新的面板命令。"""
+        self._stop_event.set()
+        self._cmd_pool.shutdown(wait=False, cancel_futures=True)
+
+    def wait_until_stopped(self):
+        """阻塞直到 stop()。Windows 上无超时的 Event.wait 无法被 Ctrl+C 打断，故分段等待。"""
+        timeout = 1.0 if os.name == "nt" else None
+        while not self._stop_event.wait(timeout):
+            pass
+
     def _handle_exit(self):
         """优雅关闭：先停服务，再停硬件，最后退出 UI。"""
         self.speak("再见")
-        self.running = False
+        self.stop()
 
         # 1. 停止语音监听
         try:
@@ -963,7 +1185,7 @@ class Jarvis:
 
             # KAIROS Nap: 根据电池状态动态调整 UI 刷新频率
             nap_time = 5 * battery_manager.get_sleep_multiplier()
-            time.sleep(nap_time)
+            self._stop_event.wait(nap_time)
 
     def _handle_advanced_encryption(self, path, mode):
         from package.security.encrypt import SecureVault
@@ -984,18 +1206,27 @@ class Jarvis:
 
     def _cleanup_temp_files(self):
         temp_dir = tempfile.gettempdir()
-        for f in os.listdir(temp_dir):
-            if f.startswith("jarvis_temp_"):
-                try:
-                    path = os.path.join(temp_dir, f)
-                    if os.path.isfile(path): os.remove(path)
-                    else: shutil.rmtree(path)
-                except Exception: pass
+        # DirEntry 自带类型信息，无需为每个条目再 stat 一次
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("jarvis_temp_"):
+                    try:
+                        if entry.is_dir(follow_symlinks=False): shutil.rmtree(entry.path)
+                        else: os.remove(entry.path)
+                    except Exception: pass
         try:
             from package import data_recycler
             data_recycler.run()
         except Exception: pass
 
+    def _capture_screen_for_vision(self, result: dict):
+        """在后台线程中截屏，结果写入 result["image_b64"]；失败时不写入。"""
+        try:
+            from package.device import os_utils
+            result["image_b64"] = os_utils.capture_screen()
+        except Exception as e:
+            self.logger.warning(f"Failed to capture screen for vision: {e}")
+
     def _autonomous_agent_loop(self, command: str):
         """Autonomous agent loop with tool use and persistence."""
         history = self.long_memory.get_recent_history(10)
@@ -1049,15 +1280,14 @@ class Jarvis:
 
             # 检查是否需要视觉辅助
             vision_needed_keywords = ["看", "截图", "屏幕", "图片", "报错", "ui", "界面", "视窗"]
-            image_b64 = None
             current_query = messages[-1]["content"]
+            # 截屏与意图识别请求互不依赖：截屏放到后台线程，与 LLM 往返重叠进行
+            capture = {}
+            capture_thread = None
             if isinstance(current_query, str) and any(k in current_query for k in vision_needed_keywords):
-                try:
-                    from package.device import os_utils
-                    self.ui_print("📸 正在捕获屏幕以进行视觉分析...", tag='system_message')
-                    image_b64 = os_utils.capture_screen()
-                except Exception as e:
-                    self.logger.warning(f"Failed to capture screen for vision: {e}")
+                self.ui_print("📸 正在捕获屏幕以进行视觉分析...", tag='system_message')
+                capture_thread = threading.Thread(target=self._capture_screen_for_vision, args=(capture,), daemon=True)
+                capture_thread.start()
 
             nlu_result = self.nlu_service.extract_intent(current_query, history=messages[:-1])
             intent = nlu_result.get("intent", "unknown")
@@ -1065,8 +1295,9 @@ class Jarvis:
 
             if intent == "unknown":
                 # Fallback to general chat if no clear tool intent
-                resp = self.nlu_service.ask_llm(current_query, history=messages[:-1], image_b64=image_b64)
-                self.speak(resp)
+                if capture_thread is not None:
+                    capture_thread.join()
+                self._ask_and_speak(current_query, messages[:-1], image_b64=capture.get("image_b64"))
                 break
 
             # 5. Tool Dispatch (via unified IntentRegistry)
@@ -1083,9 +1314,9 @@ class Jarvis:
                 )
                 steps_json = self.nlu_service.ask_llm(gen_prompt, use_habit=False)
                 try:
-                    match = re.search(r"(\[.*\])", steps_json, re.DOTALL)
+                    match = _JSON_ARRAY_RE.search(steps_json)
                     if match:
-                        entities["steps"] = json.loads(match.group(1))
+                        entities["steps"] = fast_json.loads(match.group(1))
                     else:
                         output = "Error: 无法从 AI 响应中解析出工作流结构。"
                         break
@@ -1125,7 +1356,7 @@ class Jarvis:
                         self.speak(output["message"])
                         break
                 else:
-                    output = extension_manager.execute(intent, command=command, args=entities)
+                    output = get_extension_manager().execute(intent, command=command, args=entities)
 
             # 6. Feedback Loop
             self.ui_print(f"工具输出: {str(output)[:200]}...", tag='system_message')
@@ -1156,23 +1387,23 @@ class Jarvis:
 
             # If the tool result looks like a final answer or we've reached a conclusion
             if "任务已完成" in str(output) or turn == max_turns - 1:
-                final_resp = self.nlu_service.ask_llm("请基于以上工具执行结果，给用户一个最终答复。", history=messages)
-                self.speak(final_resp)
+                self._ask_and_speak("请基于以上工具执行结果，给用户一个最终答复。", messages)
                 break
 def _start_tui_panel(usb_screen) -> None:
     """启动 TUI 版本的 CommandPanel（Textual App）。"""
+    from butler.CommandPanel import CommandPanel
     jarvis = Jarvis(None, usb_screen, headless=False)
-    all_tools = {t['name']: t.get('path', t.get('module')) for t in extension_manager.get_all_tools()}
+    all_tools = {t['name']: t.get('path', t.get('module')) for t in get_extension_manager().get_all_tools()}
     panel = CommandPanel(
         program_mapping=jarvis.program_mapping,
         programs=all_tools,
         command_callback=jarvis.panel_command_handler,
     )
 
-    # 退出时清理 jarvis.running 标记，触发后续等待循环结束
+    # 退出时发出关闭信号，触发后续等待循环结束
     def _on_exit():
         try:
-            jarvis.running = False
+            jarvis.stop()
         except Exception:
             pass
 
@@ -1214,16 +1445,19 @@ def main():
     usb_screen = USBScreen(40, 8)
     if args.headless:
         jarvis = Jarvis(None, usb_screen, headless=True); jarvis.main()
-        while jarvis.running: time.sleep(1)
+        jarvis.wait_until_stopped()
         return
 
     # Show config wizard if in GUI mode and keys are missing
     if show_config_wizard_if_needed():
         load_dotenv(override=True)
 
+    # 界面相关模块（Textual/tkinter）只在非无头模式下导入
+    import tkinter as tk
+    from butler.CommandPanel import CommandPanel
+
     # --- TUI 入口（显式 --tui 或 CommandPanel 已不再是 tk.Frame 时） ---
-    import tkinter as _tk
-    _is_tk_frame = isinstance(CommandPanel, type) and issubclass(CommandPanel, _tk.Frame)
+    _is_tk_frame = isinstance(CommandPanel, type) and issubclass(CommandPanel, tk.Frame)
 
     if args.tui or not _is_tk_frame:
         if args.classic and not args.tui and not _is_tk_frame:
@@ -1244,9 +1478,16 @@ def main():
 
     root = tk.Tk(); root.title("Jarvis 助手 [管理模式]")
     jarvis = Jarvis(root, usb_screen, headless=False)
-    all_tools = {t['name']: t.get('path', t.get('module')) for t in extension_manager.get_all_tools()}
+    all_tools = {t['name']: t.get('path', t.get('module')) for t in get_extension_manager().get_all_tools()}
     panel = CommandPanel(root, program_mapping=jarvis.program_mapping, programs=all_tools, command_callback=jarvis.panel_command_handler)
     panel.pack(fill=tk.BOTH, expand=True)
     jarvis.main(); root.mainloop()
 
+def __getattr__(name: str):
+    # 兼容旧的 `from butler.butler_app import CommandPanel` 写法，按需导入界面模块
+    if name == "CommandPanel":
+        from butler.CommandPanel import CommandPanel
+        return CommandPanel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__": main()
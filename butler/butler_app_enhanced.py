@@ -9,7 +9,6 @@
 
 import os
 import sys
-import time
 import datetime
 import json
 import re
@@ -98,7 +97,7 @@ def main():
     
     # 导入原始的 Jarvis 类
     from butler.butler_app import Jarvis, USBScreen, CommandPanel
-    from butler.core.extension_manager import extension_manager
+    from butler.core.extension_manager import get_extension_manager
     
     # 启动应用
     usb_screen = USBScreen(40, 8)
@@ -107,8 +106,7 @@ def main():
         logger.info("以无头模式启动")
         jarvis = Jarvis(None, usb_screen, headless=True)
         jarvis.main()
-        while jarvis.running:
-            time.sleep(1)
+        jarvis.wait_until_stopped()
         return
     
     # 尝试启动现代 Web UI
@@ -127,7 +125,7 @@ def main():
     root.title("Jarvis 助手")
     
     jarvis = Jarvis(root, usb_screen, headless=False)
-    all_tools = {t['name']: t.get('path', t.get('module')) for t in extension_manager.get_all_tools()}
+    all_tools = {t['name']: t.get('path', t.get('module')) for t in get_extension_manager().get_all_tools()}
     panel = CommandPanel(root, program_mapping=jarvis.program_mapping, programs=all_tools,
                         command_callback=jarvis.panel_command_handler)
     panel.pack(fill=tk.BOTH, expand=True)
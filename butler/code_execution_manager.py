@@ -1,16 +1,34 @@
 import os
 import json
+import atexit
 import subprocess
 import logging
 import shlex
+import threading
+
+from butler.core import fast_json
+from butler.core.hybrid_link import HybridLinkClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Timeout for a single request to a persistent worker, in seconds.
+PERSISTENT_CALL_TIMEOUT = 30.0
+
+# Characters that mean a command needs a real shell (pipes, redirects, globbing, ...).
+_SHELL_META_CHARS = frozenset('|&;<>$*?()[]!#~')
+
 class CodeExecutionManager:
     def __init__(self, programs_dir="programs"):
         self.programs_dir = programs_dir
         self.registered_programs = {}
+        # Prompt-facing descriptions, rebuilt lazily after the registry changes.
+        self._descriptions = None
+        self._prompt_block = None
+        # Long-lived worker processes for programs whose manifest sets "persistent": true.
+        self._workers = {}
+        self._workers_lock = threading.Lock()
+        atexit.register(self.shutdown)
         if not os.path.isdir(self.programs_dir):
             logging.warning(f"Programs directory '{self.programs_dir}' not found. Creating it.")
             os.makedirs(self.programs_dir)
@@ -20,6 +38,7 @@ class CodeExecutionManager:
         Scans the programs directory, compiles necessary projects, and registers them.
         """
         logging.info(f"Starting scan of programs directory: '{self.programs_dir}'")
+        self._invalidate_descriptions()
         for project_name in os.listdir(self.programs_dir):
             project_path = os.path.join(self.programs_dir, project_name)
             if not os.path.isdir(project_path):
@@ -31,8 +50,8 @@ class CodeExecutionManager:
                 continue
 
             try:
-                with open(manifest_path, 'r', encoding='utf-8') as f:
-                    manifest = json.load(f)
+                with open(manifest_path, 'rb') as f:
+                    manifest = fast_json.loads(f.read())
 
                 logging.info(f"Processing project '{manifest.get('name', project_name)}'")
                 self._compile_and_register_project(project_path, manifest)
@@ -94,8 +113,7 @@ class CodeExecutionManager:
                 # Execute the command from within the project directory
                 # Note: build_command comes from manifest.json which is trusted internal config.
                 # For security, we prefer list-based execution if possible.
-                shell_chars = {'|', '&', ';', '<', '>', '$', '*', '?', '(', ')', '[', ']', '!', '#', '~'}
-                has_shell_meta = any(char in formatted_command for char in shell_chars)
+                has_shell_meta = not _SHELL_META_CHARS.isdisjoint(formatted_command)
 
                 if not has_shell_meta:
                     command_parts = shlex.split(formatted_command)
@@ -121,8 +139,11 @@ class CodeExecutionManager:
                 'path': os.path.abspath(executable_path),
                 'description': description,
                 'language': language,
-                'run_command': manifest.get('run') # Store the run command if it exists
+                'run_command': manifest.get('run'), # Store the run command if it exists
+                'persistent': bool(manifest.get('persistent', False)),
+                'capture_stdout': bool(manifest.get('capture_stdout', True))
             }
+            self._invalidate_descriptions()
             logging.info(f"Successfully registered program: '{name}'")
         else:
             logging.error(f"Build target '{executable_path}' not found after compilation attempt for '{name}'.")
@@ -133,30 +154,62 @@ class CodeExecutionManager:
     def get_all_programs(self):
         return self.registered_programs
 
+    def _invalidate_descriptions(self):
+        self._descriptions = None
+        self._prompt_block = None
+
     def get_program_descriptions(self):
         """
         Returns a list of descriptions for all registered programs,
         formatted for the orchestrator.
+
+        The list is built once per registry change and shared between callers,
+        so it must be treated as read-only.
+        """
+        if self._descriptions is None:
+            descriptions = []
+            for name, info in self.registered_programs.items():
+                descriptions.append({
+                    "tool_name": name,
+                    "description": info.get('description', 'No description available.'),
+                    # We can add argument details to manifest.json in the future
+                    "args": ["..."]
+                })
+            self._descriptions = descriptions
+        return self._descriptions
+
+    def get_prompt_block(self):
         """
-        descriptions = []
-        for name, info in self.registered_programs.items():
-            descriptions.append({
-                "tool_name": name,
-                "description": info.get('description', 'No description available.'),
-                # We can add argument details to manifest.json in the future
-                "args": ["..."]
-            })
-        return descriptions
-
-    def execute_program(self, name, args):
+        Returns the program descriptions as a single text block for prompt building.
+        """
+        if self._prompt_block is None:
+            self._prompt_block = "\n".join(
+                f"- Tool Name: `{d['tool_name']}`\n"
+                f"  - Description: {d['description']}\n"
+                f"  - Arguments: {', '.join(d['args'])}"
+                for d in self.get_program_descriptions()
+            )
+        return self._prompt_block
+
+    def execute_program(self, name, args, capture=None):
         """
         Executes a registered program by name with the given arguments.
         Returns a tuple of (success, output).
+
+        When capture is False (default: the manifest's "capture_stdout", true if unset)
+        stdout is discarded instead of piped back, and output is an empty string.
         """
         program_info = self.get_program(name)
         if not program_info:
             return False, f"Error: Program '{name}' not found."
 
+        if program_info.get('persistent'):
+            result = self._execute_persistent(name, program_info, args)
+            if result is not None:
+                return result
+            # Only reached when the request never got to a worker, so the program has not run yet.
+            logging.warning(f"Persistent worker for '{name}' unavailable, falling back to a one-shot run.")
+
         project_dir = os.path.dirname(program_info['path'])
         run_command_template = program_info.get('run_command')
 
@@ -175,32 +228,36 @@ class CodeExecutionManager:
 
             # Security hardening: even if it's a shell command, check if it actually needs shell features
             if is_shell_command:
-                shell_chars = {'|', '&', ';', '<', '>', '$', '*', '?', '(', ')', '[', ']', '!', '#', '~'}
-                if not any(char in command for char in shell_chars):
+                if _SHELL_META_CHARS.isdisjoint(command):
                     try:
                         command = shlex.split(command)
                         is_shell_command = False
                     except ValueError:
                         pass
 
-            # Ensure arguments in string commands were already quoted with shlex.quote
+            if capture is None:
+                capture = program_info.get('capture_stdout', True)
+
+            # Ensure arguments in string commands were already quoted with shlex.quote.
+            # Output stays as bytes in the pipe and is decoded once below.
             result = subprocess.run(
                 command,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 check=True,
                 cwd=project_dir, # Execute from program's dir
                 shell=is_shell_command
             )
-            output = f"Program '{name}' executed successfully.\nOutput:\n{result.stdout}"
-            logging.info(output)
-            return True, result.stdout
+            stdout = result.stdout.decode('utf-8', 'replace') if capture else ""
+            logging.info(f"Program '{name}' executed successfully.\nOutput:\n{stdout}")
+            return True, stdout
         except FileNotFoundError:
             error_msg = f"Error: The executable for '{name}' was not found at '{program_info['path']}'."
             logging.error(error_msg)
             return False, error_msg
         except subprocess.CalledProcessError as e:
-            error_msg = f"Error executing '{name}': {e.stderr}"
+            stderr = e.stderr.decode('utf-8', 'replace') if e.stderr else ""
+            error_msg = f"Error executing '{name}': {stderr}"
             logging.error(error_msg)
             return False, error_msg
         except Exception as e:
@@ -209,6 +266,83 @@ class CodeExecutionManager:
             return False, error_msg
 
 
+    def _get_worker(self, name, program_info):
+        """
+        Returns a running Hybrid-Link worker for the program, starting one if needed.
+        The worker is spawned with the manifest's "run" command (without per-call
+        arguments, which are sent with each request) when one is set.
+        Returns None if the process cannot be started.
+        """
+        command = None
+        run_command_template = program_info.get('run_command')
+        if run_command_template:
+            command_str = run_command_template.format(args="")
+            if not _SHELL_META_CHARS.isdisjoint(command_str):
+                logging.warning(f"Run command for '{name}' needs a shell; it cannot be kept as a persistent worker.")
+                return None
+            try:
+                command = shlex.split(command_str)
+            except ValueError:
+                return None
+        with self._workers_lock:
+            worker = self._workers.get(name)
+            if worker and worker.process and worker.process.poll() is None:
+                return worker
+            if worker:
+                worker.stop()
+            worker = HybridLinkClient(
+                executable_path=program_info['path'],
+                cwd=os.path.dirname(program_info['path']),
+                fallback_enabled=False,
+                command=command
+            )
+            if not worker.start():
+                self._workers.pop(name, None)
+                return None
+            self._workers[name] = worker
+            logging.info(f"Started persistent worker for '{name}'.")
+            return worker
+
+    def _execute_persistent(self, name, program_info, args):
+        """
+        Sends a "run" request to the program's persistent worker over the
+        Hybrid-Link (JSON-RPC over stdio) protocol, avoiding a fork+exec per call.
+        Returns (success, output), or None if the request never reached a worker
+        and a one-shot run is therefore safe.
+        """
+        worker = self._get_worker(name, program_info)
+        if worker is None:
+            return None
+
+        response = worker.call("run", {"args": [str(arg) for arg in args]}, timeout=PERSISTENT_CALL_TIMEOUT)
+        if isinstance(response, dict) and "error" in response:
+            if not worker.process or worker.process.poll() is not None:
+                # The worker died; drop it so the next call respawns it.
+                with self._workers_lock:
+                    if self._workers.get(name) is worker:
+                        self._workers.pop(name)
+                worker.stop()
+            if response.get('sent') is False:
+                return None
+            # The request was delivered and may have had side effects, so don't run it again.
+            error_msg = f"Error executing '{name}': {response['error'].get('message', response['error'])}"
+            logging.error(error_msg)
+            return False, error_msg
+
+        if isinstance(response, dict):
+            output = response.get('output', '')
+        else:
+            output = '' if response is None else str(response)
+        return True, output
+
+    def shutdown(self):
+        """Stops all persistent worker processes."""
+        with self._workers_lock:
+            workers, self._workers = list(self._workers.values()), {}
+        for worker in workers:
+            worker.stop()
+
+
 if __name__ == '__main__':
     # Example usage for testing
     manager = CodeExecutionManager()
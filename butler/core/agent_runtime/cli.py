@@ -34,6 +34,7 @@ from .agent_runtime import AgentConfig, AgentRuntime
 from .builtin_tools import register_builtin_tools
 from .context_manager import ContextManager
 from .event_stream import EventStream
+from .http_session import create_session
 from .permission import PermissionMode, PermissionSystem
 from .subagent_manager import SubagentManager
 from .tool_registry import ToolRegistry
@@ -388,6 +389,7 @@ def _create_llm_handler():
     尝试使用 Butler 现有的 NLUService 或直接调用 DeepSeek/OpenAI API。
     """
     try:
+        from butler.core import fast_json
         from package.core_utils.config_loader import config_loader
 
         api_key = os.getenv("DEEPSEEK_API_KEY") or config_loader.get("api.deepseek.key")
@@ -400,16 +402,11 @@ def _create_llm_handler():
             or "https://api.deepseek.com/v1"
         )
         model = config_loader.get("api.deepseek.model") or "deepseek-chat"
+        url = f"{endpoint}/chat/completions"
+        session = create_session(api_key)
 
         def llm_call_handler(messages, tools, **kwargs):
             """调用 DeepSeek API with tool calling。"""
-            import requests
-
-            url = f"{endpoint}/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
 
             payload = {
                 "model": model,
@@ -423,9 +420,9 @@ def _create_llm_handler():
             # 移除 None 值
             payload = {k: v for k, v in payload.items() if v is not None}
 
-            resp = requests.post(url, json=payload, headers=headers, timeout=60)
+            resp = session.post(url, data=fast_json.dumps(payload), timeout=(3.05, 60))
             resp.raise_for_status()
-            data = resp.json()
+            data = fast_json.loads(resp.content)
 
             choice = data.get("choices", [{}])[0]
             message = choice.get("message", {})
@@ -0,0 +1,35 @@
+"""
+Agent 运行时共用的 LLM HTTP 会话。
+
+CLI 与 Jarvis 适配层都通过 create_session 获取复用连接、带重试策略的 requests 会话。
+"""
+
+from __future__ import annotations
+
+
+def create_session(api_key: str | None = None):
+    """
+    创建复用连接的 HTTP 会话：keep-alive 连接池避免每轮重新握手 TLS，
+    网关错误时指数退避重试（读取超时不重试，避免重复计费）。
+    未给出 api_key 时由调用方按次传入鉴权头。
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers["Content-Type"] = "application/json"
+    if api_key:
+        session.headers["Authorization"] = f"Bearer {api_key}"
+    retry = Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
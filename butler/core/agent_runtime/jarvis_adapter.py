@@ -30,6 +30,7 @@ from .agent_runtime import AgentConfig, AgentRuntime
 from .builtin_tools import register_builtin_tools
 from .context_manager import ContextManager
 from .event_stream import EventStream
+from .http_session import create_session
 from .permission import PermissionMode, PermissionSystem
 from .subagent_manager import SubagentDefinition, SubagentManager
 from .tool_registry import ToolRegistry
@@ -180,13 +181,17 @@ class JarvisAgentBridge:
         将 Jarvis 的 NLUService.ask_llm 适配为 AgentRuntime 所需的
         (messages, tools, **kwargs) → dict 格式。
         """
+        from butler.core import fast_json
+
         jarvis = self.jarvis
+        # 会话在各轮调用间复用；API Key 可能在运行时修改，只在变化时更新会话上的鉴权头
+        session = create_session()
+        session_key = None
 
         def handler(messages: list[dict], tools: list[dict], **kwargs) -> dict[str, Any]:
             """调用 DeepSeek/OpenAI API with tool calling。"""
+            nonlocal session_key
             try:
-                import requests
-
                 api_key = (
                     os.getenv("DEEPSEEK_API_KEY")
                     or jarvis.config.get("api", {}).get("deepseek", {}).get("key", "")
@@ -207,10 +212,9 @@ class JarvisAgentBridge:
                 )
                 url = f"{endpoint}/chat/completions"
 
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                }
+                if api_key != session_key:
+                    session.headers["Authorization"] = f"Bearer {api_key}"
+                    session_key = api_key
 
                 payload = {
                     "model": "deepseek-chat",
@@ -224,9 +228,9 @@ class JarvisAgentBridge:
                 # 移除 None 值
                 payload = {k: v for k, v in payload.items() if v is not None}
 
-                resp = requests.post(url, json=payload, headers=headers, timeout=60)
+                resp = session.post(url, data=fast_json.dumps(payload), timeout=(3.05, 60))
                 resp.raise_for_status()
-                data = resp.json()
+                data = fast_json.loads(resp.content)
 
                 choice = data.get("choices", [{}])[0]
                 message = choice.get("message", {})
@@ -1,13 +1,14 @@
+import os
 import sys
 import heapq
 import importlib
+import math
+import re
 import contextlib
-from collections import deque
-
-try:
-    import cv2
-except ImportError:
-    cv2 = None
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque, namedtuple
+from functools import lru_cache
 
 try:
     import numpy as np
@@ -15,11 +16,10 @@ except ImportError:
     np = None
 
 try:
-    from sklearn.cluster import KMeans
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
+    from numba import njit
 except ImportError:
-    KMeans = TfidfVectorizer = cosine_similarity = None
+    njit = None
+
 try:
     from tqdm import tqdm
 except ImportError:
@@ -30,6 +30,38 @@ except ImportError:
         def update(self, *args): pass
         def close(self): pass
 
+
+# OpenCV 与 scikit-learn 导入耗时合计约 2 秒，却只在边缘检测、文本相似度、聚类等少数路径用到，
+# 因此推迟到首次使用时再导入；模块级 __getattr__ 保留 `algorithms.cv2` 等旧的属性访问方式
+_LAZY_ATTRS = {
+    "cv2": "cv2",
+    "KMeans": "sklearn.cluster.KMeans",
+    "TfidfVectorizer": "sklearn.feature_extraction.text.TfidfVectorizer",
+}
+
+
+@lru_cache(maxsize=None)
+def _lazy_import(name):
+    """按 _LAZY_ATTRS 中的名称按需导入模块或类，结果缓存；未安装时返回 None。"""
+    module_name, _, attr = _LAZY_ATTRS[name].rpartition(".")
+    try:
+        module = importlib.import_module(module_name or attr)
+    except ImportError:
+        return None
+    if module_name:
+        return getattr(module, attr)
+    if name == "cv2":
+        # 多核机器上处理小图时线程开满反而更慢，限制 OpenCV 的 parallel_for_ 并行度
+        module.setNumThreads(min(4, os.cpu_count() or 1))
+    return module
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return _lazy_import(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # 1. Sorting Algorithms
 def _insertion_sort(arr, low, high, pbar=None):
     """
@@ -268,28 +300,29 @@ def heap_sort(arr, use_progress_bar=False):
 def binary_search(arr, target):
     """
     使用二分查找算法在已排序的数组中搜索目标值。
+    列表走 C 实现的 bisect；numpy 数组走 searchsorted，且 target 可为数组以批量查找。
 
     参数:
-        arr (list): 要搜索的已排序数字列表。
-        target: 要搜索的值。
+        arr (list or numpy.ndarray): 要搜索的已排序数字序列。
+        target: 要搜索的值，或（arr 为 numpy 数组时）一组值。
 
     返回:
-        int: 如果找到目标，则返回其索引，否则返回 -1。
-    """
-    low, high = 0, len(arr) - 1
-
-    while low <= high:
-        mid = (low + high) // 2
-        mid_val = arr[mid]
-
-        if mid_val == target:
-            return mid
-        elif mid_val < target:
-            low = mid + 1
-        else:
-            high = mid - 1
-
-    return -1
+        int or numpy.ndarray: 如果找到目标，则返回其索引，否则返回 -1；批量查找时逐项返回。
+    """
+    if np is not None and isinstance(arr, np.ndarray):
+        n = len(arr)
+        if np.ndim(target) > 0:
+            targets = np.asarray(target)
+            idx = np.searchsorted(arr, targets)
+            if n == 0:
+                return np.full(idx.shape, -1, dtype=np.intp)
+            found = (idx < n) & (arr[np.minimum(idx, n - 1)] == targets)
+            return np.where(found, idx, -1)
+        i = int(np.searchsorted(arr, target))
+        return i if i < n and arr[i] == target else -1
+
+    i = bisect_left(arr, target)
+    return i if i < len(arr) and arr[i] == target else -1
 
 # 3. Pathfinding Algorithm
 def a_star(graph, start, goal, heuristic, use_progress_bar=False):
@@ -356,8 +389,9 @@ def dijkstra(graph, start_node):
     此实现使用最小优先队列以提高效率。
 
     参数:
-        graph (dict): 图形表示，其中键是节点 ID，值是邻居及其边权重的字典。
+        graph (dict or CSRGraph): 图形表示，其中键是节点 ID，值是邻居及其边权重的字典。
                       例如：{'A': {'B': 1, 'C': 4}, 'B': {'A': 1, 'D': 2, 'C': 5}, ...}
+                      传入 compile_graph 预编译的 CSRGraph 时走数组化的快速路径。
         start_node: 开始搜索的节点。
 
     返回:
@@ -365,6 +399,13 @@ def dijkstra(graph, start_node):
                - distances (dict): 将每个节点映射到其与起始节点最短距离的字典。
                - predecessors (dict): 将每个节点映射到其在最短路径中的前驱节点的字典。
     """
+    if isinstance(graph, CSRGraph):
+        dist_arr, pred_arr = dijkstra_csr(graph, graph.name_to_id[start_node])
+        names = graph.id_to_name
+        distances = {names[i]: float(d) for i, d in enumerate(dist_arr)}
+        predecessors = {names[i]: names[p] for i, p in enumerate(pred_arr) if p >= 0}
+        return distances, predecessors
+
     # 将所有节点的距离初始化为无穷大，起始节点除外
     distances = {node: float('infinity') for node in graph}
     distances[start_node] = 0
@@ -395,6 +436,91 @@ def dijkstra(graph, start_node):
 
     return distances, predecessors
 
+CSRGraph = namedtuple("CSRGraph", ["indptr", "indices", "weights", "name_to_id", "id_to_name"])
+
+
+def compile_graph(graph):
+    """
+    将邻接字典图编译为 CSR（压缩稀疏行）数组，供 dijkstra_csr 的紧凑循环使用。
+    图不变时只需编译一次，之后可反复传给 dijkstra。
+
+    参数:
+        graph (dict): 与 dijkstra 相同格式的图，例如 {'A': {'B': 1, 'C': 4}, ...}。
+
+    返回:
+        CSRGraph: (indptr, indices, weights, name_to_id, id_to_name)。
+    """
+    if np is None:
+        raise ImportError("compile_graph 需要 numpy")
+
+    id_to_name = list(graph)
+    name_to_id = {name: i for i, name in enumerate(id_to_name)}
+    for edges in graph.values():
+        for neighbor in edges:
+            if neighbor not in name_to_id:
+                name_to_id[neighbor] = len(id_to_name)
+                id_to_name.append(neighbor)
+
+    indptr = np.zeros(len(id_to_name) + 1, dtype=np.int32)
+    indices = []
+    weights = []
+    for i, name in enumerate(id_to_name):
+        edges = graph.get(name, {})
+        indices.extend(name_to_id[neighbor] for neighbor in edges)
+        weights.extend(edges.values())
+        indptr[i + 1] = len(indices)
+
+    return CSRGraph(
+        indptr,
+        np.asarray(indices, dtype=np.int32),
+        np.asarray(weights, dtype=np.float64),
+        name_to_id,
+        id_to_name,
+    )
+
+
+def _dijkstra_csr_kernel(indptr, indices, weights, start_id):
+    """dijkstra_csr 的内部循环，仅使用数组与 heapq，可被 numba 编译。"""
+    n = indptr.shape[0] - 1
+    distances = np.full(n, np.inf)
+    predecessors = np.full(n, -1, dtype=np.int64)
+    distances[start_id] = 0.0
+    heap = [(0.0, np.int64(start_id))]
+
+    while heap:
+        current_distance, u = heapq.heappop(heap)
+        if current_distance > distances[u]:
+            continue
+        for k in range(indptr[u], indptr[u + 1]):
+            v = np.int64(indices[k])
+            distance = current_distance + weights[k]
+            if distance < distances[v]:
+                distances[v] = distance
+                predecessors[v] = u
+                heapq.heappush(heap, (distance, v))
+
+    return distances, predecessors
+
+
+if njit is not None:
+    _dijkstra_csr_kernel = njit(cache=True)(_dijkstra_csr_kernel)
+
+
+def dijkstra_csr(csr, start_id):
+    """
+    在 CSR 图上运行 Dijkstra 算法（安装 numba 时为原生代码）。
+
+    参数:
+        csr (CSRGraph): compile_graph 的返回值。
+        start_id (int): 起始节点的整数 ID（见 csr.name_to_id）。
+
+    返回:
+        tuple: (distances, predecessors) 两个按节点 ID 索引的 numpy 数组；
+               不可达节点距离为 inf，无前驱时为 -1。
+    """
+    return _dijkstra_csr_kernel(csr.indptr, csr.indices, csr.weights, int(start_id))
+
+
 def breadth_first_search(graph, start_node):
     """
     从起始节点对图执行广度优先搜索（BFS）。
@@ -450,27 +576,69 @@ def depth_first_search(graph, start_node, visited=None):
     return order_visited
 
 # 4. Text Similarity Algorithm
+# 两段文本的 TF-IDF 只依赖各自的词频以及“词是否同时出现在两段中”：
+# 默认参数 (smooth_idf) 下共有词 idf = ln(3/3)+1 = 1，独有词 idf = ln(3/2)+1。
+# 因此无需每次调用都 fit 一个新词表，只需复用向量化器的分词器并缓存词频即可，结果与 fit_transform 一致。
+_IDF_UNIQUE = math.log(1.5) + 1.0
+_TFIDF_ANALYZER = None
+
+
+@lru_cache(maxsize=2048)
+def _term_counts(text):
+    """按 TfidfVectorizer 默认规则分词并统计词频；结果被缓存，调用方不得修改。"""
+    global _TFIDF_ANALYZER
+    if _TFIDF_ANALYZER is None:
+        _TFIDF_ANALYZER = _lazy_import("TfidfVectorizer")().build_analyzer()
+    return Counter(_TFIDF_ANALYZER(text))
+
+
+def _tfidf_norm(counts, shared):
+    return math.sqrt(sum((c if t in shared else c * _IDF_UNIQUE) ** 2 for t, c in counts.items()))
+
+
 def text_cosine_similarity(text1, text2):
     """
     使用 TF-IDF 向量计算两个文本字符串之间的余弦相似度。
     """
-    if TfidfVectorizer is None:
+    if _lazy_import("TfidfVectorizer") is None:
         # Fallback to simple keyword overlap if sklearn is missing
         words1 = set(text1.lower().split())
         words2 = set(text2.lower().split())
         if not words1 or not words2: return 0.0
         return len(words1 & words2) / len(words1 | words2)
 
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([text1, text2])
-    similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
-    return similarity[0][0]
+    counts1, counts2 = _term_counts(text1), _term_counts(text2)
+    shared = counts1.keys() & counts2.keys()
+    if not shared:
+        return 0.0
+    # 共有词 idf 为 1，点积只剩词频乘积；范数里独有词按 _IDF_UNIQUE 加权
+    dot = sum(counts1[t] * counts2[t] for t in shared)
+    return dot / (_tfidf_norm(counts1, shared) * _tfidf_norm(counts2, shared))
 
 # 5. Image Processing Algorithm
+# 超过该像素数的图像才交给 GPU：小图上传/下载的开销超过 CPU SIMD 计算本身
+_CUDA_MIN_PIXELS = 2_000_000
+_CUDA_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _cuda_canny_detector():
+    """OpenCV 带 CUDA 且有可用设备时创建并缓存 GPU Canny 检测器，否则返回 None。"""
+    cv2 = _lazy_import("cv2")
+    try:
+        if cv2 is None or cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        return cv2.cuda.createCannyEdgeDetector(100, 200, 3, True)
+    except (AttributeError, cv2.error):
+        return None
+
+
 def edge_detection(image_path):
     """
     使用 Canny 边缘检测算法检测图像中的边缘。
+    大图在有 CUDA 设备时走 GPU，参数与 CPU 路径一致。
     """
+    cv2 = _lazy_import("cv2")
     if cv2 is None:
         return None
 
@@ -478,42 +646,50 @@ def edge_detection(image_path):
     if image is None:
         return None
 
-    # 应用Canny边缘检测
-    edges = cv2.Canny(image, 100, 200)
+    if image.size >= _CUDA_MIN_PIXELS:
+        detector = _cuda_canny_detector()
+        if detector is not None:
+            # 检测器在默认流上运行，多个线程共用时需串行
+            with _CUDA_LOCK:
+                gpu_image = cv2.cuda_GpuMat()
+                gpu_image.upload(image)
+                return detector.detect(gpu_image).download()
+
+    # 应用Canny边缘检测（L2 梯度幅值走 OpenCV 的 SIMD 实现）
+    edges = cv2.Canny(image, 100, 200, L2gradient=True)
     return edges
 
 # 6. Mathematical Algorithm
-def _multiply_matrices(F, M):
+def _fibonacci_pair(n):
     """
-    斐波那契的内部辅助函数。将两个 2x2 矩阵相乘。
+    斐波那契的内部辅助函数。快速倍增法返回 (F(n), F(n+1))。
+    利用 F(2k) = F(k)·(2F(k+1) − F(k)) 与 F(2k+1) = F(k)² + F(k+1)²，
+    每个二进制位只需三次大整数乘法，比 2x2 矩阵求幂的八次少得多。
     """
-    x = F[0][0] * M[0][0] + F[0][1] * M[1][0]
-    y = F[0][0] * M[0][1] + F[0][1] * M[1][1]
-    z = F[1][0] * M[0][0] + F[1][1] * M[1][0]
-    w = F[1][0] * M[0][1] + F[1][1] * M[1][1]
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        a, b = (d, c + d) if bit == "1" else (c, d)
+    return a, b
 
-    F[0][0] = x
-    F[0][1] = y
-    F[1][0] = z
-    F[1][1] = w
+# F(92) 是 int64 能表示的最大斐波那契数，更大的 n 需要 Python 大整数
+_FIB_INT64_MAX_N = 92
 
-def _power(F, n):
-    """
-    斐波那契的内部辅助函数。计算矩阵的幂。
-    """
-    if n == 0 or n == 1:
-        return
-    M = [[1, 1], [1, 0]]
-
-    _power(F, n // 2)
-    _multiply_matrices(F, F)
+def _fibonacci_int64(n):
+    """斐波那契的内部辅助函数。迭代计算，仅用于 n <= 92，可被 numba 编译。"""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
 
-    if n % 2 != 0:
-        _multiply_matrices(F, M)
+if njit is not None:
+    _fibonacci_int64 = njit(cache=True)(_fibonacci_int64)
 
 def fibonacci(n):
     """
-    使用矩阵求幂计算第 n 个斐波那契数，这是一个 O(log n) 的算法。
+    使用快速倍增法计算第 n 个斐波那契数，这是一个 O(log n) 的算法。
+    安装 numba 时，int64 范围内的 n 直接走编译后的迭代实现。
 
     参数:
         n (int): 要计算的斐波那契数的索引（非负）。
@@ -523,13 +699,9 @@ def fibonacci(n):
     """
     if n <= 0:
         return 0
-    if n == 1:
-        return 1
-
-    F = [[1, 1], [1, 0]]
-    _power(F, n - 1)
-
-    return F[0][0]
+    if njit is not None and n <= _FIB_INT64_MAX_N:
+        return int(_fibonacci_int64(n))
+    return _fibonacci_pair(n)[0]
 
 
 # 7. Clustering Algorithm
@@ -537,6 +709,7 @@ def k_means_clustering(data, n_clusters, random_state=None):
     """
     对数据集执行 K-Means 聚类。
     """
+    KMeans = _lazy_import("KMeans")
     if KMeans is None:
         return None, None
 
@@ -559,12 +732,13 @@ class HybridMatcher:
         self.manifests = manifests
         self.low_power = hardware_low_power
         self.vectorizer = None
-        if not self.low_power and TfidfVectorizer is not None:
+        self._keyword_index = None
+        if not self.low_power and _lazy_import("TfidfVectorizer") is not None:
             self._prepare_semantic()
 
     def _prepare_semantic(self):
         try:
-            self.vectorizer = TfidfVectorizer()
+            self.vectorizer = _lazy_import("TfidfVectorizer")()
             docs = []
             self.ids = []
             for s_id, meta in self.manifests.items():
@@ -579,22 +753,104 @@ class HybridMatcher:
     def match(self, command):
         if not self.vectorizer or self.low_power:
             # --- 降维策略：静态正则与关键字匹配 ---
-            cmd_lower = command.lower()
-            for s_id, meta in self.manifests.items():
-                name = meta.get('name', s_id).lower()
-                if name in cmd_lower or s_id.lower() in cmd_lower: return s_id
-                for k in meta.get('keywords', []):
-                    if k.lower() in cmd_lower: return s_id
-            return None
+            if self._keyword_index is None:
+                self._keyword_index = KeywordIndex(
+                    (s_id, [meta.get('name', s_id).lower(), s_id.lower()] + [k.lower() for k in meta.get('keywords', [])])
+                    for s_id, meta in self.manifests.items()
+                )
+            return self._keyword_index.find(command.lower())
         else:
             # --- 高性能策略：TF-IDF 语义余弦相似度 ---
             cmd_vec = self.vectorizer.transform([command])
-            sims = cosine_similarity(cmd_vec, self.matrix)
+            # 行向量已 L2 归一化，稀疏点积即余弦相似度
+            sims = (self.matrix @ cmd_vec.T).toarray().ravel()
             idx = sims.argmax()
-            if sims[0, idx] > 0.3:
+            if sims[idx] > 0.3:
                 return self.ids[idx]
             return None
 
+
+class SubstringIndex:
+    """
+    按子串查找键名的静态索引。
+    构建时把全部键用分隔符拼接成一个字符串并记录各键起始偏移，查询时一次 str.find（C 实现的线性扫描）
+    定位命中位置，再用 bisect 映射回所属的键，避免在 Python 层逐个键做 `query in key`。
+    返回结果与按插入顺序逐个检查 `query in key` 的第一个命中一致。
+    ignore_case 为 True 时键与查询都先 casefold 再比较，返回的仍是原始键。
+    """
+    _SEP = "\x00"
+
+    def __init__(self, keys, ignore_case=False):
+        self.keys = list(keys)
+        self.ignore_case = ignore_case
+        folded = [key.casefold() for key in self.keys] if ignore_case else self.keys
+        self._offsets = []
+        pos = 0
+        for key in folded:
+            self._offsets.append(pos)
+            pos += len(key) + 1
+        self._blob = self._SEP.join(folded)
+
+    def find(self, query):
+        """返回第一个包含 query 的键；query 为空、含分隔符或无命中时返回 None。"""
+        if not query or self._SEP in query:
+            return None
+        if self.ignore_case:
+            query = query.casefold()
+        pos = self._blob.find(query)
+        if pos < 0:
+            return None
+        return self.keys[bisect_right(self._offsets, pos) - 1]
+
+
+class KeywordIndex:
+    """
+    按“文本中出现了哪个关键词”查找所属分组的静态索引（SubstringIndex 的反方向）。
+    构建时把全部关键词按长度降序编译成一个正则分支，查询时用零宽前瞻在 C 层扫描一遍文本，
+    代替在 Python 层对每个分组、每个关键词逐一做 `keyword in text`。
+    由于同一位置只会命中最长的关键词，而此时能命中的其余关键词都是它的前缀，
+    构建时预先记录每个关键词“自身及其前缀关键词”所属的最小分组下标，
+    因此结果与按分组顺序逐个检查 `any(k in text for k in keywords)` 的第一个命中一致。
+    """
+
+    def __init__(self, groups):
+        """groups: 按优先级排列的 (分组, 关键词列表) 序列。"""
+        self.groups = []
+        owner = {}  # 关键词 -> 最早出现的分组下标
+        self._always = None  # 空关键词在任何文本中都成立
+        for index, (group, keywords) in enumerate(groups):
+            self.groups.append(group)
+            for keyword in keywords:
+                if not keyword:
+                    if self._always is None:
+                        self._always = index
+                    continue
+                owner.setdefault(keyword, index)
+
+        self._best = {
+            keyword: min(owner[keyword[:n]] for n in range(1, len(keyword) + 1) if keyword[:n] in owner)
+            for keyword in owner
+        }
+        if owner:
+            alternation = "|".join(re.escape(k) for k in sorted(owner, key=len, reverse=True))
+            # 先用首字符集合过滤位置，绝大多数位置无需尝试整个分支
+            first_chars = "".join(sorted({re.escape(k[0]) for k in owner}))
+            self._pattern = re.compile(f"(?=[{first_chars}])(?=({alternation}))")
+        else:
+            self._pattern = None
+
+    def find(self, text):
+        """返回第一个有关键词出现在 text 中的分组；无命中时返回 None。"""
+        best = self._always
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                index = self._best[match.group(1)]
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+        return None if best is None else self.groups[best]
+
 # 8. LDST (Lightweight Dynamic Shadow-Topology Tree) Algorithm
 class LDSTResolver:
     """
@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import importlib
 import logging
+import sys
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
@@ -51,6 +52,8 @@ class CapabilityReporter:
     }
 
     def _check_module(self, mod_name: str) -> bool:
+        if sys.modules.get(mod_name) is not None:
+            return True
         try:
             importlib.import_module(mod_name)
             return True
@@ -40,6 +40,11 @@ class EventBus:
                 self._subscribers[event_type].remove(callback)
                 logger.debug(f"Unsubscribed {callback} from {event_type}")
 
+    def has_subscribers(self, event_type) -> bool:
+        """是否有回调订阅了该事件，供发送方跳过无人接收的事件。"""
+        with self._lock:
+            return bool(self._subscribers.get(event_type))
+
     def emit(self, event_type, *args, **kwargs):
         """
         同步发射事件：所有回调在当前线程顺序执行。
@@ -2,7 +2,9 @@ import os
 import sys
 import importlib.util
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional
 from butler.core.memory.PluginManager import PluginManager
 from butler.code_execution_manager import CodeExecutionManager
 from butler.data_storage import data_storage_manager
@@ -10,6 +12,9 @@ from package.core_utils.log_manager import LogManager
 
 logger = LogManager.get_logger(__name__)
 
+# 并行加载包脚本的线程数上限
+_SCAN_WORKERS = min(8, os.cpu_count() or 1)
+
 class ExtensionManager:
     """
     统一管理插件、包和外部程序。
@@ -19,6 +24,8 @@ class ExtensionManager:
         self.code_execution_manager = CodeExecutionManager(programs_dir)
         self.package_dir = package_dir
         self.packages: Dict[str, Any] = {}
+        # 包名 -> 已解析的 run 函数，执行时无需再次查找模块属性
+        self._package_runners: Dict[str, Callable[..., Any]] = {}
 
         self.scan_all()
 
@@ -29,11 +36,16 @@ class ExtensionManager:
         self._scan_packages()
 
     def _scan_packages(self):
-        """扫描包目录及其子目录中带有 run() 函数的简单 Python 脚本。"""
+        """
+        扫描包目录及其子目录中带有 run() 函数的简单 Python 脚本。
+        各脚本互相独立，加载时大量时间花在读取源码/字节码和导入第三方库的 I/O 上，
+        因此并行执行模块，再按目录遍历顺序单线程登记结果，保证同名脚本的覆盖顺序不变。
+        """
         if not os.path.exists(self.package_dir):
             logger.warning(f"Package directory '{self.package_dir}' not found.")
             return
 
+        candidates = []
         for root, dirs, files in os.walk(self.package_dir):
             # 忽略私有目录和特殊目录
             if "__pycache__" in root or ".git" in root:
@@ -41,24 +53,37 @@ class ExtensionManager:
 
             for filename in files:
                 if filename.endswith(".py") and filename != "__init__.py":
-                    package_name = filename[:-3]
-                    package_path = os.path.join(root, filename)
-
-                    try:
-                        spec = importlib.util.spec_from_file_location(package_name, package_path)
-                        if spec is None: continue
-
-                        module = importlib.util.module_from_spec(spec)
-                        # 将包添加到 sys.modules 以支持相对导入，但由于这是动态发现，
-                        # 我们使用更安全的方式尝试加载
-                        spec.loader.exec_module(module)
+                    candidates.append((filename[:-3], os.path.join(root, filename)))
 
-                        if hasattr(module, "run"):
-                            self.packages[package_name] = module
-                            logger.info(f"Loaded package: {package_name} from {package_path}")
-                    except Exception as e:
-                        # 记录详细错误但不要让它中断整个扫描过程
-                        logger.debug(f"Skipping package {package_name} due to load error: {e}")
+        if not candidates:
+            return
+        with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, len(candidates)), thread_name_prefix="package-scan") as pool:
+            modules = list(pool.map(lambda c: self._load_package_module(*c), candidates))
+
+        for (package_name, package_path), module in zip(candidates, modules):
+            run = getattr(module, "run", None)
+            if run is not None:
+                self.packages[package_name] = module
+                self._package_runners[package_name] = run
+                logger.info(f"Loaded package: {package_name} from {package_path}")
+
+    @staticmethod
+    def _load_package_module(package_name: str, package_path: str):
+        """执行单个包脚本并返回模块对象；加载失败返回 None。"""
+        try:
+            spec = importlib.util.spec_from_file_location(package_name, package_path)
+            if spec is None:
+                return None
+
+            module = importlib.util.module_from_spec(spec)
+            # 将包添加到 sys.modules 以支持相对导入，但由于这是动态发现，
+            # 我们使用更安全的方式尝试加载
+            spec.loader.exec_module(module)
+            return module
+        except Exception as e:
+            # 记录详细错误但不要让它中断整个扫描过程
+            logger.debug(f"Skipping package {package_name} due to load error: {e}")
+            return None
 
     def get_all_tools(self) -> List[Dict[str, Any]]:
         """
@@ -109,9 +134,9 @@ class ExtensionManager:
             return plugin.run(command, kwargs.get("args", {}))
 
         # 尝试包
-        if name in self.packages:
-            module = self.packages[name]
-            return module.run(*args, **kwargs)
+        run = self._package_runners.get(name)
+        if run is not None:
+            return run(*args, **kwargs)
 
         # 尝试外部程序
         program = self.code_execution_manager.get_program(name)
@@ -121,4 +146,23 @@ class ExtensionManager:
 
         raise ValueError(f"Extension '{name}' not found.")
 
-extension_manager = ExtensionManager()
+# 延迟创建：构造时会扫描 programs/package 目录，不应在导入阶段执行
+_extension_manager: Optional[ExtensionManager] = None
+_extension_manager_lock = threading.Lock()
+
+
+def get_extension_manager() -> ExtensionManager:
+    """返回全局 ExtensionManager 实例，首次调用时才创建并扫描。"""
+    global _extension_manager
+    if _extension_manager is None:
+        with _extension_manager_lock:
+            if _extension_manager is None:
+                _extension_manager = ExtensionManager()
+    return _extension_manager
+
+
+def __getattr__(name: str):
+    # 兼容旧的 `from butler.core.extension_manager import extension_manager` 写法
+    if name == "extension_manager":
+        return get_extension_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,26 @@
+"""
+JSON 编解码的统一入口。
+安装 orjson 时使用其 C 实现，否则回退到标准库 json，调用方无需关心差异。
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """解析 JSON 文本，接受 str 或 bytes。解析失败抛出 ValueError 的子类。"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    """序列化为 UTF-8 编码的 JSON 字节串，可直接作为 HTTP 请求体。"""
+    if orjson is not None:
+        # 与标准库一致，允许非字符串字典键
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
@@ -16,6 +16,8 @@ class HabitManager:
         self._project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self._habits_md_path = os.path.join(self._project_root, "data", "HABITS.md")
         self._profile: Dict[str, Any] = self._load_profile()
+        # Bumped on every profile change so prompt caches know when to rebuild
+        self.version = 0
         self._sync_to_markdown()
 
     def _load_profile(self) -> Dict[str, Any]:
@@ -34,6 +36,7 @@ class HabitManager:
 
     def save_profile(self):
         """Saves the current profile to persistent storage and syncs to Markdown."""
+        self.version += 1
         data_storage_manager.save(self._plugin_name, self._profile_key, self._profile)
         self._sync_to_markdown()
 
@@ -84,6 +87,7 @@ class HabitManager:
             "interaction_style": "default",
             "last_updated": 0
         }
+        self.version += 1
         data_storage_manager.delete(self._plugin_name, self._profile_key)
         self._logger.info("User habit profile has been reset.")
 
@@ -95,20 +95,35 @@ def list_processes() -> Dict[str, Any]:
             continue
     return {"processes": processes}
 
+_SEARCH_SKIP = (".git", "/proc", "/sys", "/dev")
+_SEARCH_LIMIT = 100
+
 def fast_file_search(root: str, pattern: str) -> Dict[str, Any]:
-    """Python implementation of file searching."""
+    """
+    Python implementation of file searching.
+    Breadth-first os.scandir walk: DirEntry type checks reuse the d_type from the
+    directory listing (no extra stat per entry), skipped trees are pruned before
+    descending, and the walk stops as soon as the result limit is reached.
+    """
     import os
+    from collections import deque
     files = []
-    for r, d, f in os.walk(root):
-        if any(skip in r for skip in [".git", "/proc", "/sys", "/dev"]):
+    if any(skip in root for skip in _SEARCH_SKIP):
+        return {"files": files, "count": 0}
+    pending = deque([root])
+    while pending and len(files) < _SEARCH_LIMIT:
+        try:
+            with os.scandir(pending.popleft()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not any(skip in entry.path for skip in _SEARCH_SKIP):
+                            pending.append(entry.path)
+                    elif pattern in entry.name and entry.is_file():
+                        files.append(entry.path)
+                        if len(files) >= _SEARCH_LIMIT:
+                            break
+        except OSError:
             continue
-        for file in f:
-            if pattern in file:
-                files.append(os.path.join(r, file))
-                if len(files) >= 100:
-                    break
-        if len(files) >= 100:
-            break
     return {"files": files, "count": len(files)}
 
 def benchmark(url: str, count: int, concurrency: int) -> Dict[str, Any]:
@@ -12,8 +12,11 @@ class HybridLinkClient:
     """
     Client for communicating with multi-language modules via the BHL protocol.
     """
-    def __init__(self, executable_path: str, cwd: Optional[str] = None, fallback_enabled: bool = True):
+    def __init__(self, executable_path: str, cwd: Optional[str] = None, fallback_enabled: bool = True,
+                 command: Optional[List[str]] = None):
         self.executable_path = executable_path
+        # Full argv to spawn instead of [executable_path], e.g. an interpreter plus a script.
+        self.command = command
         self.cwd = cwd
         self.process = None
         self.logger = logging.getLogger(f"HybridLink.{uuid.uuid4().hex[:8]}")
@@ -30,14 +33,14 @@ class HybridLinkClient:
 
     def start(self):
         """Starts the external process."""
-        if not os.path.isfile(self.executable_path):
+        if self.command is None and not os.path.isfile(self.executable_path):
             self.logger.error(f"Executable not found: {self.executable_path}")
             return False
 
         try:
             # Use shell=False (default) for security. Arguments are passed as a list.
             self.process = subprocess.Popen(
-                [self.executable_path],
+                self.command or [self.executable_path],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -141,12 +144,14 @@ class HybridLinkClient:
         :param timeout: 超时时间（秒）
         :param wait: 是否等待响应
         :param priority: 任务优先级（由支持优先级队列的后端处理）
+        请求未能写入模块时，返回的错误字典带 "sent": False，调用方可以安全地改用其他方式重试；
+        其他错误（如超时）发生时模块可能已经执行了请求。
         """
         if not self.process or not self._running:
             if self.fallback_enabled:
                 self.logger.info(f"正在为方法 {method} 使用 Python 回退方案")
                 return dispatch_fallback(method, params)
-            return {"error": {"message": "进程未启动且已禁用回退方案"}}
+            return {"error": {"message": "进程未启动且已禁用回退方案"}, "sent": False}
 
         req_id = str(uuid.uuid4())
         request = {
@@ -167,10 +172,10 @@ class HybridLinkClient:
                     self.process.stdin.write(json.dumps(request) + "\n")
                     self.process.stdin.flush()
                 else:
-                    return {"error": {"message": "Stdin not available"}}
+                    return {"error": {"message": "Stdin not available"}, "sent": False}
             except Exception as e:
                 if wait: self._pending_requests.pop(req_id, None)
-                return {"error": {"message": f"Failed to send request: {e}"}}
+                return {"error": {"message": f"Failed to send request: {e}"}, "sent": False}
 
         if not wait:
             return None
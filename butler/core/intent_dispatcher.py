@@ -4,7 +4,7 @@ import logging
 import time
 import concurrent.futures
 from collections import defaultdict, deque
-from functools import wraps
+from typing import Callable
 
 from . import algorithms
 
@@ -21,8 +21,14 @@ _RATE_LIMIT_MAX_CALLS = 60     # 每窗口最大调用次数
 class IntentRegistry:
     """用于动态发现和调度意图处理程序的注册表，内置弹性层。"""
 
+    # 未注册意图的共享默认条目，避免每次查询都分配空字典
+    _DEFAULT_INTENT = {"function": None, "docstring": None, "requires_entities": True}
+
     def __init__(self):
         self._intents = {}
+        # 意图名 → 处理函数的扁平映射，分发热路径只需一次字典查找
+        self._handlers: dict[str, Callable] = {}
+        self._docstrings: dict[str, str] | None = None
         self._llm_handlers: dict[str, dict] = {}
         self._local_handlers: dict[str, dict] = {}
         # 弹性层状态
@@ -50,15 +56,13 @@ class IntentRegistry:
                 "source": source,
             }
             self._intents[intent_name] = entry
+            self._handlers[intent_name] = func
+            self._docstrings = None
             if source == "llm":
                 self._llm_handlers[intent_name] = entry
             else:
                 self._local_handlers[intent_name] = entry
-
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
-            return wrapper
+            return func
         return decorator
 
     def dispatch(self, intent_name: str, **kwargs):
@@ -72,18 +76,21 @@ class IntentRegistry:
         返回:
             处理程序函数的结果，如果未找到意图，则返回 None。
         """
-        intent = self._intents.get(intent_name)
-        if not intent:
+        handler = self._handlers.get(intent_name)
+        if handler is None:
             logger.warning(f"Intent '{intent_name}' not found in registry.")
             return None
 
-        handler = intent["function"]
         try:
             return handler(**kwargs)
         except Exception as e:
             logger.error(f"Error executing intent '{intent_name}': {e}", exc_info=True)
             return None
 
+    def get_handler(self, intent_name: str):
+        """返回意图对应的处理函数，未注册时返回 None。"""
+        return self._handlers.get(intent_name)
+
     def dispatch_by_llm_intent(self, intent_name: str, **kwargs):
         """
         专用分发入口：处理 LLM 返回的 intent 名。
@@ -174,13 +181,19 @@ class IntentRegistry:
             self._failure_counts.clear()
             logger.info("所有熔断器已手动重置")
 
+    def _get_docstrings(self) -> dict[str, str]:
+        """返回缓存的意图文档字符串映射，注册新意图后重建。"""
+        if self._docstrings is None:
+            self._docstrings = {name: data["docstring"] for name, data in self._intents.items()}
+        return self._docstrings
+
     def get_all_intents(self):
         """返回所有已注册意图及其文档字符串的字典。"""
-        return {name: data["docstring"] for name, data in self._intents.items()}
+        return dict(self._get_docstrings())
 
     def intent_requires_entities(self, intent_name: str) -> bool:
         """检查给定意图是否需要实体。"""
-        return self._intents.get(intent_name, {}).get("requires_entities", True)
+        return self._intents.get(intent_name, self._DEFAULT_INTENT)["requires_entities"]
 
     def match_intent_locally(self, command: str, threshold: float = 0.7):
         """
@@ -193,7 +206,7 @@ class IntentRegistry:
         返回:
             str: 最佳匹配意图的名称，如果未找到匹配，则返回 None。
         """
-        intents = self.get_all_intents()
+        intents = self._get_docstrings()
         if not intents:
             return None
 
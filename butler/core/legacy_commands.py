@@ -3,12 +3,50 @@
 import datetime
 import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from . import algorithms
 from .intent_dispatcher import register_intent
 
 # tmd要是中考分不那么低一中就去了，也就能早读了
 
+# 重复的斐波那契查询直接命中缓存
+_cached_fibonacci = lru_cache(maxsize=1024)(algorithms.fibonacci)
+
+# 少于该长度的数字列表直接用内置 sorted：构造 numpy 数组的固定开销在小输入上超过排序本身
+_NUMPY_SORT_MIN_SIZE = 32
+
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _as_sorted_array(numbers):
+    """
+    长列表转为已排序的 numpy 数组；无 numpy、列表较短，或元素不全是 int64 范围内的整数、
+    也不全是浮点数时返回 None。混合 int/float 会被转成 float64，播报时整数变成 1.0，
+    超过 2**53 的整数还会丢失精度，这类输入交给内置 sorted。
+    """
+    if np is None or len(numbers) < _NUMPY_SORT_MIN_SIZE:
+        return None
+    kinds = {type(n) for n in numbers}
+    if kinds == {int}:
+        if min(numbers) < _INT64_MIN or max(numbers) > _INT64_MAX:
+            return None
+        return np.sort(np.array(numbers, dtype=np.int64))
+    if kinds == {float}:
+        return np.sort(np.array(numbers, dtype=np.float64))
+    return None
+
+
+# 图像处理等耗时任务的共享线程池，避免阻塞意图分发线程
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="legacy-io")
+
 # 注意：这些函数旨在通过意图分发器动态传递的关键字参数调用。
 # `jarvis_app` 参数是一个特殊情况，由分发器注入，以提供
 # 对主应用程序实例的访问（用于 `speak` 和 `ui_print` 等方法）。
@@ -19,10 +57,17 @@ def handle_sort_numbers(jarvis_app, entities, **kwargs):
     """对 'numbers' 实体中提供的数字列表进行排序。"""
     try:
         numbers = entities.get("numbers", [])
-        if not numbers or not all(isinstance(n, (int, float)) for n in numbers):
+        if not numbers:
             jarvis_app.speak("排序失败，请提供有效的数字列表。")
             return
-        sorted_nums = algorithms.quick_sort(numbers)
+        arr = _as_sorted_array(numbers)
+        if arr is not None:
+            sorted_nums = arr.tolist()
+        else:
+            if not all(isinstance(n, (int, float)) for n in numbers):
+                jarvis_app.speak("排序失败，请提供有效的数字列表。")
+                return
+            sorted_nums = sorted(numbers)
         jarvis_app.speak(f"排序结果: {sorted_nums}")
     except Exception as e:
         jarvis_app.speak(f"排序时发生错误: {e}")
@@ -38,8 +83,8 @@ def handle_find_number(jarvis_app, entities, **kwargs):
             jarvis_app.speak("查找失败，请提供数字列表和目标数字。")
             return
 
-        numbers.sort()
-        index = algorithms.binary_search(numbers, target)
+        arr = _as_sorted_array(numbers)
+        index = algorithms.binary_search(arr if arr is not None else sorted(numbers), target)
         if index != -1:
             jarvis_app.speak(f"数字 {target} 在排序后的位置是: {index}")
         else:
@@ -56,7 +101,7 @@ def handle_calculate_fibonacci(jarvis_app, entities, **kwargs):
         if n is None or not isinstance(n, int):
             jarvis_app.speak("计算失败，请输入一个有效的整数。")
             return
-        fib = algorithms.fibonacci(n)
+        fib = _cached_fibonacci(n)
         jarvis_app.speak(f"斐波那契数列第{n}项是: {fib}")
     except Exception as e:
         jarvis_app.speak(f"计算斐波那契数时出错: {e}")
@@ -65,15 +110,19 @@ def handle_calculate_fibonacci(jarvis_app, entities, **kwargs):
 @register_intent("edge_detect_image")
 def handle_edge_detect_image(jarvis_app, entities, **kwargs):
     """检测给定文件路径图像中的边缘并保存结果。"""
-    try:
-        import cv2
+    image_path = entities.get("path")
+    if not image_path or not isinstance(image_path, str):
+        jarvis_app.speak("图像处理失败，请提供有效的路径。")
+        return
 
-        image_path = entities.get("path")
-        if not image_path or not isinstance(image_path, str):
-            jarvis_app.speak("图像处理失败，请提供有效的路径。")
-            return
+    if not os.path.exists(image_path):
+        jarvis_app.speak("找不到指定的图像文件。")
+        return
+
+    def run_edge_detect():
+        try:
+            import cv2
 
-        if os.path.exists(image_path):
             edges = algorithms.edge_detection(image_path)
             if edges is not None:
                 output_path = os.path.splitext(image_path)[0] + "_edges.jpg"
@@ -81,10 +130,11 @@ def handle_edge_detect_image(jarvis_app, entities, **kwargs):
                 jarvis_app.speak(f"边缘检测完成，结果已保存到: {output_path}")
             else:
                 jarvis_app.speak("图像处理失败，无法读取图片。")
-        else:
-            jarvis_app.speak("找不到指定的图像文件。")
-    except Exception as e:
-        jarvis_app.speak(f"图像处理时出错: {e}")
+        except Exception as e:
+            jarvis_app.speak(f"图像处理时出错: {e}")
+
+    # OpenCV 在 C++ 中释放 GIL，放到线程池执行不会阻塞后续语音指令
+    _IO_POOL.submit(run_edge_detect)
 
 
 @register_intent("text_similarity")
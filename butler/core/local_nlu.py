@@ -6,6 +6,30 @@ from butler.core.skill_manager import SkillManager
 
 logger = logging.getLogger("LocalNLU")
 
+# 高频且句式固定的命令合并为一个整句匹配的正则，命名分组对应意图；
+# 命中时无论是否配置了 AI 都直接本地分发，省去一次 LLM 往返
+_FAST_PATH_RE = re.compile(
+    r"^(?:"
+    r"(?:排序|sort)\s*[:：]?\s*\[?\s*(?P<sort_numbers>-?\d+(?:\.\d+)?(?:\s*[,，\s]\s*-?\d+(?:\.\d+)?)+)\s*\]?"
+    r"|(?:斐波那契(?:数列)?|fibonacci|fib)\s*第?\s*(?P<calculate_fibonacci>\d+)\s*项?"
+    r"|(?P<get_current_time>现在几点了?|几点了|现在时间|what time is it|current time)"
+    r")\s*[?？.。!！]?$",
+    re.IGNORECASE,
+)
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _parse_number(token: str):
+    return float(token) if "." in token else int(token)
+
+
+# 命名分组 -> 由匹配文本构造实体
+_FAST_PATH_ENTITIES = {
+    "sort_numbers": lambda s: {"numbers": [_parse_number(t) for t in _NUMBER_RE.findall(s)]},
+    "calculate_fibonacci": lambda s: {"number": int(s)},
+    "get_current_time": lambda s: {},
+}
+
 class LocalNLU:
     """
     不需要 AI 驱动的本地 NLU 引擎。
@@ -14,6 +38,17 @@ class LocalNLU:
     def __init__(self, skill_manager: SkillManager):
         self.skill_manager = skill_manager
 
+    def match_fast_path(self, text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        整句匹配高频固定句式，命中时返回 (intent_id, entities)，否则返回 None。
+        只覆盖能从文本中完整提取实体的命令，其余交给 LLM 或相似度匹配。
+        """
+        m = _FAST_PATH_RE.match(text.strip())
+        if m is None:
+            return None
+        intent_id = m.lastgroup
+        return intent_id, _FAST_PATH_ENTITIES[intent_id](m.group(intent_id))
+
     def extract_intent(self, text: str) -> Tuple[Optional[str], Dict[str, Any], str]:
         """
         尝试从文本中提取意图。
@@ -22,6 +57,11 @@ class LocalNLU:
         """
         text = text.strip()
 
+        # 0. 固定句式快速路径
+        fast = self.match_fast_path(text)
+        if fast:
+            return fast[0], fast[1], 'intent'
+
         # 1. 尝试匹配已注册的 Legacy Intents (使用相似度或关键词)
         intent_id = intent_registry.match_intent_locally(text, threshold=0.8)
         if intent_id:
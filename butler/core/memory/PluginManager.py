@@ -1,5 +1,6 @@
 import importlib
 import importlib.util
+import sys
 import pkgutil
 import inspect
 import ast
@@ -76,7 +77,7 @@ class PluginManager:
                 self.logger.error(f"Plugin {module_name} failed safety check, skipping.")
                 return
 
-            module = importlib.import_module(module_name)
+            module = sys.modules.get(module_name) or importlib.import_module(module_name)
             for attribute_name in dir(module):
                 attribute = getattr(module, attribute_name)
                 if (inspect.isclass(attribute) and 
@@ -90,7 +91,8 @@ class PluginManager:
     def load_plugin(self, module_name: str, class_name: str) -> Optional[AbstractPlugin]:
         """Loads a single plugin from the given module and class name."""
         try:
-            module = importlib.import_module(module_name)
+            # Called once per plugin class right after the module was imported, so it is usually cached
+            module = sys.modules.get(module_name) or importlib.import_module(module_name)
             plugin_class: Type[AbstractPlugin] = getattr(module, class_name)
             plugin_instance = plugin_class()
             
@@ -11,7 +11,7 @@ from abc import ABCMeta, abstractmethod
 from typing import List, Dict, Optional, Tuple, Any
 
 from package.core_utils.log_manager import LogManager
-from package.core_utils.embedding_utils import get_embedding
+from package.core_utils.embedding_utils import get_embedding, quantize_int8, int8_cosine_similarities
 
 # 可选依赖项处理
 try:
@@ -19,6 +19,11 @@ try:
 except ImportError:
     np = None
 
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 try:
     import redis
     from redisvl.index import SearchIndex
@@ -41,6 +46,17 @@ try:
 except (ImportError, ModuleNotFoundError):
     HybridLinkClient = None
 
+# 元数据列的解码器：安装 msgspec 时使用按 dict 类型特化的解码器，避免通用 json 解析开销
+_metadata_decoder = msgspec.json.Decoder(Optional[dict]) if msgspec is not None else None
+
+
+def _decode_metadata(raw) -> Optional[dict]:
+    """解析持久化的元数据 JSON（str 或 bytes）。"""
+    if _metadata_decoder is not None:
+        return _metadata_decoder.decode(raw)
+    return json.loads(raw)
+
+
 class LongMemoryItem:
     """
     表示一条长期记忆的数据项（事实数据）。
@@ -207,13 +223,13 @@ class SQLiteLongMemory(AbstractLongMemory):
                 cursor.execute(query, (clean_text, n))
                 rows = cursor.fetchall()
                 # bm25 越小越好，此处映射为相似度得分（取负值以便降序排列）
-                items = [LongMemoryItem.new(id=r[0], content=r[1], metadata=json.loads(r[2]), distance=-float(r[3])) for r in rows]
+                items = [LongMemoryItem.new(id=r[0], content=r[1], metadata=_decode_metadata(r[2]), distance=-float(r[3])) for r in rows]
         except: pass
 
         if not items:
             # 降级到 LIKE 搜索
             cursor.execute(f"SELECT id, content, metadata FROM {t} WHERE content LIKE ? LIMIT ?", (f"%{text}%", n))
-            items = [LongMemoryItem.new(id=r[0], content=r[1], metadata=json.loads(r[2]), distance=0.0) for r in cursor.fetchall()]
+            items = [LongMemoryItem.new(id=r[0], content=r[1], metadata=_decode_metadata(r[2]), distance=0.0) for r in cursor.fetchall()]
 
         with self._lock:
             if len(self._cache) >= self._cache_size: self._cache.pop(next(iter(self._cache)))
@@ -230,13 +246,13 @@ class SQLiteLongMemory(AbstractLongMemory):
         if not self._conn: return []
         cursor = self._conn.cursor()
         cursor.execute(f"SELECT id, content, metadata FROM {t} ORDER BY rowid DESC LIMIT ?", (n,))
-        return [LongMemoryItem.new(id=r[0], content=r[1], metadata=json.loads(r[2]), distance=0.0) for r in cursor.fetchall()]
+        return [LongMemoryItem.new(id=r[0], content=r[1], metadata=_decode_metadata(r[2]), distance=0.0) for r in cursor.fetchall()]
 
     def export_data(self) -> List[dict]:
         t = f'"{self._collection_name}"'
         if not self._conn: return []
         cursor = self._conn.cursor(); cursor.execute(f"SELECT id, content, metadata FROM {t}")
-        return [{"id": r[0], "content": r[1], "metadata": json.loads(r[2])} for r in cursor.fetchall()]
+        return [{"id": r[0], "content": r[1], "metadata": _decode_metadata(r[2])} for r in cursor.fetchall()]
 
     def import_data(self, data: List[dict]):
         items = [LongMemoryItem.new(id=d["id"], content=d["content"], metadata=d["metadata"]) for d in data]
@@ -271,7 +287,7 @@ class RedisLongMemory(AbstractLongMemory):
         emb = get_embedding(text, self._api_key)
         if emb is None: return []
         results = self.index.query(VectorQuery(vector=emb.tobytes(), vector_field_name="embedding", return_fields=["id","content","metadata","vector_distance"], num_results=n))
-        return [LongMemoryItem.new(id=d["id"], content=d["content"], metadata=json.loads(d["metadata"]), distance=1.0 - float(d["vector_distance"])) for d in results]
+        return [LongMemoryItem.new(id=d["id"], content=d["content"], metadata=_decode_metadata(d["metadata"]), distance=1.0 - float(d["vector_distance"])) for d in results]
 
     def delete(self, ids):
         for i in ids: self.client.delete(f"{self._col}:{i}"); self.client.zrem(f"{self._col}:history", i)
@@ -281,7 +297,7 @@ class RedisLongMemory(AbstractLongMemory):
         for i in ids:
             sid = i.decode() if isinstance(i, bytes) else i
             d = self.client.hgetall(f"{self._col}:{sid}")
-            if d: items.append(LongMemoryItem.new(id=sid, content=d.get(b"content", b"").decode(), metadata=json.loads(d.get(b"metadata", b"{}").decode()), distance=0))
+            if d: items.append(LongMemoryItem.new(id=sid, content=d.get(b"content", b"").decode(), metadata=_decode_metadata(d.get(b"metadata", b"{}")), distance=0))
         return items
     def export_data(self): return []
     def import_data(self, data):
@@ -317,7 +333,7 @@ class ZvecLongMemory(AbstractLongMemory):
         if emb is None: return []
         query = zvec.VectorQuery(field_name="embedding", vector=emb.tolist())
         results = self.collection.query(vectors=query, topk=n)
-        return [LongMemoryItem.new(id=d.id, content=d.field("content"), metadata=json.loads(d.field("metadata")), distance=d.score) for d in results]
+        return [LongMemoryItem.new(id=d.id, content=d.field("content"), metadata=_decode_metadata(d.field("metadata")), distance=d.score) for d in results]
 
     def delete(self, ids): pass
     def get_recent_history(self, n): return []
@@ -340,14 +356,15 @@ class DeepSeekLongMemory(AbstractLongMemory):
             emb = get_embedding(item.content, self._api_key)
             if emb is not None:
                 self._memory[item.id] = item
-                self._embeddings[item.id] = emb
+                # 以 int8 量化形式保存，检索时直接在 int8 上计算余弦相似度
+                self._embeddings[item.id] = quantize_int8(emb)
 
     def search(self, text, n, filter=None) -> List[LongMemoryItem]:
         query_emb = get_embedding(text, self._api_key)
         if query_emb is None or not self._embeddings: return []
         candidate_ids = list(self._memory.keys())
-        c_embs = np.array([self._embeddings[cid] for cid in candidate_ids])
-        sims = np.dot(c_embs, query_emb) / (np.linalg.norm(c_embs, axis=1) * np.linalg.norm(query_emb))
+        c_embs = np.stack([self._embeddings[cid] for cid in candidate_ids])
+        sims = int8_cosine_similarities(quantize_int8(query_emb), c_embs)
         top_indices = np.argsort(sims)[-n:][::-1]
         results = []
         for i in top_indices:
@@ -1,17 +1,46 @@
 import os
 import json
+import hashlib
 import requests
 import logging
-from typing import Dict, Any, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, Dict, Any, List, Optional
 from package.core_utils.log_manager import LogManager
 from package.core_utils.config_loader import config_loader
 from package.core_utils.quota_manager import quota_manager
 from butler.core.habit_manager import habit_manager
 from butler.core.config_manager import config_manager
 from butler.core.config_model import PROVIDER_DEFAULTS, PROVIDER_KEY_PATHS
+from butler.core import fast_json
+from butler.core.response_cache import ResponseCache
 
 logger = LogManager.get_logger(__name__)
 
+# (连接超时, 读取超时)；读取超时需覆盖非流式长回复的生成时间
+_REQUEST_TIMEOUT = (3, 60)
+
+# 连接失败与限流/网关错误时指数退避重试（0.5s、1s、2s）。读取超时不重试，避免重复计费；
+# 最终仍失败时返回原响应，由调用方的 raise_for_status 处理
+_RETRY = Retry(
+    total=3,
+    connect=3,
+    read=0,
+    status=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset({"POST"}),
+    raise_on_status=False,
+)
+
+# extract_intent 结果缓存：条目上限与存活时间（秒）
+_INTENT_CACHE_SIZE = 512
+_INTENT_CACHE_TTL = 600
+
+# generate_general_response 结果缓存：只复用完全相同的提问
+_RESPONSE_CACHE_SIZE = 256
+_RESPONSE_CACHE_TTL = 300
+
 
 def _resolve_ai_config(provided_api_key: str = None) -> Dict[str, str]:
     """解析 AI 配置：provider、base_url、model_name、api_key。"""
@@ -56,7 +85,10 @@ def _resolve_ai_config(provided_api_key: str = None) -> Dict[str, str]:
 
 
 class NLUService:
-    def __init__(self, api_key: str, prompts: Dict[str, Any]):
+    def __init__(self, api_key: str, prompts: Dict[str, Any], redis_client=None):
+        """
+        redis_client: 可选的 Redis 客户端，提供时意图与回复缓存在重启与多实例间共享；默认只用进程内缓存。
+        """
         self.prompts = prompts
 
         # 根据 provider 动态解析配置
@@ -75,8 +107,37 @@ class NLUService:
             self.provider, PROVIDER_DEFAULTS["deepseek"]
         )["key_env"]
 
+        # 复用 TCP/TLS 连接，避免每次调用都重新握手
+        self._session = requests.Session()
+        self._session.headers.update({"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=_RETRY)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # base_prompt_key -> (习惯画像版本, 拼接好的系统提示词)
+        self._prompt_cache: Dict[str, tuple[int, str]] = {}
+
+        # 缓存作用域都带上 provider、接口地址与模型，切换模型后不会复用旧模型的结果
+        self._cache_namespace = f"{self.provider}\x1f{self.url}\x1f{self.model_name}"
+        # 作用域另含系统提示词与历史指纹
+        self._intent_cache = ResponseCache(_INTENT_CACHE_SIZE, _INTENT_CACHE_TTL,
+                                           redis_client=redis_client, redis_prefix="butler:nlu:intent")
+        # 作用域另含系统提示词，习惯画像更新后旧回答自然失效
+        self._response_cache = ResponseCache(_RESPONSE_CACHE_SIZE, _RESPONSE_CACHE_TTL,
+                                             redis_client=redis_client, redis_prefix="butler:nlu:response")
+
     def _get_augmented_system_prompt(self, base_prompt_key: str) -> str:
         """Augments the system prompt with the current user habit profile."""
+        version = habit_manager.version
+        cached = self._prompt_cache.get(base_prompt_key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        prompt = self._build_augmented_system_prompt(base_prompt_key)
+        self._prompt_cache[base_prompt_key] = (version, prompt)
+        return prompt
+
+    def _build_augmented_system_prompt(self, base_prompt_key: str) -> str:
+        """Renders the system prompt; only called when the habit profile has changed."""
         base_prompt = self.prompts.get(base_prompt_key, {}).get("prompt", "")
         habit_summary = habit_manager.get_profile_summary()
 
@@ -113,6 +174,74 @@ class NLUService:
                 return True
         return False
 
+    @staticmethod
+    def _read_stream(response, on_delta: Optional[Callable[[str], None]] = None) -> tuple[str, int]:
+        """
+        逐行解析 SSE 流式响应，拼接增量内容；提供 on_delta 时每个增量到达即回调。
+
+        返回:
+            (完整回复文本, 消耗的 token 总数)；usage 随最后一个数据块下发。
+        """
+        parts = []
+        total_tokens = 0
+        try:
+            for line in response.iter_lines():
+                if not line or not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = fast_json.loads(data)
+                usage = chunk.get("usage") or {}
+                total_tokens = usage.get("total_tokens", total_tokens)
+                for choice in chunk.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        parts.append(content)
+                        if on_delta is not None:
+                            on_delta(content)
+        finally:
+            response.close()
+        return "".join(parts), total_tokens
+
+    def _cache_scope(self, *parts: str) -> str:
+        """把模型命名空间与给定上下文压缩成短摘要，作为缓存作用域。"""
+        digest = hashlib.blake2b(self._cache_namespace.encode("utf-8"), digest_size=8)
+        for part in parts:
+            digest.update(f"\x1e{part}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _read_reply(self, response, on_delta: Optional[Callable[[str], None]] = None) -> tuple[str, int]:
+        """
+        读取对话补全响应：SSE 流逐段解析；忽略 stream 参数、直接返回 JSON 的后端按普通响应解析，
+        此时 on_delta 一次性收到完整回复。返回 (回复文本, token 总数，未下发 usage 时为 0)。
+        """
+        if "text/event-stream" in response.headers.get("Content-Type", ""):
+            return self._read_stream(response, on_delta)
+        try:
+            resp_json = fast_json.loads(response.content)
+        finally:
+            response.close()
+        content = resp_json['choices'][0]['message']['content']
+        if on_delta is not None and content:
+            on_delta(content)
+        return content, (resp_json.get('usage') or {}).get('total_tokens', 0)
+
+    def _charge_quota(self, messages: List[Dict[str, Any]], reply: str, total_tokens: int) -> None:
+        """按 usage 扣减额度；流式响应未带 usage 时按请求与回复的估算值扣减，避免绕过额度限制。"""
+        if total_tokens <= 0:
+            total_tokens = self.estimate_tokens(messages) + len(reply) // 3
+        if total_tokens > 0:
+            quota_manager.update_usage(total_tokens)
+
+    @staticmethod
+    def _history_fingerprint(history_messages: List[Dict[str, Any]]) -> str:
+        """计算对话历史的短摘要，作为意图缓存键的一部分。"""
+        digest = hashlib.blake2b(digest_size=8)
+        for message in history_messages:
+            digest.update(f"{message['role']}\x1f{message['content']}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
     def extract_intent(self, text: str, history: List[Any] = None) -> Dict[str, Any]:
         """使用 DeepSeek API 从用户文本中提取意图和实体。"""
         # 1. Input-side Prompt Injection Filter
@@ -123,48 +252,51 @@ class NLUService:
         if not self.api_key or "YOUR_" in self.api_key:
              return {"intent": "unknown", "entities": {"error": f"{self._provider_display} API Key missing or placeholder"}}
 
-        if not quota_manager.check_quota():
-            logger.error("API 额度已用尽，提取意图停止。")
-            return {"intent": "quota_exceeded", "entities": {}}
-
-        system_prompt = self._get_augmented_system_prompt("nlu_intent_extraction")
-
-        messages = [{"role": "system", "content": system_prompt}]
+        history_messages = []
         if history:
             for item in history:
                 role = item.metadata.get('role', 'user') if hasattr(item, 'metadata') else item.get('role', 'user')
                 content = item.content if hasattr(item, 'content') else item.get('content', '')
-                messages.append({"role": role, "content": content})
+                history_messages.append({"role": role, "content": content})
+
+        # temperature 为 0，相同系统提示词、历史与输入的结果可直接复用；
+        # 系统提示词含习惯画像，用户教会新习惯后旧结果随之失效
+        system_prompt = self._get_augmented_system_prompt("nlu_intent_extraction")
+        history_scope = self._cache_scope(system_prompt, self._history_fingerprint(history_messages))
+        cached = self._intent_cache.get(history_scope, text)
+        if cached is not None:
+            return cached
+
+        if not quota_manager.check_quota():
+            logger.error("API 额度已用尽，提取意图停止。")
+            return {"intent": "quota_exceeded", "entities": {}}
 
+        messages = [{"role": "system", "content": system_prompt}, *history_messages]
         messages.append({"role": "user", "content": text})
 
         payload = {
             "model": self.model_name,
             "messages": messages,
             "max_tokens": 512,
-            "temperature": 0
+            "temperature": 0,
+            "stream": True,
+            "stream_options": {"include_usage": True}
         }
 
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            response = requests.post(self.url, headers=headers, json=payload)
+            response = self._session.post(self.url, data=fast_json.dumps(payload), timeout=_REQUEST_TIMEOUT, stream=True)
             response.raise_for_status()
-            resp_json = response.json()
+            result_text, total_tokens = self._read_reply(response)
 
             # Update quota based on tokens consumed
-            usage = resp_json.get('usage', {})
-            total_tokens = usage.get('total_tokens', 0)
-            if total_tokens > 0:
-                quota_manager.update_usage(total_tokens)
-
-            result_text = resp_json['choices'][0]['message']['content']
+            self._charge_quota(messages, result_text, total_tokens)
 
             if result_text.strip().startswith("```json"):
                 result_text = result_text.strip()[7:-4].strip()
 
             # Output-side structural & content validation (JSON Schema/Safety)
             try:
-                parsed = json.loads(result_text)
+                parsed = fast_json.loads(result_text)
                 if not isinstance(parsed, dict) or "intent" not in parsed or "entities" not in parsed:
                     raise ValueError("JSON does not conform to intent schema")
 
@@ -184,6 +316,7 @@ class NLUService:
                             check_malicious_values(v)
 
                 check_malicious_values(parsed)
+                self._intent_cache.put(history_scope, text, parsed)
                 return parsed
             except Exception as schema_err:
                 logger.error(f"JSON Schema/Safety verification failed: {schema_err}")
@@ -192,17 +325,24 @@ class NLUService:
             logger.error(f"NLU extraction failed: {e}")
             return {"intent": "unknown", "entities": {"error": str(e)}}
 
-    def generate_general_response(self, text: str) -> str:
-        """生成简单的聊天响应。"""
+    def generate_general_response(self, text: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """生成简单的聊天响应。提供 on_delta 时以流式方式逐段回调生成的内容。"""
         # 1. Input-side Prompt Injection Filter
         if self._is_prompt_injection(text):
             logger.warning(f"Prompt injection detected in generate_general_response: '{text}'")
             return "对不起，您的输入包含不安全的安全载荷，请求已被拦截。"
 
+        system_prompt = self._get_augmented_system_prompt("general_response")
+        prompt_scope = self._cache_scope(system_prompt)
+        cached = self._response_cache.get(prompt_scope, text)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+
         if not quota_manager.check_quota():
             return "对不起，API 额度已用尽。请联系管理员充值或提高限额。"
 
-        system_prompt = self._get_augmented_system_prompt("general_response")
         payload = {
             "model": self.model_name,
             "messages": [
@@ -213,24 +353,16 @@ class NLUService:
             "temperature": 0.5
         }
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            response = requests.post(self.url, headers=headers, json=payload)
-            response.raise_for_status()
-            resp_json = response.json()
-
-            # Update quota
-            usage = resp_json.get('usage', {})
-            total_tokens = usage.get('total_tokens', 0)
-            if total_tokens > 0:
-                quota_manager.update_usage(total_tokens)
-
-            return resp_json['choices'][0]['message']['content']
+            content = self._post_chat(payload, on_delta)
+            self._response_cache.put(prompt_scope, text, content)
+            return content
         except Exception as e:
             logger.error(f"General response generation failed: {e}")
             return "抱歉，我暂时无法回答这个问题。"
 
-    def ask_llm(self, prompt: str, history: List[Any] = None, use_habit: bool = True, system_override: str = None, image_b64: str = None) -> str:
-        """通用 LLM 问答接口，支持多模态输入。"""
+    def ask_llm(self, prompt: str, history: List[Any] = None, use_habit: bool = True, system_override: str = None, image_b64: str = None,
+                on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """通用 LLM 问答接口，支持多模态输入。提供 on_delta 时以流式方式逐段回调生成的内容。"""
         # 1. Input-side Prompt Injection Filter
         if self._is_prompt_injection(prompt):
             logger.warning(f"Prompt injection detected in ask_llm: '{prompt}'")
@@ -306,22 +438,27 @@ class NLUService:
         }
 
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            response = requests.post(self.url, headers=headers, json=payload)
-            response.raise_for_status()
-            resp_json = response.json()
-
-            # Update quota
-            usage = resp_json.get('usage', {})
-            total_tokens = usage.get('total_tokens', 0)
-            if total_tokens > 0:
-                quota_manager.update_usage(total_tokens)
-
-            return resp_json['choices'][0]['message']['content']
+            return self._post_chat(payload, on_delta)
         except Exception as e:
             logger.error(f"ask_llm failed: {e}")
             return f"Error: {e}"
 
+    def _post_chat(self, payload: Dict[str, Any], on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        发送对话补全请求并更新额度，返回回复文本。
+        提供 on_delta 时启用 SSE 流式响应，首个增量到达即可回调，无需等待完整响应体。
+        """
+        stream = on_delta is not None
+        if stream:
+            payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        response = self._session.post(self.url, data=fast_json.dumps(payload), timeout=_REQUEST_TIMEOUT, stream=stream)
+        response.raise_for_status()
+        content, total_tokens = self._read_reply(response, on_delta)
+
+        # Update quota
+        self._charge_quota(payload["messages"], content, total_tokens)
+        return content
+
     def estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
         """极简 Token 估算 (字符数/3)。"""
         return sum(len(m.get('content', '')) for m in messages) // 3
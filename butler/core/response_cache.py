@@ -0,0 +1,109 @@
+"""
+LLM 响应缓存：精确匹配缓存，可选 Redis 共享层。
+
+以 (作用域, 规范化文本) 为键，按 LRU 淘汰并带 TTL。不做近似匹配：短文本只差一个数字或实体时
+字符 n-gram 相似度依然很高，复用结果会把别的问题的回答返回给用户。
+作用域用于区分系统提示词、对话历史等会影响结果的上下文，不同作用域之间互不命中。
+提供 Redis 客户端时，条目同时以 JSON 写入 Redis（同样带 TTL），进程重启或多个实例之间也能命中。
+"""
+
+import copy
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from butler.core import fast_json
+
+
+def normalize_text(text: str) -> str:
+    """合并空白字符，作为缓存键的文本部分。"""
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """
+    线程安全的精确匹配响应缓存。
+
+    读写都返回/保存值的深拷贝，调用方修改结果不会污染缓存。
+    redis_client 非空时作为本地缓存的共享后备，值须可 JSON 序列化；Redis 出错后本实例不再访问它。
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 600, redis_client=None,
+                 redis_prefix: str = "butler:llm_cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._redis = redis_client
+        self._redis_prefix = redis_prefix
+        # 摘要键 -> (写入时间, 值)
+        self._entries: "OrderedDict[bytes, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(scope: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{scope}\x1f{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get(self, scope: str, text: str) -> Optional[Any]:
+        """按精确键查找（本地，再 Redis），都未命中返回 None。"""
+        text = normalize_text(text)
+        key = self._key(scope, text)
+        now = time.monotonic()
+        with self._lock:
+            value = self._get_live(key, now)
+        if value is None and self._redis is not None:
+            # 网络往返不持有锁；命中后回填本地缓存
+            value = self._redis_get(key)
+            if value is not None:
+                with self._lock:
+                    self._store(key, value)
+        return copy.deepcopy(value) if value is not None else None
+
+    def put(self, scope: str, text: str, value: Any) -> None:
+        """写入缓存，超出上限时淘汰最久未使用的条目。"""
+        text = normalize_text(text)
+        key = self._key(scope, text)
+        with self._lock:
+            self._store(key, copy.deepcopy(value))
+        if self._redis is not None:
+            self._redis_set(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: bytes, value: Any) -> None:
+        """写入本地条目并按上限淘汰。调用方持有锁，value 已是缓存私有副本。"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _redis_get(self, key: bytes) -> Optional[Any]:
+        try:
+            raw = self._redis.get(f"{self._redis_prefix}:{key.hex()}")
+            return fast_json.loads(raw) if raw is not None else None
+        except Exception:
+            self._redis = None
+            return None
+
+    def _redis_set(self, key: bytes, value: Any) -> None:
+        try:
+            self._redis.set(f"{self._redis_prefix}:{key.hex()}", fast_json.dumps(value), ex=max(1, math.ceil(self.ttl)))
+        except Exception:
+            self._redis = None
+
+    def _get_live(self, key: bytes, now: float) -> Optional[Any]:
+        """返回未过期的条目值并刷新其 LRU 位置；过期条目顺带删除。调用方持有锁。"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
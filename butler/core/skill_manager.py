@@ -9,16 +9,52 @@ import subprocess
 import threading
 import time
 import yaml
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Callable
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from butler.core.task_manager import task_manager
-from butler.core.algorithms import LDSTResolver
+from butler.core.algorithms import KeywordIndex, LDSTResolver
 from butler.core.blackboard import blackboard
 
 logger = logging.getLogger("SkillManager")
 
+_FORBIDDEN_SKILL_CALLS = frozenset({
+    'os.system', 'os.popen', 'subprocess.Popen', 'subprocess.call',
+    'subprocess.run', 'shutil.rmtree', 'eval', 'exec'
+})
+
+# 技能目录监听：只关心增删改事件与以下关键文件
+_WATCHED_EVENT_TYPES = frozenset({"modified", "created", "deleted"})
+_WATCHED_SKILL_FILES = frozenset({"SKILL.md", "manifest.json", "config.yaml", "requirements.txt", "main.py"})
+_IGNORED_SKILL_PARTS = ("__pycache__", ".git", ".lib")
+
+@lru_cache(maxsize=256)
+def _audit_skill_source(entry_file: str, mtime_ns: int, size: int) -> bool:
+    """解析技能入口文件的 AST，检查是否包含禁止的调用；mtime_ns/size 只参与缓存键。"""
+    try:
+        import ast
+        with open(entry_file, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                call_name = ""
+                if isinstance(node.func, ast.Attribute):
+                    if hasattr(node.func.value, 'id'):
+                        call_name = f"{node.func.value.id}.{node.func.attr}"
+                elif isinstance(node.func, ast.Name):
+                    call_name = node.func.id
+
+                if call_name in _FORBIDDEN_SKILL_CALLS:
+                    logger.warning(f"Skill entry {entry_file} contains forbidden call: {call_name}")
+                    return False
+        return True
+    except Exception as e:
+        logger.error(f"Error performing AST check on {entry_file}: {e}")
+        return False
+
 class CorePluginContext:
     """
     Context injected into core plugins to allow privileged access to internal modules.
@@ -49,6 +85,21 @@ class SkillEventHandler(FileSystemEventHandler):
     def __init__(self, manager):
         self.manager = manager
         self._timers = {} # skill_path -> timer
+        # 监听线程与定时器线程都会修改 _timers
+        self._timers_lock = threading.Lock()
+
+    def dispatch(self, event):
+        # 在分发前用纯字符串判断快速丢弃无关事件（字节码写入、.git 变动、打开/关闭等）
+        if event.event_type not in _WATCHED_EVENT_TYPES:
+            return
+        src_path = event.src_path
+        if any(part in src_path for part in _IGNORED_SKILL_PARTS):
+            return
+        if not event.is_directory:
+            filename = os.path.basename(src_path)
+            if filename not in _WATCHED_SKILL_FILES and not filename.endswith(".zip"):
+                return
+        super().dispatch(event)
 
     def on_modified(self, event):
         self._handle_change(event)
@@ -71,25 +122,27 @@ class SkillEventHandler(FileSystemEventHandler):
         if skill_dir == self.manager.skills_dir:
             return # 忽略根目录自身的变动
 
-        if any(x in str(skill_dir) for x in ["__pycache__", ".git", ".lib"]):
-            return
-
-        # 只对关键文件变动或目录创建触发加载
-        if not event.is_directory:
-            filename = src_path.name
-            if filename not in ["SKILL.md", "manifest.json", "config.yaml", "requirements.txt", "main.py"] and not filename.endswith(".zip"):
-                return
-
+        # 无关路径与非关键文件已在 dispatch 中过滤
         self._trigger_load(skill_dir)
 
     def _trigger_load(self, skill_dir):
         skill_path_str = str(skill_dir)
-        if skill_path_str in self._timers:
-            self._timers[skill_path_str].cancel()
-
-        timer = threading.Timer(0.8, self.manager.load_and_register_skill, args=[skill_dir])
-        self._timers[skill_path_str] = timer
-        timer.start()
+        with self._timers_lock:
+            previous = self._timers.get(skill_path_str)
+            if previous is not None:
+                previous.cancel()
+
+            timer = threading.Timer(0.8, self._fire, args=[skill_path_str, skill_dir])
+            self._timers[skill_path_str] = timer
+            timer.start()
+
+    def _fire(self, skill_path_str, skill_dir):
+        # 触发后移除自身，避免已完成的 Timer 及其参数一直留在字典中
+        with self._timers_lock:
+            if self._timers.get(skill_path_str) is not threading.current_thread():
+                return  # 已被更新的事件取代
+            del self._timers[skill_path_str]
+        self.manager.load_and_register_skill(skill_dir)
 
 class SkillManager:
     """
@@ -107,6 +160,9 @@ class SkillManager:
         self.configs: Dict[str, Dict[str, Any]] = {}    # skill_id -> config
         self.skill_contents: Dict[str, str] = {}        # skill_id -> SKILL.md body (Stage 2)
         self.installed_deps: set = set()                # 已安装依赖的技能路径记录
+        # match_skill 的关键词索引，保存为 (构建时的技能代号, 索引)；技能变动时代号递增，旧索引随之失效
+        self._skill_index: Optional[tuple] = None
+        self._skill_generation = 0
 
         # 监控相关
         self._observer = None
@@ -230,6 +286,7 @@ class SkillManager:
             # 处理删除逻辑
             logger.info(f"🗑️ 检测到技能目录删除: {skill_id}")
             self.manifests.pop(skill_id, None)
+            self._invalidate_skill_index()
             self.configs.pop(skill_id, None)
             self.skill_contents.pop(skill_id, None)
             self.loaded_skills.pop(skill_id, None)
@@ -246,6 +303,7 @@ class SkillManager:
 
         # 发现并加载
         success = self._discover_skill(skill_id, self.manifests, self.configs, self.skill_contents)
+        self._invalidate_skill_index()
 
         if success:
             logger.info(f"✅ 技能 [{skill_id}] 热加载/更新成功！")
@@ -256,34 +314,14 @@ class SkillManager:
     def _is_skill_safe(self, entry_file: str) -> bool:
         """Performs AST analysis on non-core python skill entry files."""
         try:
-            import ast
-            if not os.path.exists(entry_file):
-                return True # No file to scan, safe by default
-
-            with open(entry_file, 'r', encoding='utf-8') as f:
-                tree = ast.parse(f.read())
-
-            forbidden_calls = {
-                'os.system', 'os.popen', 'subprocess.Popen', 'subprocess.call',
-                'subprocess.run', 'shutil.rmtree', 'eval', 'exec'
-            }
-
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    call_name = ""
-                    if isinstance(node.func, ast.Attribute):
-                        if hasattr(node.func.value, 'id'):
-                            call_name = f"{node.func.value.id}.{node.func.attr}"
-                    elif isinstance(node.func, ast.Name):
-                        call_name = node.func.id
-
-                    if call_name in forbidden_calls:
-                        logger.warning(f"Skill entry {entry_file} contains forbidden call: {call_name}")
-                        return False
-            return True
-        except Exception as e:
+            st = os.stat(entry_file)
+        except FileNotFoundError:
+            return True # No file to scan, safe by default
+        except OSError as e:
             logger.error(f"Error performing AST check on {entry_file}: {e}")
             return False
+        # 每次执行技能都会校验；以 (路径, mtime, 大小) 为键缓存结果，文件改动后自动重新审计
+        return _audit_skill_source(entry_file, st.st_mtime_ns, st.st_size)
 
     def load_skills(self):
         """
@@ -321,6 +359,7 @@ class SkillManager:
         self.manifests = new_manifests
         self.configs = new_configs
         self.skill_contents = new_skill_contents
+        self._invalidate_skill_index()
 
         logger.info(f"Skill Stage 1 complete: Discovered {len(self.manifests)} skills.")
 
@@ -748,7 +787,9 @@ class SkillManager:
                     if not self._load_python_runtime(skill_id):
                         return f"Error: 技能 '{skill_id}' 的 Python 环境加载失败。"
 
-        if skill_id not in self.loaded_skills:
+        # 已加载技能的处理函数只查一次，包装函数直接调用局部引用
+        handler = self.loaded_skills.get(skill_id)
+        if handler is None:
             if skill_id in self.skill_contents:
                 return f"技能 '{skill_id}' 为纯指令集模式。"
             return f"Error: 技能 '{skill_id}' 无法执行 (缺少入口)。"
@@ -761,7 +802,7 @@ class SkillManager:
 
         def skill_wrapper(action, **kwargs):
             try:
-                result = self.loaded_skills[skill_id](action, **kwargs)
+                result = handler(action, **kwargs)
                 if jarvis_app and kwargs.get("_async"):
                     jarvis_app.speak(str(result))
                 return result
@@ -857,19 +898,28 @@ class SkillManager:
 
         return f"错误：技能管理器不支持动作 '{action}'。"
 
+    def _invalidate_skill_index(self):
+        """技能列表变动后调用（须在修改 manifests 之后）：递增代号，使进行中的构建结果不被保存。"""
+        self._skill_generation += 1
+        self._skill_index = None
+
     def match_skill(self, command):
         """
         根据描述、名称或关键字匹配技能。
         """
-        for skill_id, manifest in self.manifests.items():
-            name = manifest.get("name", skill_id).lower()
-            keywords = [k.lower() for k in manifest.get("keywords", [])]
-            desc = manifest.get("description", "").lower()
-
-            cmd_lower = command.lower()
-            if name in cmd_lower or any(k in cmd_lower for k in keywords):
-                return skill_id
-        return None
+        generation = self._skill_generation
+        cached = self._skill_index
+        if cached is not None and cached[0] == generation:
+            return cached[1].find(command.lower())
+        # 监控线程会原地修改 manifests，先取快照再构建
+        index = KeywordIndex(
+            (skill_id, [manifest.get("name", skill_id).lower()] + [k.lower() for k in manifest.get("keywords", [])])
+            for skill_id, manifest in list(self.manifests.items())
+        )
+        # 构建期间发生热加载时不保存，下次调用按新的技能列表重建
+        if self._skill_generation == generation:
+            self._skill_index = (generation, index)
+        return index.find(command.lower())
 
     def get_skill_instruction(self, skill_id: str) -> Optional[str]:
         """获取技能的完整指令 (Stage 2)"""
@@ -1,17 +1,36 @@
 import os
+import sys
 import time
 import json
+import array
+import queue
 import threading
+import concurrent.futures
 import tempfile
 import wave
-import struct
 import io
+from functools import lru_cache
 from typing import Optional, Callable, Dict, Any
 from dotenv import load_dotenv
 from package.core_utils.log_manager import LogManager
 from package.core_utils.config_loader import config_loader
 from butler.core.asset_loader import asset_loader
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = LogManager.get_logger(__name__)
 
 def detect_and_configure_gpu_device() -> str:
@@ -42,6 +61,32 @@ def detect_and_configure_gpu_device() -> str:
         logger.warning(f"[GPU] Error during GPU/CUDA detection: {e}. Switching to CPU mode for safety.")
         return "cpu"
 
+# webrtcvad 仅接受 10/20/30ms 的帧，16kHz 下取 30ms
+_VAD_FRAME_SAMPLES = 480
+
+def _sum_squares_int16(samples):
+    """int16 样本的平方和，逐样本以 int64 累加，无需先转换出 float64 副本。"""
+    total = 0
+    for i in range(samples.shape[0]):
+        v = np.int64(samples[i])
+        total += v * v
+    return total
+
+if njit is not None and np is not None:
+    # nogil：录音线程计算音量时不阻塞同时运行的识别线程
+    _sum_squares_int16 = njit(cache=True, nogil=True)(_sum_squares_int16)
+
+
+def _frame_rms(frame: array.array) -> float:
+    """计算一帧 int16 PCM 的均方根音量，安装 numpy 时零拷贝读取缓冲区。"""
+    if np is not None:
+        samples = np.frombuffer(frame, dtype=np.int16)
+        if njit is not None:
+            return (_sum_squares_int16(samples) / len(samples)) ** 0.5
+        samples = samples.astype(np.float64)
+        return float(np.sqrt(np.dot(samples, samples) / len(samples)))
+    return (sum(f * f for f in frame) / len(frame)) ** 0.5
+
 class VoiceEngine:
     def speak(self, text: str):
         pass
@@ -90,25 +135,44 @@ class BaiduVoiceEngine(VoiceEngine):
             logger.error(f"Baidu ASR Exception: {e}")
         return ""
 
+@lru_cache(maxsize=2)
+def _load_whisper_model(model_size: str):
+    """加载 Faster-Whisper 模型并按规格缓存；进程内重建引擎、切换模式都不再重复反序列化模型。"""
+    from faster_whisper import WhisperModel
+    # Detect best device safely to avoid CUDA out of memory
+    dev_mode = detect_and_configure_gpu_device()
+    compute_type = "float16" if dev_mode == "cuda" else "int8"
+    model = WhisperModel(model_size, device=dev_mode, compute_type=compute_type)
+    logger.info(f"Local STT (Whisper {model_size}) initialized on {dev_mode}.")
+    return model
+
 class LocalVoiceEngine(VoiceEngine):
     def __init__(self):
         self.stt_model = None
+        self._stt_model_size = None
+        self._stt_lock = threading.Lock()
         self.tts_engine = None
+        # pyttsx3 引擎不是线程安全的，多个线程共用同一实例时需串行
+        self._tts_lock = threading.Lock()
         self._init_models()
 
-    def _init_models(self):
-        # STT: Faster-Whisper
-        try:
-            from faster_whisper import WhisperModel
-            model_size = config_loader.get("voice.local_stt_model", "base")
-            # Detect best device safely to avoid CUDA out of memory
-            dev_mode = detect_and_configure_gpu_device()
-            compute_type = "float16" if dev_mode == "cuda" else "int8"
-            self.stt_model = WhisperModel(model_size, device=dev_mode, compute_type=compute_type)
-            logger.info(f"Local STT (Whisper {model_size}) initialized on {dev_mode}.")
-        except Exception as e:
-            logger.error(f"Failed to init Local STT: {e}")
+    def get_stt_model(self):
+        """
+        返回 STT 模型，首次使用时才加载（耗时数秒，不应阻塞启动）。
+        配置的模型规格变化时重新加载；加载失败后同一规格不再重试。
+        """
+        model_size = config_loader.get("voice.local_stt_model", "base")
+        with self._stt_lock:
+            if model_size != self._stt_model_size:
+                self._stt_model_size = model_size
+                try:
+                    self.stt_model = _load_whisper_model(model_size)
+                except Exception as e:
+                    self.stt_model = None
+                    logger.error(f"Failed to init Local STT: {e}")
+            return self.stt_model
 
+    def _init_models(self):
         # TTS: pyttsx3 as a simple local fallback, piper would require external binaries/models
         try:
             import pyttsx3
@@ -122,21 +186,23 @@ class LocalVoiceEngine(VoiceEngine):
         # Note: pyttsx3 doesn't easily return bytes, it plays directly.
         if self.tts_engine:
             try:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
+                with self._tts_lock:
+                    self.tts_engine.say(text)
+                    self.tts_engine.runAndWait()
             except Exception as e:
                 logger.error(f"pyttsx3 speak error: {e}")
         return None
 
     def transcribe(self, wav_data: bytes) -> str:
-        if not self.stt_model: return ""
+        stt_model = self.get_stt_model()
+        if not stt_model: return ""
         try:
             # Whisper needs a file path or a file-like object
             with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as f:
                 f.write(wav_data)
                 temp_path = f.name
 
-            segments, info = self.stt_model.transcribe(temp_path, beam_size=5)
+            segments, info = stt_model.transcribe(temp_path, beam_size=5)
             text = "".join([s.text for s in segments])
             os.remove(temp_path)
             return text.strip()
@@ -151,6 +217,14 @@ class VoiceService:
         self.on_status_change = on_status_change
         self.is_listening = False
         self.voice_available = True
+        self._recorder = None
+        # 录音循环在单线程池中串行执行：快速开关监听时新一轮会等旧一轮释放录音设备后再开始，
+        # 代号用于让旧一轮尽快退出且不覆盖新一轮的监听状态
+        self._listen_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice-listen")
+        self._listen_generation = 0
+        # 采集线程只负责录音，识别交给后台线程；队列有界，满时丢弃最旧的录音
+        self._decode_queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=8)
+        self._decode_thread: Optional[threading.Thread] = None
 
         # Load mode from config
         self.mode = config_loader.get("voice.mode", "online")
@@ -159,6 +233,28 @@ class VoiceService:
         self._test_voice_hardware_and_engines()
 
         self.ACTIVATION_SOUND_FILE = asset_loader.resolve_path("audio://activate.wav")
+        self._activation_sound = self._load_activation_sound()
+
+        # 会用到本地识别时在后台预加载 Whisper 模型，首次识别不必等待
+        if self.voice_available and self._uses_local_stt():
+            self._warm_local_stt()
+
+        # 没有 webrtcvad 时静音检测走 _frame_rms；提前在后台触发 JIT 编译，避免首帧卡顿
+        if webrtcvad is None and njit is not None and np is not None and self.voice_available:
+            threading.Thread(target=_frame_rms, args=(array.array('h', [0]),), name="rms-jit-warmup", daemon=True).start()
+
+    def _load_activation_sound(self):
+        """预加载唤醒提示音为 pygame Sound，播放时无需再读文件和解码。"""
+        if not self.voice_available or not os.path.exists(self.ACTIVATION_SOUND_FILE):
+            return None
+        try:
+            import pygame
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            return pygame.mixer.Sound(self.ACTIVATION_SOUND_FILE)
+        except Exception as e:
+            logger.warning(f"Could not preload activation sound: {e}")
+            return None
 
     def _test_voice_hardware_and_engines(self):
         """
@@ -223,6 +319,13 @@ class VoiceService:
             self.voice_available = True
             logger.info("Voice diagnostics complete. Voice service is fully available.")
 
+    def _uses_local_stt(self) -> bool:
+        """本地模式，或在线模式缺少百度凭据而回退本地引擎时返回 True。"""
+        return self.mode == "local" or getattr(self.engines["online"], "client", None) is None
+
+    def _warm_local_stt(self):
+        threading.Thread(target=self.engines["local"].get_stt_model, name="stt-warmup", daemon=True).start()
+
     def get_engine(self) -> VoiceEngine:
         engine = self.engines.get(self.mode, self.engines["online"])
         if self.mode == "online":
@@ -264,7 +367,18 @@ class VoiceService:
             logger.warning(f"Could not play audio {file_path}: {e}")
 
     def play_activation_sound(self):
-        if self.voice_available and os.path.exists(self.ACTIVATION_SOUND_FILE):
+        if not self.voice_available:
+            return
+        if self._activation_sound is not None:
+            try:
+                # 等待提示音播完再开始录音，避免把提示音录进指令
+                channel = self._activation_sound.play()
+                while channel is not None and channel.get_busy():
+                    time.sleep(0.01)
+                return
+            except Exception as e:
+                logger.warning(f"Could not play activation sound: {e}")
+        if os.path.exists(self.ACTIVATION_SOUND_FILE):
             self._play_audio(self.ACTIVATION_SOUND_FILE)
 
     def start_listening(self):
@@ -274,9 +388,8 @@ class VoiceService:
         if self.is_listening: return
         self.is_listening = True
         if self.on_status_change: self.on_status_change(True)
-        self.listen_thread = threading.Thread(target=self._listen_loop)
-        self.listen_thread.daemon = True
-        self.listen_thread.start()
+        self._listen_generation += 1
+        self._listen_pool.submit(self._listen_loop, self._listen_generation)
 
     def stop_listening(self):
         self.is_listening = False
@@ -285,21 +398,85 @@ class VoiceService:
     def set_voice_mode(self, mode: str):
         if mode in self.engines:
             self.mode = mode
+            if mode == "local":
+                self._warm_local_stt()
             config_loader.save({"voice": {"mode": mode}})
             self.ui_print(f"语音模式已切换至: {mode}", tag='system_message')
             return True
         return False
 
-    def _listen_loop(self):
-        try:
+    def _get_recorder(self):
+        """懒创建并复用 PvRecorder，避免每次监听都重新打开音频设备。"""
+        if self._recorder is None:
             from pvrecorder import PvRecorder
             access_key = config_loader.get("api.picovoice.access_key")
             if not access_key or "YOUR_" in str(access_key):
                 access_key = None
                 logger.warning("[Voice] Picovoice access key is missing or placeholder. Trying default device.")
 
+            self._recorder = PvRecorder(access_key=access_key, device_index=-1, frame_length=512) if access_key else PvRecorder(device_index=-1, frame_length=512)
+        return self._recorder
+
+    def _release_recorder(self):
+        """释放录音设备。"""
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
             try:
-                recorder = PvRecorder(access_key=access_key, device_index=-1, frame_length=512) if access_key else PvRecorder(device_index=-1, frame_length=512)
+                recorder.delete()
+            except Exception as e:
+                logger.warning(f"[Voice] Failed to release PvRecorder: {e}")
+
+    def shutdown(self):
+        """停止监听并释放录音设备，由服务容器在退出时调用。"""
+        self.stop_listening()
+        self._listen_pool.shutdown(wait=False, cancel_futures=True)
+        self._release_recorder()
+        if self._decode_thread is not None:
+            self._enqueue_for_decoding(None)
+
+    def _enqueue_for_decoding(self, wav_data: Optional[bytes]):
+        """将录音放入识别队列；None 为停止信号。"""
+        if self._decode_thread is None and wav_data is not None:
+            self._decode_thread = threading.Thread(target=self._decode_loop, name="voice-decode", daemon=True)
+            self._decode_thread.start()
+        while True:
+            try:
+                self._decode_queue.put_nowait(wav_data)
+                return
+            except queue.Full:
+                try:
+                    self._decode_queue.get_nowait()
+                    logger.warning("[Voice] Decode queue full, dropping the oldest recording.")
+                except queue.Empty:
+                    pass
+
+    def _decode_loop(self):
+        """后台识别线程：依次转写录音并回调指令处理。"""
+        while True:
+            wav_data = self._decode_queue.get()
+            if wav_data is None:
+                break
+            try:
+                self.ui_print("正在识别...", tag='system_message')
+                result_text = self.get_engine().transcribe(wav_data)
+
+                if result_text:
+                    self.ui_print(f"识别到指令: {result_text}", tag='user_input')
+                    self.on_command_received(result_text)
+                else:
+                    self.ui_print("未能识别语音内容。", tag='error')
+            except Exception as e:
+                self.ui_print(f"语音识别错误: {e}", tag='error')
+                logger.exception("Decode loop error")
+
+    def _listen_loop(self, generation):
+        # 排队期间又被停止或重新开始过，本轮直接放弃
+        if generation != self._listen_generation or not self.is_listening:
+            return
+        recorder = None
+        try:
+            try:
+                recorder = self._get_recorder()
             except Exception as e:
                 logger.error(f"[Voice] PvRecorder initialization failed: {e}. Voice recording is unavailable.")
                 self.ui_print("录音设备初始化失败，请检查麦克风或 Picovoice Key。", tag='error')
@@ -309,26 +486,31 @@ class VoiceService:
             self.play_activation_sound()
 
             recorder.start()
-            audio_data = []
+            # int16 连续缓冲区，避免逐帧构造 Python 整数列表
+            audio_data = array.array('h')
 
             silence_threshold = 500
             max_silence_frames = 40
             silence_frames = 0
             max_record_frames = 300
+            # 有 webrtcvad 时用 VAD 判定静音，否则回退到音量阈值
+            vad = webrtcvad.Vad(2) if webrtcvad is not None else None
 
             for _ in range(max_record_frames):
-                if not self.is_listening: break
-                frame = recorder.read()
+                if not self.is_listening or generation != self._listen_generation: break
+                frame = array.array('h', recorder.read())
                 audio_data.extend(frame)
 
-                rms = (sum(f**2 for f in frame) / len(frame))**0.5
-                if rms < silence_threshold: silence_frames += 1
-                else: silence_frames = 0
+                if vad is not None:
+                    is_speech = vad.is_speech(frame[:_VAD_FRAME_SAMPLES].tobytes(), 16000)
+                else:
+                    is_speech = _frame_rms(frame) >= silence_threshold
+                if is_speech: silence_frames = 0
+                else: silence_frames += 1
 
                 if silence_frames > max_silence_frames and len(audio_data) > 16000: break
 
             recorder.stop()
-            recorder.delete()
 
             if audio_data:
                 buffer = io.BytesIO()
@@ -336,21 +518,19 @@ class VoiceService:
                     wf.setnchannels(1)
                     wf.setsampwidth(2)
                     wf.setframerate(16000)
-                    wf.writeframes(struct.pack('<' + ('h' * len(audio_data)), *audio_data))
-                wav_data = buffer.getvalue()
-
-                self.ui_print("正在识别...", tag='system_message')
-                result_text = self.get_engine().transcribe(wav_data)
-
-                if result_text:
-                    self.ui_print(f"识别到指令: {result_text}", tag='user_input')
-                    self.on_command_received(result_text)
-                else:
-                    self.ui_print("未能识别语音内容。", tag='error')
+                    if sys.byteorder == 'big':
+                        audio_data.byteswap()
+                    # array 支持缓冲区协议，wave 直接按字节视图写入，省去整段录音的一次拷贝
+                    wf.writeframes(audio_data)
+                self._enqueue_for_decoding(buffer.getvalue())
 
         except Exception as e:
             self.ui_print(f"语音识别错误: {e}", tag='error')
             logger.exception("Listen loop error")
+            # 设备状态未知，下次监听时重新打开
+            if recorder is not None:
+                self._release_recorder()
         finally:
-            self.is_listening = False
-            if self.on_status_change: self.on_status_change(False)
+            if generation == self._listen_generation:
+                self.is_listening = False
+                if self.on_status_change: self.on_status_change(False)
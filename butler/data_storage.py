@@ -1,11 +1,58 @@
+import atexit
 import json
+import logging
 import os
-from typing import Any, Optional
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
-from butler.redis_client import redis_client
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+from butler.core import fast_json
+from butler.redis_client import redis_client, get_redis_client
 from package.core_utils.log_manager import LogManager
 
+# Version tag prefixed to msgpack values in Redis. Legacy JSON values never start
+# with this byte, so they are recognised on read and migrated in place.
+_MSGPACK_TAG = b"\x01"
+
+# Scalar fast path: exact str/int/bool values skip the general encoder and are
+# stored as a one-byte tag plus their UTF-8 text. None of these tags can start a
+# JSON document, so they never clash with legacy values.
+_STR_TAG = b"\x02"
+_INT_TAG = b"\x03"
+_BOOL_TAG = b"\x04"
+_SCALAR_ENCODERS = {
+    str: lambda v: _STR_TAG + v.encode("utf-8"),
+    int: lambda v: _INT_TAG + str(v).encode("ascii"),
+    bool: lambda v: _BOOL_TAG + (b"1" if v else b"0"),
+}
+_SCALAR_DECODERS = {
+    _STR_TAG: lambda b: b.decode("utf-8"),
+    _INT_TAG: int,
+    _BOOL_TAG: lambda b: b == b"1",
+}
+
+# Background writer tuning: queue bound, max keys per pipeline, and how long to
+# wait for more writes to coalesce before flushing a batch.
+_WRITE_QUEUE_SIZE = 10000
+_WRITE_BATCH_SIZE = 256
+_WRITE_DRAIN_TIMEOUT = 0.005
+_STOP = object()
+
+# Stores a value and records its key in the plugin's index set in one atomic call.
+# KEYS: data key, index key. ARGV: encoded value, plugin-level key.
+_SAVE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+return 1
+"""
+
 class DataStorageManager:
     """
     Manages the storage of structured data for plugins using Redis, with local file fallback.
@@ -13,103 +60,396 @@ class DataStorageManager:
     """
     def __init__(self):
         self._logger = LogManager.get_logger(__name__)
-        self.redis_client = redis_client
+        # Values are stored as binary msgpack, so use a client that returns raw bytes.
+        self.redis_client = get_redis_client(decode_responses=False) if redis_client else None
+        # register_script only hashes locally; the script is loaded on first use.
+        self._save_script = self.redis_client.register_script(_SAVE_SCRIPT) if self.redis_client else None
+        # msgpack decoders for typed loads, keyed by schema type.
+        self._typed_decoders: Dict[Any, Any] = {}
+        if msgspec is not None:
+            self._enc = msgspec.msgpack.Encoder()
+            self._dec = msgspec.msgpack.Decoder()
+        else:
+            self._enc = None
+            self._dec = None
         self.local_storage_path = Path(__file__).resolve().parent.parent / "data" / "local_storage"
         self.local_storage_path.mkdir(parents=True, exist_ok=True)
 
+        # Per-thread reusable pipelines; redis-py resets a pipeline after execute().
+        self._pipe = threading.local()
+        # Per-plugin Redis key prefixes, so key construction is a single concat.
+        self._prefix_cache: Dict[str, str] = {}
+        # Encoded values waiting for the background writer, keyed by (plugin, key).
+        # Reads consult this first so a save is visible before it reaches Redis.
+        self._pending: Dict[Tuple[str, str], bytes] = {}
+        self._pending_lock = threading.Lock()
+        # Serializes Redis writes against deletes so a queued value cannot resurrect a deleted key.
+        self._write_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+
         if not self.redis_client:
             self._logger.warning("DataStorageManager initialized without a Redis connection. Falling back to local file storage.")
         else:
             self._logger.info("DataStorageManager initialized with Redis.")
+            self._writer = threading.Thread(target=self._writer_loop, name="data-storage-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
 
     def _get_plugin_key(self, plugin_name: str, key: str) -> str:
         """
         Generates a unique Redis key for a given plugin and key.
         This ensures that data from different plugins does not conflict.
         """
-        return f"plugin:{plugin_name}:data:{key}"
+        prefix = self._prefix_cache.get(plugin_name)
+        if prefix is None:
+            prefix = self._prefix_cache[plugin_name] = f"plugin:{plugin_name}:data:"
+        return prefix + key
+
+    @staticmethod
+    def _get_index_key(plugin_name: str) -> str:
+        """Returns the Redis set holding every key saved by a plugin."""
+        return f"plugin:{plugin_name}:index"
+
+    def _get_pipe(self):
+        """Returns this thread's non-transactional pipeline, creating it on first use."""
+        pipe = getattr(self._pipe, "pipe", None)
+        if pipe is None:
+            pipe = self._pipe.pipe = self.redis_client.pipeline(transaction=False)
+        else:
+            # Discard commands left queued by a batch that failed before execute().
+            pipe.reset()
+        return pipe
 
     def _get_local_path(self, plugin_name: str, key: str) -> Path:
         """Generates a local file path for storage."""
         return self.local_storage_path / f"{plugin_name}_{key}.json"
 
+    def _encode(self, value: Any) -> bytes:
+        """
+        Serializes a value for Redis: tagged text for plain str/int/bool, tagged
+        msgpack when msgspec is installed, otherwise JSON bytes.
+        """
+        scalar_encoder = _SCALAR_ENCODERS.get(value.__class__)
+        if scalar_encoder is not None:
+            return scalar_encoder(value)
+        if self._enc is not None:
+            return _MSGPACK_TAG + self._enc.encode(value)
+        return fast_json.dumps(value)
+
+    def _decode(self, raw: bytes, type: Optional[Any] = None) -> Tuple[Any, bool]:
+        """
+        Deserializes a Redis value. Returns (value, is_legacy) where is_legacy
+        marks a JSON value that should be rewritten in the current format.
+        If type is given (e.g. a msgspec.Struct), msgpack values are decoded
+        straight into it.
+        """
+        tag = raw[:1]
+        scalar_decoder = _SCALAR_DECODERS.get(tag)
+        if scalar_decoder is not None:
+            return self._convert(scalar_decoder(raw[1:]), type), False
+        if tag == _MSGPACK_TAG:
+            if self._dec is None:
+                raise ValueError("msgpack value found but msgspec is not installed")
+            return self._get_decoder(type).decode(raw[1:]), False
+        return self._convert(fast_json.loads(raw), type), self._enc is not None
+
+    def _get_decoder(self, type: Optional[Any]):
+        """Returns a cached msgpack decoder for the given schema type."""
+        if type is None:
+            return self._dec
+        decoder = self._typed_decoders.get(type)
+        if decoder is None:
+            decoder = self._typed_decoders[type] = msgspec.msgpack.Decoder(type)
+        return decoder
+
+    @staticmethod
+    def _convert(value: Any, type: Optional[Any]) -> Any:
+        """Converts an already-decoded value to the schema type when msgspec is available."""
+        if type is None or msgspec is None or value is None:
+            return value
+        return msgspec.convert(value, type)
+
     def save(self, plugin_name: str, key: str, value: Any):
         """
-        Saves a value for a specific plugin. The value will be serialized to JSON.
+        Saves a value for a specific plugin without waiting for Redis.
+        The value is serialized immediately and written by the background writer;
+        use save_sync when the caller needs the write confirmed.
         """
-        serialized_value = json.dumps(value, ensure_ascii=False)
+        if self._writer is None:
+            self.save_many(plugin_name, {key: value})
+            return
+        try:
+            encoded = self._encode(value)
+        except Exception as e:
+            self._logger.error(f"Failed to serialize data for plugin '{plugin_name}' with key '{key}': {e}")
+            return
+        with self._pending_lock:
+            is_new = (plugin_name, key) not in self._pending
+            self._pending[(plugin_name, key)] = encoded
+        # A key already pending has a marker queued; the writer picks up the newest value.
+        if is_new:
+            self._queue.put((plugin_name, key))
 
-        if self.redis_client:
+    def save_sync(self, plugin_name: str, key: str, value: Any):
+        """
+        Saves a value and waits for the write to complete.
+        """
+        self.save_many(plugin_name, {key: value})
+
+    def save_many(self, plugin_name: str, items: Dict[str, Any]):
+        """
+        Saves several values for a plugin in a single Redis round-trip using a
+        non-transactional pipeline. Blocks until the write completes.
+        """
+        if not items:
+            return
+        if not self.redis_client:
+            for key, value in items.items():
+                self._save_local(plugin_name, key, value)
+            return
+        try:
+            encoded = {(plugin_name, key): self._encode(value) for key, value in items.items()}
+        except Exception as e:
+            self._logger.error(f"Failed to serialize data for plugin '{plugin_name}' with keys {list(items)}: {e}")
+            return
+        with self._write_lock:
+            # This write supersedes any queued value for the same keys.
+            with self._pending_lock:
+                for item_key in encoded:
+                    self._pending.pop(item_key, None)
+            self._write_encoded(encoded)
+
+    def _write_encoded(self, items: Dict[Tuple[str, str], bytes]):
+        """
+        Writes encoded values to Redis in one pipeline, falling back to local
+        files when Redis is unavailable. Each value is stored and added to its
+        plugin's index by the save script. Callers hold _write_lock.
+        """
+        try:
+            pipe = self._get_pipe()
+            for (plugin_name, key), encoded in items.items():
+                self._save_script(
+                    keys=[self._get_plugin_key(plugin_name, key), self._get_index_key(plugin_name)],
+                    args=[encoded, key],
+                    client=pipe,
+                )
+            pipe.execute()
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info("Saved data to Redis for keys %s.", [f'{p}:{k}' for p, k in items])
+            return
+        except Exception as e:
+            self._logger.error(f"Failed to save data to Redis for keys {[f'{p}:{k}' for p, k in items]}: {e}")
+
+        # Fallback to local file storage
+        for (plugin_name, key), encoded in items.items():
+            self._save_local(plugin_name, key, self._decode(encoded)[0])
+
+    def _writer_loop(self):
+        """
+        Drains queued saves into pipelines: blocks for the first key, then
+        collects up to _WRITE_BATCH_SIZE more within _WRITE_DRAIN_TIMEOUT.
+        """
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _WRITE_DRAIN_TIMEOUT
+            while len(batch) < _WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
             try:
-                redis_key = self._get_plugin_key(plugin_name, key)
-                self.redis_client.set(redis_key, serialized_value)
-                self._logger.info(f"Saved data to Redis for plugin '{plugin_name}' with key '{key}'.")
-                return
+                with self._write_lock:
+                    with self._pending_lock:
+                        items = {item: self._pending.pop(item) for item in batch
+                                 if item is not _STOP and item in self._pending}
+                    if items:
+                        self._write_encoded(items)
             except Exception as e:
-                self._logger.error(f"Failed to save data to Redis for plugin '{plugin_name}' with key '{key}': {e}")
+                self._logger.error(f"Background writer failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                break
 
-        # Fallback to local file storage
+    def flush(self):
+        """
+        Writes all queued saves and stops the background writer. Later saves
+        are written synchronously.
+        """
+        writer = self._writer
+        if writer is None:
+            return
+        self._writer = None
+        self._queue.put(_STOP)
+        writer.join()
+
+    def _save_local(self, plugin_name: str, key: str, value: Any):
+        """Writes a value to the local JSON file fallback."""
         try:
+            serialized_value = json.dumps(value, ensure_ascii=False)
             local_path = self._get_local_path(plugin_name, key)
             with local_path.open('w', encoding='utf-8') as f:
                 f.write(serialized_value)
-            self._logger.info(f"Saved data to local file for plugin '{plugin_name}' with key '{key}'.")
+            self._logger.info("Saved data to local file for plugin '%s' with key '%s'.", plugin_name, key)
         except Exception as e:
             self._logger.error(f"Failed to save data locally for plugin '{plugin_name}' with key '{key}': {e}")
 
-    def load(self, plugin_name: str, key: str) -> Optional[Any]:
+    def load(self, plugin_name: str, key: str, type: Optional[Any] = None) -> Optional[Any]:
         """
-        Loads a value for a specific plugin. The value will be deserialized from JSON.
+        Loads a value for a specific plugin. Thin wrapper over load_many.
         """
-        if self.redis_client:
+        return self.load_many(plugin_name, [key], type=type)[key]
+
+    def load_many(self, plugin_name: str, keys: List[str], type: Optional[Any] = None) -> Dict[str, Optional[Any]]:
+        """
+        Loads several values for a plugin in a single Redis round-trip.
+        Keys missing from Redis fall back to local files; absent keys map to None.
+        Pass type (e.g. a msgspec.Struct subclass) to decode values into that
+        schema instead of plain dicts; it is ignored when msgspec is not installed.
+        """
+        results: Dict[str, Optional[Any]] = {}
+        # Values still queued for the background writer are newer than Redis.
+        with self._pending_lock:
+            pending = {key: self._pending[(plugin_name, key)] for key in keys
+                       if (plugin_name, key) in self._pending}
+        for key, encoded in pending.items():
+            results[key] = self._decode(encoded, type)[0]
+
+        missing = [key for key in keys if key not in results]
+        if self.redis_client and missing:
+            redis_keys = missing
             try:
-                redis_key = self._get_plugin_key(plugin_name, key)
-                serialized_value = self.redis_client.get(redis_key)
-                if serialized_value:
-                    self._logger.info(f"Loaded data from Redis for plugin '{plugin_name}' with key '{key}'.")
-                    return json.loads(serialized_value)
+                pipe = self._get_pipe()
+                for key in redis_keys:
+                    pipe.get(self._get_plugin_key(plugin_name, key))
+                raw_values = pipe.execute()
+
+                missing = []
+                legacy: Dict[str, Any] = {}
+                for key, raw in zip(redis_keys, raw_values):
+                    if not raw:
+                        missing.append(key)
+                        continue
+                    try:
+                        value, is_legacy = self._decode(raw, type)
+                    except Exception as e:
+                        self._logger.error(f"Failed to decode Redis data for plugin '{plugin_name}' with key '{key}': {e}")
+                        missing.append(key)
+                        continue
+                    results[key] = value
+                    if is_legacy:
+                        legacy[key] = value
+                if self._logger.isEnabledFor(logging.INFO):
+                    loaded = [key for key in redis_keys if key in results]
+                    if loaded:
+                        self._logger.info("Loaded data from Redis for plugin '%s' with keys %s.", plugin_name, loaded)
+                if legacy:
+                    self._migrate_legacy(plugin_name, legacy)
             except Exception as e:
-                self._logger.error(f"Failed to load data from Redis for plugin '{plugin_name}' with key '{key}': {e}")
+                self._logger.error(f"Failed to load data from Redis for plugin '{plugin_name}' with keys {list(keys)}: {e}")
+                missing = [key for key in keys if key not in results]
 
         # Fallback to local file storage
+        for key in missing:
+            try:
+                results[key] = self._convert(self._load_local(plugin_name, key), type)
+            except Exception as e:
+                self._logger.error(f"Failed to convert local data for plugin '{plugin_name}' with key '{key}': {e}")
+                results[key] = None
+        return {key: results[key] for key in keys}
+
+    def _migrate_legacy(self, plugin_name: str, legacy: Dict[str, Any]):
+        """Rewrites legacy JSON values in the current format unless a newer save is queued."""
+        encoded = {(plugin_name, key): self._encode(value) for key, value in legacy.items()}
+        with self._write_lock:
+            with self._pending_lock:
+                encoded = {item_key: raw for item_key, raw in encoded.items() if item_key not in self._pending}
+            if encoded:
+                self._write_encoded(encoded)
+                if self._logger.isEnabledFor(logging.INFO):
+                    self._logger.info("Migrated legacy JSON values for plugin '%s' with keys %s.", plugin_name, [k for _, k in encoded])
+
+    def _load_local(self, plugin_name: str, key: str) -> Optional[Any]:
+        """Reads a value from the local JSON file fallback."""
         try:
             local_path = self._get_local_path(plugin_name, key)
             if local_path.exists():
                 with local_path.open('r', encoding='utf-8') as f:
                     serialized_value = f.read()
-                self._logger.info(f"Loaded data from local file for plugin '{plugin_name}' with key '{key}'.")
+                self._logger.info("Loaded data from local file for plugin '%s' with key '%s'.", plugin_name, key)
                 return json.loads(serialized_value)
             return None
         except Exception as e:
             self._logger.error(f"Failed to load data locally for plugin '{plugin_name}' with key '{key}': {e}")
             return None
 
+    def list_keys(self, plugin_name: str) -> List[str]:
+        """
+        Returns the keys a plugin has stored in Redis, including saves still queued.
+        Without Redis, lists the plugin's local fallback files instead.
+        """
+        keys = set()
+        with self._pending_lock:
+            keys.update(key for plugin, key in self._pending if plugin == plugin_name)
+        if self.redis_client:
+            try:
+                keys.update(member.decode("utf-8") for member in self.redis_client.smembers(self._get_index_key(plugin_name)))
+                return sorted(keys)
+            except Exception as e:
+                self._logger.error(f"Failed to list keys in Redis for plugin '{plugin_name}': {e}")
+        prefix = f"{plugin_name}_"
+        keys.update(path.stem[len(prefix):] for path in self.local_storage_path.glob(f"{prefix}*.json"))
+        return sorted(keys)
+
     def delete(self, plugin_name: str, key: str):
         """
-        Deletes a value for a specific plugin.
+        Deletes a value for a specific plugin. Thin wrapper over delete_many.
         """
-        deleted = False
+        self.delete_many(plugin_name, [key])
+
+    def delete_many(self, plugin_name: str, keys: List[str]):
+        """
+        Deletes several values for a plugin with a single variadic Redis DEL,
+        removing them from the plugin's index in the same round trip.
+        """
+        if not keys:
+            return
+        deleted = set()
         if self.redis_client:
             try:
-                redis_key = self._get_plugin_key(plugin_name, key)
-                self.redis_client.delete(redis_key)
-                self._logger.info(f"Deleted data from Redis for plugin '{plugin_name}' with key '{key}'.")
-                deleted = True
+                with self._write_lock:
+                    with self._pending_lock:
+                        for key in keys:
+                            self._pending.pop((plugin_name, key), None)
+                    pipe = self._get_pipe()
+                    pipe.delete(*(self._get_plugin_key(plugin_name, key) for key in keys))
+                    pipe.srem(self._get_index_key(plugin_name), *keys)
+                    pipe.execute()
+                self._logger.info("Deleted data from Redis for plugin '%s' with keys %s.", plugin_name, list(keys))
+                deleted.update(keys)
             except Exception as e:
-                self._logger.error(f"Failed to delete data from Redis for plugin '{plugin_name}' with key '{key}': {e}")
+                self._logger.error(f"Failed to delete data from Redis for plugin '{plugin_name}' with keys {list(keys)}: {e}")
 
-        # Always try to delete local file as well
-        try:
-            local_path = self._get_local_path(plugin_name, key)
-            if local_path.exists():
-                local_path.unlink()
-                self._logger.info(f"Deleted data from local file for plugin '{plugin_name}' with key '{key}'.")
-                deleted = True
-        except Exception as e:
-            self._logger.error(f"Failed to delete data locally for plugin '{plugin_name}' with key '{key}': {e}")
+        # Always try to delete local files as well
+        for key in keys:
+            try:
+                local_path = self._get_local_path(plugin_name, key)
+                if local_path.exists():
+                    local_path.unlink()
+                    self._logger.info("Deleted data from local file for plugin '%s' with key '%s'.", plugin_name, key)
+                    deleted.add(key)
+            except Exception as e:
+                self._logger.error(f"Failed to delete data locally for plugin '{plugin_name}' with key '{key}': {e}")
 
-        if not deleted and not self.redis_client:
-            self._logger.warning(f"No data found to delete for plugin '{plugin_name}' with key '{key}'.")
+            if key not in deleted and not self.redis_client:
+                self._logger.warning(f"No data found to delete for plugin '{plugin_name}' with key '{key}'.")
 
 # Global instance to be used across the application
 data_storage_manager = DataStorageManager()
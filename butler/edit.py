@@ -1,7 +1,10 @@
+import asyncio
+import inspect
+import io
 import shlex
 from collections import defaultdict
 from pathlib import Path
-from typing import Literal, get_args
+from typing import Awaitable, Callable, Literal, get_args
 
 from .base import BaseTool, CLIResult, ToolError, ToolResult
 from .run import maybe_truncate, run
@@ -16,6 +19,30 @@ Command = Literal[
 SNIPPET_LINES: int = 4
 
 
+def _expand_tabs(text: str) -> str:
+    """仅在文本包含制表符时才展开，避免无谓地复制整个文件内容。"""
+    return text.expandtabs() if "\t" in text else text
+
+
+def _line_offset(text: str, line: int) -> int:
+    """返回第 line 行（从 0 开始）起始处的字符偏移；行号超出范围时返回 -1。"""
+    pos = 0
+    for _ in range(line):
+        pos = text.find("\n", pos) + 1
+        if pos == 0:
+            return -1
+    return pos
+
+
+def _slice_lines(text: str, start: int, end: int) -> str:
+    """返回第 start 行到第 end 行（不含）的文本，等价于 "\n".join(text.split("\n")[start:end])。"""
+    a = _line_offset(text, start)
+    if a < 0:
+        return ""
+    b = _line_offset(text, end)
+    return text[a:] if b < 0 else text[a : b - 1]
+
+
 class EditTool(BaseTool):
     """
     允许代理查看、创建和编辑文件的文件系统编辑器工具。
@@ -24,11 +51,30 @@ class EditTool(BaseTool):
     name: Literal["str_replace_editor"] = "str_replace_editor"
 
     _file_history: dict[Path, list[str]]
+    _newlines: dict[Path, str]
 
-    def __init__(self):
+    def __init__(self, confirm: Callable[[str], bool | Awaitable[bool]] | None = None):
+        """
+        confirm: 可选的许可回调，接收命令摘要并返回（或 await 得到）是否允许执行。
+        未提供时在线程中调用 input() 向终端询问，不阻塞事件循环。
+        """
         self._file_history = defaultdict(list)
+        # 读取时记录每个文件原有的换行符，写回时还原，避免编辑把 CRLF 文件改成 LF
+        self._newlines = {}
+        self._confirm = confirm
         super().__init__()
 
+    async def _ask_permission(self, summary: str) -> bool:
+        """请求用户许可执行命令。"""
+        if self._confirm is not None:
+            allowed = self._confirm(summary)
+            if inspect.isawaitable(allowed):
+                allowed = await allowed
+            return bool(allowed)
+        print(summary)
+        user_input = await asyncio.to_thread(input, "输入 'yes' 继续，输入其他内容取消: ")
+        return user_input.lower() == "yes"
+
     async def __call__(
         self,
         *,
@@ -42,23 +88,19 @@ class EditTool(BaseTool):
         **kwargs,
     ):
         # 执行命令前请求用户许可
-        print(f"是否要执行以下命令？")
-        print(f"命令: {command}")
-        print(f"路径: {path}")
+        summary = [f"是否要执行以下命令？", f"命令: {command}", f"路径: {path}"]
         if file_text:
-            print(f"文件内容: {file_text}")
+            summary.append(f"文件内容: {file_text}")
         if view_range:
-            print(f"查看范围: {view_range}")
+            summary.append(f"查看范围: {view_range}")
         if old_str:
-            print(f"旧字符串: {old_str}")
+            summary.append(f"旧字符串: {old_str}")
         if new_str:
-            print(f"新字符串: {new_str}")
+            summary.append(f"新字符串: {new_str}")
         if insert_line is not None:
-            print(f"插入行: {insert_line}")
+            summary.append(f"插入行: {insert_line}")
 
-        user_input = input("输入 'yes' 继续，输入其他内容取消: ")
-
-        if user_input.lower() != "yes":
+        if not await self._ask_permission("\n".join(summary)):
             return ToolResult(
                 system="命令执行被用户取消",
                 error="用户未提供执行命令的权限。",
@@ -70,7 +112,7 @@ class EditTool(BaseTool):
         elif command == "create":
             if not file_text:
                 raise ToolError("对于 create 命令，参数 `file_text` 是必需的")
-            self.write_file(_path, file_text)
+            await self.write_file(_path, file_text)
             self._file_history[_path].append(file_text)
             return ToolResult(output=f"文件已成功创建于: {_path}")
         elif command == "str_replace":
@@ -78,7 +120,7 @@ class EditTool(BaseTool):
                 raise ToolError(
                     "对于 str_replace 命令，参数 `old_str` 是必需的"
                 )
-            return self.str_replace(_path, old_str, new_str)
+            return await self.str_replace(_path, old_str, new_str)
         elif command == "insert":
             if insert_line is None:
                 raise ToolError(
@@ -86,9 +128,9 @@ class EditTool(BaseTool):
                 )
             if not new_str:
                 raise ToolError("对于 insert 命令，参数 `new_str` 是必需的")
-            return self.insert(_path, insert_line, new_str)
+            return await self.insert(_path, insert_line, new_str)
         elif command == "undo_edit":
-            return self.undo_edit(_path)
+            return await self.undo_edit(_path)
         raise ToolError(
             f'无法识别的命令 {command}。{self.name} 工具允许使用的命令是: {", ".join(get_args(Command))}'
         )
@@ -135,52 +177,53 @@ class EditTool(BaseTool):
                 stdout = f"这是 {path} 中深达 2 级的文件和目录（不包括隐藏项目）：\n{stdout}\n"
             return CLIResult(output=stdout, error=stderr)
 
-        file_content = self.read_file(path)
         init_line = 1
-        if view_range:
+        if not view_range:
+            file_content = await self.read_file(path)
+        else:
             if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
                 raise ToolError(
                     "无效的 `view_range`。它应该是包含两个整数的列表。"
                 )
-            file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
             init_line, final_line = view_range
-            if init_line < 1 or init_line > n_lines_file:
-                raise ToolError(
-                    f"无效的 `view_range`: {view_range}。它的第一个元素 `{init_line}` 应该在文件的行数范围内: {[1, n_lines_file]}"
-                )
-            if final_line > n_lines_file:
-                raise ToolError(
-                    f"无效的 `view_range`: {view_range}。它的第二个元素 `{final_line}` 应该小于文件的行数: `{n_lines_file}`"
-                )
+            # 只流式读取所需范围；提前结束说明范围在文件之内，仅在报错时才统计总行数
+            file_lines, n_lines_file = await asyncio.to_thread(self.read_lines, path, init_line, final_line)
+            if n_lines_file is None and init_line < 1:
+                n_lines_file = (await self.read_file(path)).count("\n") + 1
+            if n_lines_file is not None:
+                if init_line < 1 or init_line > n_lines_file:
+                    raise ToolError(
+                        f"无效的 `view_range`: {view_range}。它的第一个元素 `{init_line}` 应该在文件的行数范围内: {[1, n_lines_file]}"
+                    )
+                if final_line > n_lines_file:
+                    raise ToolError(
+                        f"无效的 `view_range`: {view_range}。它的第二个元素 `{final_line}` 应该小于文件的行数: `{n_lines_file}`"
+                    )
             if final_line != -1 and final_line < init_line:
                 raise ToolError(
                     f"无效的 `view_range`: {view_range}。它的第二个元素 `{final_line}` 应该大于或等于第一个元素 `{init_line}`"
                 )
 
-            if final_line == -1:
-                file_content = "\n".join(file_lines[init_line - 1 :])
-            else:
-                file_content = "\n".join(file_lines[init_line - 1 : final_line])
+            file_content = "\n".join(file_lines)
 
         return CLIResult(
             output=self._make_output(file_content, str(path), init_line=init_line)
         )
 
-    def str_replace(self, path: Path, old_str: str, new_str: str | None):
+    async def str_replace(self, path: Path, old_str: str, new_str: str | None):
         """实现str_replace命令，该命令将文件内容中的old_str替换为new_str"""
         # 读取文件内容
-        file_content = self.read_file(path).expandtabs()
-        old_str = old_str.expandtabs()
-        new_str = new_str.expandtabs() if new_str is not None else ""
+        file_content = _expand_tabs(await self.read_file(path))
+        old_str = _expand_tabs(old_str)
+        new_str = _expand_tabs(new_str) if new_str is not None else ""
 
-        # 检查 old_str 在文件中是否唯一
-        occurrences = file_content.count(old_str)
-        if occurrences == 0:
+        # 检查 old_str 在文件中是否唯一：定位首次出现后只需再查找一次
+        pos = file_content.find(old_str)
+        if pos < 0:
             raise ToolError(
                 f"未进行更换, old_str `{old_str}` 未在中逐字出现 {path}."
             )
-        elif occurrences > 1:
+        elif file_content.find(old_str, pos + len(old_str)) != -1:
             file_content_lines = file_content.split("\n")
             lines = [
                 idx + 1
@@ -192,19 +235,19 @@ class EditTool(BaseTool):
             )
 
         # 将old_str替换为new_str
-        new_file_content = file_content.replace(old_str, new_str)
+        new_file_content = file_content[:pos] + new_str + file_content[pos + len(old_str):]
 
         # 将新内容写入文件
-        self.write_file(path, new_file_content)
+        await self.write_file(path, new_file_content)
 
         # 将内容保存到历史记录
         self._file_history[path].append(file_content)
 
         # 创建已编辑节的片段
-        replacement_line = file_content.split(old_str)[0].count("\n")
+        replacement_line = file_content.count("\n", 0, pos)
         start_line = max(0, replacement_line - SNIPPET_LINES)
         end_line = replacement_line + SNIPPET_LINES + new_str.count("\n")
-        snippet = "\n".join(new_file_content.split("\n")[start_line : end_line + 1])
+        snippet = _slice_lines(new_file_content, start_line, end_line + 1)
 
         # 准备成功消息
         success_msg = f"文件 {path} 已编辑。"
@@ -215,34 +258,31 @@ class EditTool(BaseTool):
 
         return CLIResult(output=success_msg)
 
-    def insert(self, path: Path, insert_line: int, new_str: str):
+    async def insert(self, path: Path, insert_line: int, new_str: str):
         """执行insert命令，在文件内容的指定行插入new_str。"""
-        file_text = self.read_file(path).expandtabs()
-        new_str = new_str.expandtabs()
-        file_text_lines = file_text.split("\n")
-        n_lines_file = len(file_text_lines)
+        file_text = _expand_tabs(await self.read_file(path))
+        new_str = _expand_tabs(new_str)
+        n_lines_file = file_text.count("\n") + 1
 
         if insert_line < 0 or insert_line > n_lines_file:
             raise ToolError(
                 f"无效的'insert_line'参数: {insert_line}. 它应该在文件的行的范围内: {[0, n_lines_file]}"
             )
 
-        new_str_lines = new_str.split("\n")
-        new_file_text_lines = (
-            file_text_lines[:insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line:]
-        )
-        snippet_lines = (
-            file_text_lines[max(0, insert_line - SNIPPET_LINES) : insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line : insert_line + SNIPPET_LINES]
+        # 直接在插入行的字符偏移处拼接，不再构建整个文件的行列表
+        if insert_line == n_lines_file:
+            new_file_text = file_text + "\n" + new_str
+        else:
+            offset = _line_offset(file_text, insert_line)
+            new_file_text = file_text[:offset] + new_str + "\n" + file_text[offset:]
+
+        snippet = _slice_lines(
+            new_file_text,
+            max(0, insert_line - SNIPPET_LINES),
+            insert_line + new_str.count("\n") + 1 + SNIPPET_LINES,
         )
 
-        new_file_text = "\n".join(new_file_text_lines)
-        snippet = "\n".join(snippet_lines)
-
-        self.write_file(path, new_file_text)
+        await self.write_file(path, new_file_text)
         self._file_history[path].append(file_text)
 
         success_msg = f"文件 {path} 已编辑。"
@@ -254,29 +294,65 @@ class EditTool(BaseTool):
         success_msg += "检查更改并确保它们符合预期(正确的缩进、无重复行等)。如有必要，再次编辑文件。"
         return CLIResult(output=success_msg)
 
-    def undo_edit(self, path: Path):
+    async def undo_edit(self, path: Path):
         """执行 undo_edit 命令。"""
         if not self._file_history[path]:
             raise ToolError(f"未找到 {path} 的编辑历史。")
 
         old_text = self._file_history[path].pop()
-        self.write_file(path, old_text)
+        await self.write_file(path, old_text)
 
         return CLIResult(
             output=f"成功撤销对 {path} 的最后一次编辑。{self._make_output(old_text, str(path))}"
         )
 
-    def read_file(self, path: Path):
-        """从给定路径读取文件的内容；如果发生错误，则引发 ToolError。"""
+    async def read_file(self, path: Path):
+        """在线程中读取文件的内容，避免阻塞事件循环；如果发生错误，则引发 ToolError。"""
         try:
-            return path.read_text()
+            data = await asyncio.to_thread(path.read_bytes)
+            text = data.decode("utf-8")
         except Exception as e:
             raise ToolError(f"尝试读取 {path} 时遇到 {e}") from None
-
-    def write_file(self, path: Path, file: str):
-        """将文件的内容写入给定的路径；如果发生错误，则引发 ToolError。"""
+        # 一次性解码整个文件，再按 read_text 的通用换行规则统一换行符
+        if "\r" in text:
+            self._newlines[path] = "\r\n" if "\r\n" in text else "\r"
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        else:
+            self._newlines[path] = "\n"
+        return text
+
+    def read_lines(self, path: Path, init_line: int, final_line: int):
+        """
+        逐行读取第 init_line 到 final_line 行（final_line 为 -1 表示到文件末尾），行号与
+        split("\\n") 一致。返回 (行列表, 文件总行数)；越过所需范围后提前停止时总行数为 None。
+        """
+        stop = None if final_line == -1 else max(init_line, final_line)
+        selected = []
+        n_lines = 0
+        line = ""
+        try:
+            with path.open(encoding="utf-8") as f:
+                for n_lines, line in enumerate(f, 1):
+                    if stop is not None and n_lines > stop:
+                        return selected, None
+                    if n_lines >= init_line and (final_line == -1 or n_lines <= final_line):
+                        selected.append(line[:-1] if line.endswith("\n") else line)
+        except Exception as e:
+            raise ToolError(f"尝试读取 {path} 时遇到 {e}") from None
+        # 空文件或以换行结尾时，split("\n") 还会产生一个空的末行
+        if not line or line.endswith("\n"):
+            n_lines += 1
+            if n_lines >= init_line and (final_line == -1 or n_lines <= final_line):
+                selected.append("")
+        return selected, n_lines
+
+    async def write_file(self, path: Path, file: str):
+        """
+        在线程中将内容写入给定的路径，避免阻塞事件循环；如果发生错误，则引发 ToolError。
+        读取过的文件沿用其原有换行符，新文件按平台默认换行符写入。
+        """
         try:
-            path.write_text(file)
+            await asyncio.to_thread(path.write_text, file, encoding="utf-8", newline=self._newlines.get(path))
         except Exception as e:
             raise ToolError(f"尝试写入 {path} 时遇到 {e}") from None
 
@@ -290,15 +366,12 @@ class EditTool(BaseTool):
         """基于文件内容为 CLI 生成输出。"""
         file_content = maybe_truncate(file_content)
         if expand_tabs:
-            file_content = file_content.expandtabs()
-        file_content = "\n".join(
-            [
-                f"{i + init_line:6}\t{line}"
-                for i, line in enumerate(file_content.split("\n"))
-            ]
-        )
-        return (
-            f"这是对 {file_descriptor} 运行 `cat -n` 的结果：\n"
-            + file_content
-            + "\n"
-        )
+            file_content = _expand_tabs(file_content)
+        # 表头与各行依次写入同一个缓冲区，不再构造中间的行列表和拼接结果
+        buf = io.StringIO()
+        buf.write(f"这是对 {file_descriptor} 运行 `cat -n` 的结果：\n")
+        for n, line in enumerate(file_content.split("\n"), init_line):
+            buf.write(f"{n:6}\t")
+            buf.write(line)
+            buf.write("\n")
+        return buf.getvalue()
@@ -8,6 +8,9 @@ from package.core_utils.log_manager import LogManager
 
 logger = LogManager.get_logger(__name__)
 
+# Characters that mean a command needs a real shell (pipes, redirects, globbing, ...).
+_SHELL_META_CHARS = frozenset('|&;<>$*?()[]!#~')
+
 class Interpreter:
     """
     A code interpreter core that can execute Python and Shell code.
@@ -214,8 +217,7 @@ class Interpreter:
         try:
             import shlex
             # Try to run without shell if possible (no pipes, redirects, etc.)
-            shell_chars = {'|', '&', ';', '<', '>', '$', '*', '?', '(', ')', '[', ']', '!', '#', '~'}
-            use_shell = any(char in command for char in shell_chars)
+            use_shell = not _SHELL_META_CHARS.isdisjoint(command)
 
             if not use_shell:
                 cmd_list = shlex.split(command)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Deque
 
 class ShortTermMemory:
     """
@@ -7,12 +8,14 @@ class ShortTermMemory:
     """
     def __init__(self, max_messages: int = 20):
         self.max_messages = max_messages
-        # 结构: {"session_id": [{"role": "user", "content": "你好"}]}
-        self._conversations: Dict[str, List[Dict[str, Any]]] = {}
+        # 结构: {"session_id": deque([{"role": "user", "content": "你好"}])}
+        # 定长 deque 追加时自动丢弃最旧消息，无需每轮切片复制整个列表
+        self._conversations: Dict[str, Deque[Dict[str, Any]]] = {}
 
     def add_message(self, session_id: str, role: str, content: str, metadata: Dict[str, Any] = None):
-        if session_id not in self._conversations:
-            self._conversations[session_id] = []
+        conversation = self._conversations.get(session_id)
+        if conversation is None:
+            conversation = self._conversations[session_id] = deque(maxlen=self.max_messages)
 
         msg = {
             "role": role,
@@ -21,14 +24,10 @@ class ShortTermMemory:
         if metadata:
             msg["metadata"] = metadata
 
-        self._conversations[session_id].append(msg)
-
-        # 保持在指定条数限制内
-        if len(self._conversations[session_id]) > self.max_messages:
-            self._conversations[session_id] = self._conversations[session_id][-self.max_messages:]
+        conversation.append(msg)
 
     def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
-        return self._conversations.get(session_id, [])
+        return list(self._conversations.get(session_id, ()))
 
     def clear(self, session_id: str):
         if session_id in self._conversations:
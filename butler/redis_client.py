@@ -4,11 +4,16 @@ except ImportError:
     redis = None
 import os
 
+# 连接池上限，以及等待空闲连接的超时时间（秒）
+REDIS_MAX_CONNECTIONS = 32
+REDIS_POOL_TIMEOUT = 1
 
-def get_redis_client():
+
+def get_redis_client(decode_responses: bool = True):
     """
     创建并返回一个 Redis 客户端。
     连接参数取自环境变量，并带有默认值。
+    decode_responses=False 时返回原始字节，用于存储二进制序列化数据。
     """
     if redis is None:
         return None
@@ -16,7 +21,12 @@ def get_redis_client():
     redis_port = int(os.getenv("REDIS_PORT", 6379))
     try:
         # decode_responses=True 使客户端返回字符串而不是字节。
-        client = redis.Redis(host=redis_host, port=redis_port, db=0, decode_responses=True)
+        # 阻塞式连接池限制连接总数，并发时等待空闲连接而不是反复新建。
+        pool = redis.BlockingConnectionPool(
+            host=redis_host, port=redis_port, db=0, decode_responses=decode_responses,
+            max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+        )
+        client = redis.Redis(connection_pool=pool)
         client.ping()  # 检查连接是否可用
         return client
     except Exception as e:
@@ -7,7 +7,7 @@ Butler 开发效率工具集
 import os
 from typing import List, Dict, Any, Optional
 from butler.core.hybrid_link import HybridLinkClient
-from butler.core.extension_manager import extension_manager
+from butler.core.extension_manager import get_extension_manager
 
 class DevTools:
     def __init__(self):
@@ -18,11 +18,12 @@ class DevTools:
         if self._client:
             return self._client
 
-        info = extension_manager.code_execution_manager.get_program("hybrid_sysutil")
+        em = get_extension_manager()
+        info = em.code_execution_manager.get_program("hybrid_sysutil")
         if not info:
             # 尝试重新扫描
-            extension_manager.code_execution_manager.scan_and_register()
-            info = extension_manager.code_execution_manager.get_program("hybrid_sysutil")
+            em.code_execution_manager.scan_and_register()
+            info = em.code_execution_manager.get_program("hybrid_sysutil")
 
         if not info:
             raise RuntimeError("混合编程模块 'hybrid_sysutil' 未找到，请确保已编译二进制文件。")
@@ -35,7 +35,7 @@ def run(*args, **kwargs):
     混合系统编排器的主入口函数。
     """
     # 延迟导入以避免某些环境下的预加载问题
-    from butler.core.extension_manager import extension_manager
+    from butler.core.extension_manager import get_extension_manager
 
     print("\n" + "="*60)
     print("      Butler 混合链接系统 (Hybrid-Link V2.0)")
@@ -43,15 +43,16 @@ def run(*args, **kwargs):
     print("="*60)
 
     # 1. 扫描并注册所有已编译的二进制程序
-    extension_manager.code_execution_manager.scan_and_register()
+    em = get_extension_manager()
+    em.code_execution_manager.scan_and_register()
 
     # 获取各语言模块的信息
-    compute_info = extension_manager.code_execution_manager.get_program("hybrid_compute")
-    net_info = extension_manager.code_execution_manager.get_program("hybrid_net")
-    crypto_info = extension_manager.code_execution_manager.get_program("hybrid_crypto")
-    sysutil_info = extension_manager.code_execution_manager.get_program("hybrid_sysutil")
-    math_info = extension_manager.code_execution_manager.get_program("hybrid_math")
-    vision_info = extension_manager.code_execution_manager.get_program("hybrid_vision")
+    compute_info = em.code_execution_manager.get_program("hybrid_compute")
+    net_info = em.code_execution_manager.get_program("hybrid_net")
+    crypto_info = em.code_execution_manager.get_program("hybrid_crypto")
+    sysutil_info = em.code_execution_manager.get_program("hybrid_sysutil")
+    math_info = em.code_execution_manager.get_program("hybrid_math")
+    vision_info = em.code_execution_manager.get_program("hybrid_vision")
 
     # 检查模块可用性，若不可用将自动回退到 Python 原生实现
     missing = []
@@ -35,7 +35,7 @@ def run(*args, **kwargs):
     """
     系统审计工具主入口。
     """
-    from butler.core.extension_manager import extension_manager
+    from butler.core.extension_manager import get_extension_manager
 
     print("\n" + "💎"*30)
     print("      Butler 专业级系统执行与调度引擎")
@@ -43,8 +43,9 @@ def run(*args, **kwargs):
     print("💎"*30)
 
     # 1. 扫描并查找 Go 原生程序
-    extension_manager.code_execution_manager.scan_and_register()
-    prog_info = extension_manager.code_execution_manager.get_program("hybrid_system_executor")
+    em = get_extension_manager()
+    em.code_execution_manager.scan_and_register()
+    prog_info = em.code_execution_manager.get_program("hybrid_system_executor")
 
     if not prog_info:
         return "❌ 错误: 未能找到 'hybrid_system_executor' 模块。"
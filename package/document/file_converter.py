@@ -264,9 +264,10 @@ def convert_file(input_file_path, output_file_path, output_folder):
 
 def docx_to_txt(input_file_path, output_file_path):
     doc = Document(input_file_path)
+    # 先在内存中拼好全文再一次写出，避免逐段 write
+    text = "".join(para.text + "\n" for para in doc.paragraphs)
     with open(output_file_path, "w", encoding="utf-8") as txt_file:
-        for para in doc.paragraphs:
-            txt_file.write(para.text + "\n")
+        txt_file.write(text)
     print(f"转换 {input_file_path} to {output_file_path}")
 
 
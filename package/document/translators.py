@@ -1,5 +1,7 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import uuid
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
@@ -10,6 +12,23 @@ from package.core_utils.quota_manager import quota_manager
 def load_api_key():
     return config_loader.get("api.deepseek.key")
 
+# 网页翻译一次会连续调用多次接口（标题、正文、失败回退），共享会话复用 keep-alive 连接，
+# 避免每次都重新进行 TCP/TLS 握手；网关错误时退避重试，读取超时不重试以免重复计费
+_API_TIMEOUT = (3.05, None)  # 只限制建连；整篇文件翻译可能耗时很久，读取不设上限
+_session = None
+
+def _get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        retry = Retry(total=2, read=0, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"POST"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
 def detect_language(text):
     if not quota_manager.check_quota():
         return "quota_exceeded"
@@ -31,7 +50,7 @@ def detect_language(text):
         "temperature": 0
     }
 
-    response = requests.post(endpoint, headers=headers, json=payload)
+    response = _get_session().post(endpoint, headers=headers, json=payload, timeout=_API_TIMEOUT)
     response.raise_for_status()
     resp_json = response.json()
 
@@ -65,7 +84,7 @@ def translate_text(text):
         "temperature": 1.1 # DeepSeek recommended for translation
     }
 
-    response = requests.post(endpoint, headers=headers, json=payload)
+    response = _get_session().post(endpoint, headers=headers, json=payload, timeout=_API_TIMEOUT)
     response.raise_for_status()
     resp_json = response.json()
 
@@ -106,7 +125,7 @@ def translate_bilingual(text, context=None):
     }
 
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
+        response = _get_session().post(endpoint, headers=headers, json=payload, timeout=_API_TIMEOUT)
         response.raise_for_status()
         resp_json = response.json()
 
@@ -20,6 +20,9 @@ class DataRecycler:
             "*.pyc", "*.pyo", "*.pyd", ".DS_Store", "*_last_run.txt",
             "*_exec", "*.so", "*.o", "*.class", "hello_executable"
         }
+        # 模式都是“*后缀”或完整文件名，预先拆开后用 str.endswith / 集合查找代替逐个 Path.match
+        self._temp_suffixes = tuple(p[1:] for p in self.temp_patterns if p.startswith("*"))
+        self._temp_names = {p for p in self.temp_patterns if not p.startswith("*")}
         self.specific_files = {"scheduled_tasks.log"}
         self.external_dirs = ["/tmp/outputs"]
 
@@ -57,14 +60,9 @@ class DataRecycler:
 
             # Check for files to delete
             for f in files:
-                path = pathlib.Path(root) / f
-                is_temp_file = False
-                for pattern in self.temp_patterns:
-                    if path.match(pattern):
-                        is_temp_file = True
-                        break
-
+                is_temp_file = f.endswith(self._temp_suffixes) or f in self._temp_names
                 if is_temp_file or (root == str(self.root_dir) and f in self.specific_files):
+                    path = pathlib.Path(root) / f
                     try:
                         size = path.stat().st_size
                         results.append(f"[FILE] {path.relative_to(self.root_dir)} ({size} bytes)")
@@ -110,12 +108,21 @@ class DataRecycler:
         return results, summary
 
     def _get_dir_size(self, path):
+        # os.scandir 的 DirEntry 自带类型信息，只需为文件取一次大小
         total = 0
-        for p in path.rglob("*"):
+        pending = [path]
+        while pending:
             try:
-                if p.is_file():
-                    total += p.stat().st_size
-            except FileNotFoundError:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file():
+                                total += entry.stat().st_size
+                        except OSError:
+                            pass
+            except OSError:
                 pass
         return total
 
@@ -16,7 +16,7 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from butler.core.hybrid_link import HybridLinkClient
-from butler.core.extension_manager import extension_manager
+from butler.core.extension_manager import get_extension_manager
 
 def on_event(event: Dict[str, Any]):
     """处理来自 Go 模块的异步事件"""
@@ -55,8 +55,9 @@ def run(*args, **kwargs):
         parsed_args = parser.parse_args(["--mode", "ping", "--hosts", "google.com", "baidu.com", "github.com"])
 
     # 查找 Go 二进制
-    extension_manager.code_execution_manager.scan_and_register()
-    prog_info = extension_manager.code_execution_manager.get_program("hybrid_net")
+    em = get_extension_manager()
+    em.code_execution_manager.scan_and_register()
+    prog_info = em.code_execution_manager.get_program("hybrid_net")
 
     if not prog_info:
         print("❌ 错误: 未找到 hybrid_net Go 二进制文件。")
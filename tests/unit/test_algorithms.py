@@ -0,0 +1,183 @@
+"""butler.core.algorithms 单元测试。"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from butler.core import algorithms
+
+
+class TestBinarySearch:
+    """binary_search 测试。"""
+
+    def test_found_in_list(self):
+        """列表中存在目标时返回其索引。"""
+        assert algorithms.binary_search([1, 3, 5, 7, 9], 7) == 3
+
+    def test_missing_in_list(self):
+        """目标不存在（含越界）时返回 -1。"""
+        assert algorithms.binary_search([1, 3, 5], 4) == -1
+        assert algorithms.binary_search([1, 3, 5], 10) == -1
+        assert algorithms.binary_search([], 1) == -1
+
+    def test_batched_numpy_targets(self):
+        """numpy 数组支持批量查找。"""
+        np = pytest.importorskip("numpy")
+        arr = np.array([1, 3, 5, 7])
+        result = algorithms.binary_search(arr, np.array([3, 4, 7, 8]))
+        assert result.tolist() == [1, -1, 3, -1]
+        assert algorithms.binary_search(arr, 5) == 2
+
+
+class TestDijkstra:
+    """dijkstra 测试。"""
+
+    GRAPH = {
+        "A": {"B": 1, "C": 4},
+        "B": {"A": 1, "C": 2, "D": 5},
+        "C": {"A": 4, "B": 2, "D": 1},
+        "D": {"B": 5, "C": 1},
+    }
+
+    def test_dict_graph(self):
+        """邻接字典图返回最短距离与前驱。"""
+        distances, predecessors = algorithms.dijkstra(self.GRAPH, "A")
+        assert distances == {"A": 0, "B": 1, "C": 3, "D": 4}
+        assert predecessors["D"] == "C"
+
+    def test_csr_graph_matches_dict_graph(self):
+        """预编译的 CSR 图与邻接字典图结果一致。"""
+        pytest.importorskip("numpy")
+        csr = algorithms.compile_graph(self.GRAPH)
+        expected = algorithms.dijkstra(self.GRAPH, "A")
+        assert algorithms.dijkstra(csr, "A") == expected
+
+
+class TestTextCosineSimilarity:
+    """text_cosine_similarity 测试。"""
+
+    def test_identical_and_disjoint_texts(self):
+        """相同文本相似度为 1，无共同词时为 0；重复调用结果稳定。"""
+        for _ in range(2):
+            assert algorithms.text_cosine_similarity("open the door", "open the door") == pytest.approx(1.0)
+            assert algorithms.text_cosine_similarity("open door", "close window") == pytest.approx(0.0)
+
+    @pytest.mark.skipif(algorithms.TfidfVectorizer is None, reason="需要 scikit-learn")
+    def test_matches_pairwise_fit_transform(self):
+        """不重新拟合词表，结果仍与每次 fit_transform 两段文本一致。"""
+        text1, text2 = "play some music please", "Plays music from the music library"
+        matrix = algorithms.TfidfVectorizer().fit_transform([text1, text2])
+        expected = matrix[0].multiply(matrix[1]).sum()
+        assert algorithms.text_cosine_similarity(text1, text2) == pytest.approx(expected)
+
+
+@pytest.mark.skipif(algorithms.TfidfVectorizer is None, reason="需要 scikit-learn")
+class TestHybridMatcher:
+    """HybridMatcher 语义匹配测试。"""
+
+    def test_semantic_match(self):
+        """按 TF-IDF 相似度选出最接近的技能，低于阈值时返回 None。"""
+        matcher = algorithms.HybridMatcher({
+            "music": {"name": "music player", "description": "play songs and music", "keywords": ["song"]},
+            "weather": {"name": "weather", "description": "today weather forecast", "keywords": ["rain"]},
+        })
+        assert matcher.match("play some music") == "music"
+        assert matcher.match("will it rain today") == "weather"
+        assert matcher.match("open the door") is None
+
+
+class TestSubstringIndex:
+    """SubstringIndex 测试。"""
+
+    def test_matches_linear_scan(self):
+        """返回第一个包含查询串的键，与逐个检查 `query in key` 一致。"""
+        keys = ["邮箱", "播放音乐", "对称加密", "非对称加密", "天气预报"]
+        index = algorithms.SubstringIndex(keys)
+        for query in ["音乐", "加密", "非对称", "天气预报", "预报", "邮"]:
+            assert index.find(query) == next(k for k in keys if query in k)
+
+    def test_no_match_across_keys(self):
+        """查询不会跨越两个键的边界命中，空查询返回 None。"""
+        index = algorithms.SubstringIndex(["ab", "cd"])
+        assert index.find("bc") is None
+        assert index.find("") is None
+        assert index.find("b\x00c") is None
+
+    def test_ignore_case(self):
+        """忽略大小写时按 casefold 比较，返回原始键。"""
+        index = algorithms.SubstringIndex(["邮箱", "Rust加密"], ignore_case=True)
+        assert index.find("rust") == "Rust加密"
+        assert index.find("RUST加密") == "Rust加密"
+        assert algorithms.SubstringIndex(["Rust加密"]).find("rust") is None
+
+
+class TestEdgeDetection:
+    """edge_detection 设备选择测试。"""
+
+    def _fake_cv2(self, pixels, cuda_devices):
+        cv2 = MagicMock()
+        cv2.imread.return_value = MagicMock(size=pixels)
+        cv2.cuda.getCudaEnabledDeviceCount.return_value = cuda_devices
+        return cv2
+
+    @pytest.mark.parametrize("pixels, cuda_devices, on_gpu", [
+        (4_000_000, 1, True),
+        (100_000, 1, False),
+        (4_000_000, 0, False),
+    ])
+    def test_routes_large_images_to_cuda(self, monkeypatch, pixels, cuda_devices, on_gpu):
+        """只有大图且存在 CUDA 设备时才走 GPU Canny。"""
+        cv2 = self._fake_cv2(pixels, cuda_devices)
+        monkeypatch.setattr(algorithms, "_lazy_import", lambda name: cv2)
+        algorithms._cuda_canny_detector.cache_clear()
+        try:
+            algorithms.edge_detection("image.png")
+        finally:
+            algorithms._cuda_canny_detector.cache_clear()
+        assert cv2.cuda.createCannyEdgeDetector.return_value.detect.called is on_gpu
+        assert cv2.Canny.called is not on_gpu
+
+
+class TestFibonacci:
+    """fibonacci 测试。"""
+
+    def test_small_values(self):
+        """前几项与定义一致。"""
+        assert [algorithms.fibonacci(n) for n in range(8)] == [0, 1, 1, 2, 3, 5, 8, 13]
+
+    def test_int64_boundary(self):
+        """int64 边界两侧结果正确（超出部分使用大整数）。"""
+        assert algorithms.fibonacci(92) == 7540113804746346429
+        assert algorithms.fibonacci(93) == 12200160415121876738
+        assert algorithms.fibonacci(100) == 354224848179261915075
+
+    def test_fast_doubling_matches_iteration(self):
+        """大整数区间的快速倍增结果与逐项迭代一致。"""
+        a, b = 0, 1
+        for n in range(300):
+            assert algorithms._fibonacci_pair(n) == (a, b)
+            a, b = b, a + b
+
+
+class TestKeywordIndex:
+    """KeywordIndex 测试。"""
+
+    def test_matches_linear_scan(self):
+        """返回第一个有关键词出现在文本中的分组，与按分组顺序逐个检查一致（含前缀关键词）。"""
+        groups = [
+            ("a", ["mus", "天气"]),
+            ("b", ["music", "播放"]),
+            ("c", ["music player", "邮件"]),
+            ("d", ["play"]),
+        ]
+        index = algorithms.KeywordIndex(groups)
+        for text in ["open music player", "play a song", "发邮件", "播放音乐", "今天天气", "nothing", "", "musi"]:
+            expected = next((g for g, kws in groups if any(k in text for k in kws)), None)
+            assert index.find(text) == expected
+
+    def test_empty_keyword_always_matches(self):
+        """空关键词与 `"" in text` 一致，总是命中。"""
+        index = algorithms.KeywordIndex([("a", ["x"]), ("b", [""]), ("c", ["y"])])
+        assert index.find("y") == "b"
+        assert index.find("x") == "a"
+        assert algorithms.KeywordIndex([]).find("x") is None
@@ -0,0 +1,207 @@
+"""DataStorageManager Redis 序列化单元测试。"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from butler import data_storage
+
+
+class FakePipeline:
+    """记录命令并在 execute 时一次性执行。"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def get(self, key):
+        self._commands.append(lambda: self._redis.get(key))
+
+    def set(self, key, value):
+        self._commands.append(lambda: self._redis.set(key, value))
+
+    def delete(self, *keys):
+        self._commands.append(lambda: self._redis.delete(*keys))
+
+    def srem(self, name, *values):
+        self._commands.append(lambda: self._redis.srem(name, *values))
+
+    def reset(self):
+        self._commands = []
+
+    def execute(self):
+        self._redis.executed += 1
+        commands, self._commands = self._commands, []
+        return [command() for command in commands]
+
+
+class FakeSaveScript:
+    """模拟保存脚本：SET 数据键并 SADD 到索引集合。"""
+
+    def __init__(self, redis):
+        self._redis = redis
+
+    def __call__(self, keys, args, client=None):
+        def run():
+            self._redis.set(keys[0], args[0])
+            self._redis.sadd(keys[1], args[1])
+            return 1
+        if client is None:
+            return run()
+        client._commands.append(run)
+
+
+class FakeRedis:
+    """仅实现测试所需命令的内存 Redis，返回原始字节。"""
+
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+        self.executed = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        return FakeSaveScript(self)
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value):
+        self.store[key] = value if isinstance(value, bytes) else value.encode("utf-8")
+
+    def delete(self, *keys):
+        return sum(self.store.pop(k, None) is not None for k in keys)
+
+    def sadd(self, name, *values):
+        self.sets.setdefault(name, set()).update(v.encode("utf-8") for v in values)
+
+    def srem(self, name, *values):
+        members = self.sets.get(name, set())
+        members.difference_update(v.encode("utf-8") for v in values)
+        if not members:
+            self.sets.pop(name, None)
+
+    def smembers(self, name):
+        return set(self.sets.get(name, set()))
+
+
+@pytest.fixture
+def storage():
+    fake = FakeRedis()
+    with patch.object(data_storage, "redis_client", fake), \
+         patch.object(data_storage, "get_redis_client", lambda decode_responses=True: fake):
+        manager = data_storage.DataStorageManager()
+    yield manager, fake
+    manager.flush()
+
+
+class TestRedisSerialization:
+    """Redis 值的编码与旧数据迁移测试。"""
+
+    def test_round_trip(self, storage):
+        """保存后读取得到相同的值。"""
+        manager, _ = storage
+        manager.save("plugin", "key", {"a": [1, 2], "b": "中文"})
+        assert manager.load("plugin", "key") == {"a": [1, 2], "b": "中文"}
+
+    def test_legacy_json_is_migrated(self, storage):
+        """旧 JSON 值可读取，安装 msgspec 时被改写为 msgpack。"""
+        manager, fake = storage
+        redis_key = manager._get_plugin_key("plugin", "old")
+        fake.set(redis_key, json.dumps({"x": 1}))
+        assert manager.load("plugin", "old") == {"x": 1}
+        if data_storage.msgspec is not None:
+            assert fake.store[redis_key].startswith(data_storage._MSGPACK_TAG)
+
+    def test_scalars_use_tagged_fast_path(self, storage):
+        """str/int/bool 以单字节标签加文本保存，读取时类型不变。"""
+        manager, fake = storage
+        values = {"s": "中文", "i": -42, "big": 2 ** 70, "t": True, "f": False}
+        manager.save_many("plugin", values)
+        assert fake.store[manager._get_plugin_key("plugin", "s")] == data_storage._STR_TAG + "中文".encode("utf-8")
+        assert fake.store[manager._get_plugin_key("plugin", "i")] == data_storage._INT_TAG + b"-42"
+        loaded = manager.load_many("plugin", list(values))
+        assert loaded == values
+        assert type(loaded["t"]) is bool and type(loaded["i"]) is int
+
+
+class TestBatchOperations:
+    """批量读写与删除测试。"""
+
+    def test_save_many_single_round_trip(self, storage):
+        """save_many 只执行一次流水线。"""
+        manager, fake = storage
+        manager.save_many("plugin", {"a": 1, "b": 2, "c": 3})
+        assert fake.executed == 1
+        assert manager.load_many("plugin", ["c", "a", "missing"]) == {"c": 3, "a": 1, "missing": None}
+        assert fake.executed == 2
+
+    def test_delete_many(self, storage):
+        """delete_many 删除全部指定键。"""
+        manager, fake = storage
+        manager.save_many("plugin", {"a": 1, "b": 2})
+        manager.delete_many("plugin", ["a", "b"])
+        assert fake.store == {}
+
+    def test_list_keys_follows_saves_and_deletes(self, storage):
+        """保存的键进入插件索引，删除后从索引移除。"""
+        manager, fake = storage
+        manager.save_many("plugin", {"a": 1, "b": 2})
+        manager.save("plugin", "c", 3)
+        manager.save_many("other", {"x": 0})
+        assert manager.list_keys("plugin") == ["a", "b", "c"]
+        manager.flush()
+        manager.delete("plugin", "a")
+        assert manager.list_keys("plugin") == ["b", "c"]
+        assert fake.smembers(manager._get_index_key("plugin")) == {b"b", b"c"}
+
+
+class TestBackgroundWriter:
+    """后台写入线程测试。"""
+
+    def test_save_is_visible_before_flush(self, storage):
+        """异步保存的值在写入 Redis 前即可读取，flush 后落盘。"""
+        manager, fake = storage
+        manager.save("plugin", "key", {"v": 1})
+        assert manager.load("plugin", "key") == {"v": 1}
+        manager.flush()
+        assert manager._get_plugin_key("plugin", "key") in fake.store
+        assert manager.load("plugin", "key") == {"v": 1}
+
+    def test_save_snapshots_value(self, storage):
+        """保存时即序列化，之后修改原对象不影响已保存的值。"""
+        manager, _ = storage
+        value = {"v": 1}
+        manager.save("plugin", "key", value)
+        value["v"] = 2
+        manager.flush()
+        assert manager.load("plugin", "key") == {"v": 1}
+
+    def test_delete_drops_queued_save(self, storage):
+        """删除会丢弃尚未写入的保存。"""
+        manager, fake = storage
+        manager.save("plugin", "key", 1)
+        manager.delete("plugin", "key")
+        manager.flush()
+        assert fake.store == {}
+
+
+class TestTypedLoad:
+    """按 msgspec 结构体类型读取测试。"""
+
+    def test_load_into_struct(self, storage):
+        """type 参数将值直接解码为结构体。"""
+        msgspec = pytest.importorskip("msgspec")
+
+        class Item(msgspec.Struct):
+            id: str
+            content: str
+            metadata: dict
+
+        manager, _ = storage
+        manager.save_sync("plugin", "item", {"id": "1", "content": "c", "metadata": {"k": 1}})
+        item = manager.load("plugin", "item", type=Item)
+        assert item == Item(id="1", content="c", metadata={"k": 1})
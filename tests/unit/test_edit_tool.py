@@ -0,0 +1,27 @@
+"""EditTool 文件读写单元测试。"""
+
+import asyncio
+
+from butler.edit import EditTool
+
+
+class TestNewlinePreservation:
+    """编辑后保留文件原有换行符。"""
+
+    def _replace(self, path, old, new):
+        tool = EditTool(confirm=lambda summary: True)
+        return asyncio.run(tool(command="str_replace", path=str(path), old_str=old, new_str=new))
+
+    def test_crlf_file_stays_crlf(self, tmp_path):
+        """CRLF 文件经 str_replace 后仍为 CRLF。"""
+        path = tmp_path / "win.txt"
+        path.write_bytes(b"alpha\r\nbeta\r\n")
+        self._replace(path, "beta", "gamma")
+        assert path.read_bytes() == b"alpha\r\ngamma\r\n"
+
+    def test_lf_file_stays_lf(self, tmp_path):
+        """LF 文件经 str_replace 后仍为 LF。"""
+        path = tmp_path / "unix.txt"
+        path.write_bytes(b"alpha\nbeta\n")
+        self._replace(path, "beta", "gamma")
+        assert path.read_bytes() == b"alpha\ngamma\n"
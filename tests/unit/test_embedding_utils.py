@@ -0,0 +1,28 @@
+"""embedding_utils int8 量化单元测试。"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from package.core_utils import embedding_utils
+
+
+class TestInt8Quantization:
+    """int8 量化与相似度计算测试。"""
+
+    def test_quantize_int8_range(self):
+        """量化结果为 int8 且保留方向。"""
+        q = embedding_utils.quantize_int8([3.0, -4.0, 0.0])
+        assert q.dtype == np.int8
+        assert q.tolist() == [76, -102, 0]
+
+    def test_int8_cosine_matches_float(self):
+        """int8 余弦相似度与 float32 结果误差很小。"""
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((4, 64)).astype(np.float32)
+        query = rng.standard_normal(64).astype(np.float32)
+        expected = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+
+        q_matrix = np.stack([embedding_utils.quantize_int8(row) for row in matrix])
+        sims = embedding_utils.int8_cosine_similarities(embedding_utils.quantize_int8(query), q_matrix)
+        assert np.allclose(sims, expected, atol=0.02)
@@ -0,0 +1,31 @@
+"""ExtensionManager 包扫描与执行单元测试。"""
+
+from unittest.mock import MagicMock
+
+from butler.core.extension_manager import ExtensionManager
+
+
+def _make_manager(package_dir):
+    # 跳过插件/外部程序扫描，只测试包相关逻辑
+    manager = ExtensionManager.__new__(ExtensionManager)
+    manager.plugin_manager = MagicMock()
+    manager.plugin_manager.get_plugin.return_value = None
+    manager.package_dir = str(package_dir)
+    manager.packages = {}
+    manager._package_runners = {}
+    return manager
+
+
+class TestPackages:
+    """包扫描与执行测试。"""
+
+    def test_scan_and_execute(self, tmp_path):
+        """只登记带 run() 的脚本，加载失败的脚本被跳过，执行时调用缓存的 run。"""
+        (tmp_path / "echo.py").write_text('"""回显"""\ndef run(text):\n    return text * 2\n', encoding="utf-8")
+        (tmp_path / "helper.py").write_text("VALUE = 1\n", encoding="utf-8")
+        (tmp_path / "broken.py").write_text("raise RuntimeError('boom')\n", encoding="utf-8")
+        manager = _make_manager(tmp_path)
+        manager._scan_packages()
+
+        assert list(manager.packages) == ["echo"]
+        assert manager.execute("echo", "ab") == "abab"
@@ -0,0 +1,29 @@
+"""hybrid_fallbacks Python 回退实现单元测试。"""
+
+from butler.core import hybrid_fallbacks
+
+
+class TestFastFileSearch:
+    """fast_file_search 测试。"""
+
+    def test_finds_nested_files_and_skips_git(self, tmp_path):
+        """递归查找子目录中的匹配文件，跳过 .git 目录。"""
+        (tmp_path / "a" / "b").mkdir(parents=True)
+        (tmp_path / ".git").mkdir()
+        (tmp_path / "a" / "b" / "target.txt").write_text("x")
+        (tmp_path / "target_top.txt").write_text("x")
+        (tmp_path / ".git" / "target.txt").write_text("x")
+
+        result = hybrid_fallbacks.fast_file_search(str(tmp_path), "target")
+        assert sorted(result["files"]) == sorted([
+            str(tmp_path / "a" / "b" / "target.txt"),
+            str(tmp_path / "target_top.txt"),
+        ])
+        assert result["count"] == 2
+
+    def test_stops_at_limit(self, tmp_path, monkeypatch):
+        """达到结果上限后立即停止遍历。"""
+        monkeypatch.setattr(hybrid_fallbacks, "_SEARCH_LIMIT", 3)
+        for i in range(5):
+            (tmp_path / f"f{i}.log").write_text("x")
+        assert hybrid_fallbacks.fast_file_search(str(tmp_path), ".log")["count"] == 3
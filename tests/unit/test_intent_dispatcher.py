@@ -82,3 +82,41 @@ class TestIntentRegistry:
         """dispatch 未注册意图返回 None。"""
         registry = IntentRegistry()
         assert registry.dispatch("nonexistent") is None
+
+    def test_get_all_intents_refreshes_after_register(self):
+        """注册新意图后 get_all_intents 不返回过期缓存。"""
+        registry = IntentRegistry()
+
+        @registry.register("first")
+        def first(**kwargs):
+            """第一个。"""
+
+        assert set(registry.get_all_intents()) == {"first"}
+
+        @registry.register("second")
+        def second(**kwargs):
+            """第二个。"""
+
+        assert set(registry.get_all_intents()) == {"first", "second"}
+
+    def test_requires_entities_default_for_unknown(self):
+        """未注册意图默认需要实体。"""
+        registry = IntentRegistry()
+
+        @registry.register("no_entities", requires_entities=False)
+        def handler(**kwargs):
+            pass
+
+        assert registry.intent_requires_entities("no_entities") is False
+        assert registry.intent_requires_entities("nonexistent") is True
+
+    def test_get_handler(self):
+        """get_handler 返回注册的函数，未知意图返回 None。"""
+        registry = IntentRegistry()
+
+        @registry.register("test_handler")
+        def handler(**kwargs):
+            return "ok"
+
+        assert registry.get_handler("test_handler") is handler
+        assert registry.get_handler("unknown") is None
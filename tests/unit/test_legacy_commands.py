@@ -0,0 +1,65 @@
+"""legacy_commands 意图处理函数单元测试。"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from butler.core import legacy_commands
+
+
+@pytest.fixture
+def jarvis_app():
+    """模拟 Jarvis 实例，仅记录 speak/ui_print 调用。"""
+    return MagicMock()
+
+
+class TestMathIntents:
+    """数字类意图测试。"""
+
+    def test_sort_numbers(self, jarvis_app):
+        """排序结果以列表形式播报。"""
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": [3, 1, 2]})
+        jarvis_app.speak.assert_called_once_with("排序结果: [1, 2, 3]")
+
+    def test_sort_numbers_rejects_non_numeric(self, jarvis_app):
+        """混入非数字时拒绝排序。"""
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": [3, "a", 2]})
+        jarvis_app.speak.assert_called_once_with("排序失败，请提供有效的数字列表。")
+
+    def test_sort_and_find_long_lists(self, jarvis_app):
+        """长列表走数组排序，结果与内置 sorted 一致；混入非数字时同样拒绝。"""
+        numbers = list(range(40, 0, -1))
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": numbers})
+        legacy_commands.handle_find_number(jarvis_app, {"numbers": numbers, "target": 40})
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": numbers + ["a"]})
+        assert [c.args[0] for c in jarvis_app.speak.call_args_list] == [
+            f"排序结果: {sorted(numbers)}",
+            "数字 40 在排序后的位置是: 39",
+            "排序失败，请提供有效的数字列表。",
+        ]
+
+    def test_sort_long_mixed_lists_keeps_values(self, jarvis_app):
+        """长列表混合 int/float 或含超出 int64 的整数时，结果与内置 sorted 完全一致。"""
+        mixed = [float(i) if i % 2 else i for i in range(40, 0, -1)]
+        huge = list(range(40)) + [2 ** 53 + 1, 2 ** 64]
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": mixed})
+        legacy_commands.handle_sort_numbers(jarvis_app, {"numbers": huge})
+        assert [c.args[0] for c in jarvis_app.speak.call_args_list] == [
+            f"排序结果: {sorted(mixed)}",
+            f"排序结果: {sorted(huge)}",
+        ]
+
+    def test_find_number_keeps_input_order(self, jarvis_app):
+        """查找不修改调用方传入的列表。"""
+        numbers = [5, 1, 3]
+        legacy_commands.handle_find_number(jarvis_app, {"numbers": numbers, "target": 5})
+        jarvis_app.speak.assert_called_once_with("数字 5 在排序后的位置是: 2")
+        assert numbers == [5, 1, 3]
+
+    def test_fibonacci_is_cached(self, jarvis_app):
+        """重复查询命中缓存。"""
+        legacy_commands._cached_fibonacci.cache_clear()
+        for _ in range(2):
+            legacy_commands.handle_calculate_fibonacci(jarvis_app, {"number": 10})
+        jarvis_app.speak.assert_called_with("斐波那契数列第10项是: 55")
+        assert legacy_commands._cached_fibonacci.cache_info().hits == 1
@@ -0,0 +1,41 @@
+"""LocalNLU 固定句式快速路径单元测试。"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from butler.core.local_nlu import LocalNLU
+
+
+@pytest.fixture
+def local_nlu():
+    return LocalNLU(MagicMock())
+
+
+class TestFastPath:
+    """高频固定句式整句匹配测试。"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("排序 3, 1, 2", ("sort_numbers", {"numbers": [3, 1, 2]})),
+        ("sort [5 -1 2.5]", ("sort_numbers", {"numbers": [5, -1, 2.5]})),
+        ("斐波那契第 10 项", ("calculate_fibonacci", {"number": 10})),
+        ("Fibonacci 7", ("calculate_fibonacci", {"number": 7})),
+        ("现在几点了？", ("get_current_time", {})),
+    ])
+    def test_matches(self, local_nlu, text, expected):
+        """固定句式直接得到意图与实体。"""
+        assert local_nlu.match_fast_path(text) == expected
+
+    @pytest.mark.parametrize("text", [
+        "帮我把这些文件排序 3 1 2 然后发邮件",
+        "排序 3",
+        "现在几点了，顺便查下天气",
+    ])
+    def test_free_form_falls_through(self, local_nlu, text):
+        """句式不完全匹配时交给 LLM，不做部分匹配。"""
+        assert local_nlu.match_fast_path(text) is None
+
+    def test_extract_intent_uses_fast_path(self, local_nlu):
+        """离线提取意图时优先走快速路径。"""
+        assert local_nlu.extract_intent("sort 2 1") == ("sort_numbers", {"numbers": [2, 1]}, "intent")
+        local_nlu.skill_manager.match_skill.assert_not_called()
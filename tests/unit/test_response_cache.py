@@ -0,0 +1,84 @@
+"""ResponseCache 响应缓存单元测试。"""
+
+from unittest.mock import patch
+
+from butler.core import response_cache
+from butler.core.response_cache import ResponseCache
+
+
+class TestExactTier:
+    """精确匹配层测试。"""
+
+    def test_hit_ignores_whitespace_and_returns_copy(self):
+        """空白差异仍命中，修改返回值不影响缓存。"""
+        cache = ResponseCache()
+        cache.put("scope", "what  time is it", {"intent": "time", "entities": {}})
+        hit = cache.get("scope", " what time is it ")
+        hit["entities"]["mutated"] = True
+        assert cache.get("scope", "what time is it") == {"intent": "time", "entities": {}}
+
+    def test_scope_isolation(self):
+        """不同作用域互不命中。"""
+        cache = ResponseCache()
+        cache.put("a", "hello", "x")
+        assert cache.get("b", "hello") is None
+
+    def test_lru_eviction_and_ttl(self):
+        """超出上限淘汰最久未使用条目，过期条目不再返回。"""
+        cache = ResponseCache(max_size=2, ttl=10)
+        cache.put("s", "one", 1)
+        cache.put("s", "two", 2)
+        cache.get("s", "one")
+        cache.put("s", "three", 3)
+        assert cache.get("s", "two") is None
+        assert cache.get("s", "one") == 1
+        with patch.object(response_cache.time, "monotonic", return_value=response_cache.time.monotonic() + 11):
+            assert cache.get("s", "one") is None
+
+    def test_no_fuzzy_matching(self):
+        """只差一个数字或实体的文本不复用彼此的结果。"""
+        cache = ResponseCache()
+        cache.put("s", "what is 2 plus 2", "4")
+        cache.put("s", "capital of France", "Paris")
+        assert cache.get("s", "what is 2 plus 3") is None
+        assert cache.get("s", "capital of Spain") is None
+
+
+class _DictRedis:
+    """只实现 get/set 的内存版 Redis 替身。"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class TestRedisTier:
+    """Redis 共享精确层测试。"""
+
+    def test_shared_between_instances(self):
+        """一个实例写入后，另一个实例从 Redis 命中并回填本地，返回值仍是副本。"""
+        redis = _DictRedis()
+        ResponseCache(redis_client=redis).put("s", "hello", {"intent": "greet", "entities": {}})
+        other = ResponseCache(redis_client=redis)
+        hit = other.get("s", "hello")
+        hit["entities"]["mutated"] = True
+        redis.data.clear()
+        assert other.get("s", "hello") == {"intent": "greet", "entities": {}}
+        assert other.get("t", "hello") is None
+
+    def test_redis_errors_disable_tier(self):
+        """Redis 出错时退回纯本地缓存。"""
+        class Broken:
+            def get(self, *args, **kwargs):
+                raise ConnectionError
+
+            set = get
+        cache = ResponseCache(redis_client=Broken())
+        cache.put("s", "hello", "x")
+        assert cache.get("s", "hello") == "x"
+        assert cache.get("s", "other") is None
@@ -0,0 +1,24 @@
+"""ShortTermMemory 会话上下文单元测试。"""
+
+from butler.memory.short_term import ShortTermMemory
+
+
+class TestShortTermMemory:
+    """短期会话记忆测试。"""
+
+    def test_keeps_latest_messages(self):
+        """超出上限时只保留最近的消息，顺序不变。"""
+        memory = ShortTermMemory(max_messages=3)
+        for i in range(5):
+            memory.add_message("s", "user", str(i))
+        assert [m["content"] for m in memory.get_messages("s")] == ["2", "3", "4"]
+
+    def test_sessions_are_isolated_and_clearable(self):
+        """不同会话互不影响，清空后返回空列表。"""
+        memory = ShortTermMemory()
+        memory.add_message("a", "user", "hi", {"lang": "en"})
+        memory.add_message("b", "assistant", "你好")
+        assert memory.get_messages("a") == [{"role": "user", "content": "hi", "metadata": {"lang": "en"}}]
+        memory.clear("a")
+        assert memory.get_messages("a") == []
+        assert len(memory.get_messages("b")) == 1
@@ -0,0 +1,95 @@
+"""SkillManager 技能安全审计单元测试。"""
+
+import os
+import threading
+from unittest.mock import MagicMock
+
+from butler.core import skill_manager
+from butler.core.skill_manager import SkillManager
+
+
+class TestSkillSafetyAudit:
+    """非核心技能入口文件的 AST 审计测试。"""
+
+    def test_cached_until_file_changes(self, tmp_path):
+        """未改动的文件复用审计结果，内容变化后重新审计。"""
+        entry = tmp_path / "main.py"
+        entry.write_text("print('hi')\n", encoding="utf-8")
+        skill_manager._audit_skill_source.cache_clear()
+
+        assert SkillManager._is_skill_safe(None, str(entry)) is True
+        assert SkillManager._is_skill_safe(None, str(entry)) is True
+        assert skill_manager._audit_skill_source.cache_info().hits == 1
+
+        entry.write_text("import os\nos.system('ls')\n", encoding="utf-8")
+        st = entry.stat()
+        os.utime(entry, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert SkillManager._is_skill_safe(None, str(entry)) is False
+
+    def test_missing_file_is_safe(self, tmp_path):
+        """入口文件不存在时无需审计。"""
+        assert SkillManager._is_skill_safe(None, str(tmp_path / "absent.py")) is True
+
+
+class TestSkillEventHandler:
+    """目录监听防抖测试。"""
+
+    def test_fired_timer_is_released(self, tmp_path):
+        """防抖定时器触发后从字典中移除，只加载一次。"""
+        loaded = threading.Event()
+        manager = MagicMock()
+        manager.load_and_register_skill.side_effect = lambda _: loaded.set()
+        handler = skill_manager.SkillEventHandler(manager)
+
+        handler._trigger_load(tmp_path)
+        handler._trigger_load(tmp_path)
+        assert loaded.wait(5)
+        assert handler._timers == {}
+        manager.load_and_register_skill.assert_called_once_with(tmp_path)
+
+    def test_dispatch_rejects_irrelevant_events(self, tmp_path):
+        """只有关键文件的增删改事件会触发加载。"""
+        from watchdog.events import FileClosedEvent, FileModifiedEvent, DirCreatedEvent
+
+        manager = MagicMock(skills_dir=tmp_path)
+        handler = skill_manager.SkillEventHandler(manager)
+        handler._trigger_load = MagicMock()
+        skill_dir = tmp_path / "demo"
+
+        for event in [
+            FileModifiedEvent(str(skill_dir / "__pycache__" / "main.cpython-311.pyc")),
+            FileModifiedEvent(str(skill_dir / "notes.txt")),
+            FileModifiedEvent(str(skill_dir / ".git" / "main.py")),
+            FileClosedEvent(str(skill_dir / "main.py")),
+        ]:
+            handler.dispatch(event)
+        handler._trigger_load.assert_not_called()
+
+        handler.dispatch(FileModifiedEvent(str(skill_dir / "SKILL.md")))
+        handler.dispatch(DirCreatedEvent(str(skill_dir)))
+        assert handler._trigger_load.call_count == 2
+
+
+class TestSkillIndex:
+    """match_skill 关键词索引测试。"""
+
+    def test_reload_during_build_discards_stale_index(self, monkeypatch):
+        """构建索引期间发生热加载时不保存旧索引，新技能下次即可匹配。"""
+        manager = SkillManager.__new__(SkillManager)
+        manager.manifests = {"alpha": {"name": "alpha"}}
+        manager._skill_index = None
+        manager._skill_generation = 0
+        reloaded = []
+
+        class ReloadingIndex(skill_manager.KeywordIndex):
+            def __init__(self, groups):
+                if not reloaded:
+                    # 模拟监控线程在构建中途热加载了新技能
+                    reloaded.append(True)
+                    manager.manifests["beta"] = {"name": "beta"}
+                    manager._invalidate_skill_index()
+                super().__init__(groups)
+
+        monkeypatch.setattr(skill_manager, "KeywordIndex", ReloadingIndex)
+        assert manager.match_skill("beta please") is None
+        assert manager.match_skill("beta please") == "beta"
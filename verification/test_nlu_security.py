@@ -1,14 +1,36 @@
+import json
 import pytest
 from unittest.mock import MagicMock
 from butler.core.nlu_service import NLUService
 
+def _sse_lines(content):
+    """Build the SSE lines of a streamed chat completion with a single delta."""
+    chunk = {"choices": [{"delta": {"content": content}, "finish_reason": "stop"}]}
+    usage = {"choices": [], "usage": {"total_tokens": 0}}
+    return [b"data: " + json.dumps(chunk).encode(), b"", b"data: " + json.dumps(usage).encode(), b"data: [DONE]"]
+
+def _sse_response(content):
+    """Mock a streamed chat completion response."""
+    response = MagicMock()
+    response.headers = {"Content-Type": "text/event-stream"}
+    response.iter_lines = lambda: _sse_lines(content)
+    return response
+
+@pytest.fixture(autouse=True)
+def charged_tokens(monkeypatch):
+    """Record quota charges instead of writing them to the config file."""
+    from butler.core import nlu_service as nlu_module
+    charged = []
+    monkeypatch.setattr(nlu_module.quota_manager, "update_usage", charged.append)
+    return charged
+
 @pytest.fixture
 def nlu_service():
     prompts = {
         "nlu_intent_extraction": {"prompt": "base_extraction_prompt"},
         "general_response": {"prompt": "base_response_prompt"}
     }
-    return NLUService(api_key="test_key", prompts=prompts)
+    return NLUService(api_key="test_key", prompts=prompts, redis_client=None)
 
 def test_prompt_injection_detection(nlu_service):
     # Test safe prompts
@@ -38,29 +60,114 @@ def test_generate_general_response_blocked(nlu_service):
     assert "已被拦截" in result
 
 def test_extract_intent_output_schema_and_safety_checks(nlu_service, monkeypatch):
-    # Mock requests.post to return various LLM outputs
-    mock_response = MagicMock()
-    mock_response.raise_for_status = MagicMock()
+    # Mock the pooled session's post to return various LLM outputs
+    mock_response = _sse_response("")
 
     # 1. Test invalid JSON returned by LLM
-    mock_response.json = lambda: {
-        "choices": [{"message": {"content": "This is not JSON text"}}]
-    }
-    monkeypatch.setattr("requests.post", lambda *args, **kwargs: mock_response)
+    mock_response.iter_lines = lambda: _sse_lines("This is not JSON text")
+    monkeypatch.setattr(nlu_service._session, "post", lambda *args, **kwargs: mock_response)
     result = nlu_service.extract_intent("normal text")
     assert result["intent"] == "malformed_response"
 
     # 2. Test structurally invalid JSON (missing intent key)
-    mock_response.json = lambda: {
-        "choices": [{"message": {"content": '{"entities": {}}'}}]
-    }
+    mock_response.iter_lines = lambda: _sse_lines('{"entities": {}}')
     result = nlu_service.extract_intent("normal text")
     assert result["intent"] == "malformed_response"
 
     # 3. Test malicious leakage inside JSON values (e.g. os.system or subprocess)
-    mock_response.json = lambda: {
-        "choices": [{"message": {"content": '{"intent": "run_command", "entities": {"command": "import os; os.system(\'rm -rf /\')"}}'}}]
-    }
+    mock_response.iter_lines = lambda: _sse_lines('{"intent": "run_command", "entities": {"command": "import os; os.system(\'rm -rf /\')"}}')
     result = nlu_service.extract_intent("normal text")
     assert result["intent"] == "malformed_response"
     assert "Malicious execution patterns" in result["entities"]["error"]
+
+def test_extract_intent_cache_hit_skips_request(nlu_service, monkeypatch):
+    calls = []
+    mock_response = _sse_response('{"intent": "get_current_time", "entities": {}}')
+
+    def fake_post(*args, **kwargs):
+        calls.append(kwargs)
+        return mock_response
+
+    monkeypatch.setattr(nlu_service._session, "post", fake_post)
+    first = nlu_service.extract_intent("what time is it")
+    first["entities"]["mutated"] = True
+    second = nlu_service.extract_intent("what  time is it")
+    assert len(calls) == 1
+    assert second == {"intent": "get_current_time", "entities": {}}
+
+    # A different history must not reuse the cached result
+    nlu_service.extract_intent("what time is it", history=[{"role": "user", "content": "hi"}])
+    assert len(calls) == 2
+
+def test_shared_cache_is_scoped_by_model(monkeypatch):
+    """Instances sharing a Redis tier must not reuse results produced by another model."""
+    from butler.core import nlu_service as nlu_module
+
+    class DictRedis:
+        def __init__(self):
+            self.data = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def set(self, key, value, ex=None):
+            self.data[key] = value
+
+    shared = DictRedis()
+    prompts = {"nlu_intent_extraction": {"prompt": "base_extraction_prompt"}}
+    calls = []
+    mock_response = _sse_response('{"intent": "get_current_time", "entities": {}}')
+
+    def fake_post(*args, **kwargs):
+        calls.append(kwargs)
+        return mock_response
+
+    for model in ("model-a", "model-a", "model-b"):
+        cfg = {"provider": "deepseek", "base_url": "https://api.example.com", "model_name": model, "api_key": "test_key"}
+        monkeypatch.setattr(nlu_module, "_resolve_ai_config", lambda api_key=None, cfg=cfg: cfg)
+        service = NLUService(api_key="test_key", prompts=prompts, redis_client=shared)
+        monkeypatch.setattr(service._session, "post", fake_post)
+        service.extract_intent("what time is it")
+    assert len(calls) == 2
+
+def test_extract_intent_without_stream_usage_still_charges_quota(nlu_service, monkeypatch, charged_tokens):
+    """A stream that ends without a usage chunk is charged an estimate."""
+    monkeypatch.setattr(nlu_service._session, "post", lambda *args, **kwargs: _sse_response('{"intent": "greet", "entities": {}}'))
+    assert nlu_service.extract_intent("hello there")["intent"] == "greet"
+    assert len(charged_tokens) == 1 and charged_tokens[0] > 0
+
+def test_extract_intent_accepts_non_streamed_json(nlu_service, monkeypatch, charged_tokens):
+    """Backends that ignore "stream" and reply with plain JSON are still parsed."""
+    response = MagicMock()
+    response.headers = {"Content-Type": "application/json"}
+    response.content = json.dumps({
+        "choices": [{"message": {"content": '{"intent": "greet", "entities": {}}'}}],
+        "usage": {"total_tokens": 42},
+    }).encode()
+    monkeypatch.setattr(nlu_service._session, "post", lambda *args, **kwargs: response)
+    assert nlu_service.extract_intent("hello there")["intent"] == "greet"
+    assert charged_tokens == [42]
+
+def test_streamed_reply_without_usage_still_charges_quota(nlu_service, monkeypatch, charged_tokens):
+    """Streamed chat replies without a usage chunk are charged an estimate as well."""
+    monkeypatch.setattr(nlu_service._session, "post", lambda *args, **kwargs: _sse_response("hello back"))
+    deltas = []
+    assert nlu_service.ask_llm("hello there", use_habit=False, on_delta=deltas.append) == "hello back"
+    assert deltas == ["hello back"]
+    assert len(charged_tokens) == 1 and charged_tokens[0] > 0
+
+def test_extract_intent_cache_follows_habit_profile(nlu_service, monkeypatch):
+    """A new habit profile rebuilds the system prompt and must bypass cached intents."""
+    from butler.core import nlu_service as nlu_module
+    calls = []
+
+    def fake_post(*args, **kwargs):
+        calls.append(kwargs)
+        return _sse_response('{"intent": "get_current_time", "entities": {}}')
+
+    monkeypatch.setattr(nlu_service._session, "post", fake_post)
+    monkeypatch.setattr(nlu_service, "_build_augmented_system_prompt", lambda key: f"prompt v{len(calls)}")
+    nlu_service.extract_intent("what time is it")
+    monkeypatch.setattr(nlu_module.habit_manager, "version", nlu_module.habit_manager.version + 1, raising=False)
+    nlu_service.extract_intent("what time is it")
+    assert len(calls) == 2